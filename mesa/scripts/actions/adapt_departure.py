@@ -1,17 +1,72 @@
 """
 Acción: Adaptar hora de salida según delays aprendidos
 """
+from utils.event_log import DEBUG
+from utils.congestion_grid import time_multiplier
+from utils.departure_calendar import MINUTES_PER_DAY
 
-def adjust_departure_time(agent, objective):
-    """Ajusta hora de salida si se han aprendido delays en la ruta"""
-    route_key = (agent.pos, objective['destination'])
+def adapt_next_departure(agent):
+    """
+    Al terminar un viaje, ajusta la salida del próximo objetivo pendiente
+    con lo recién aprendido, partiendo del destino alcanzado
+    """
+    if not isinstance(agent.current_location, tuple):
+        return
     
-    if route_key in agent.learned_delays:
-        avg_delay = sum(agent.learned_delays[route_key]) / len(agent.learned_delays[route_key])
-        
-        original_minute = objective['minute']
-        adjusted_minute = max(0, original_minute - int(avg_delay))
-        
+    now = agent.model.schedule.steps
+    day_start = (now // MINUTES_PER_DAY) * MINUTES_PER_DAY
+    
+    pending = [
+        objective for objective in agent.trip_objectives
+        if not objective['completed'] and isinstance(objective['destination'], tuple)
+        and day_start + objective['hour'] * 60 + objective.get('planned_minute', objective['minute']) > now
+    ]
+    
+    if pending:
+        objective = min(pending, key=lambda o: (o['hour'], o.get('planned_minute', o['minute'])))
+        adjust_departure_time(agent, objective, origin=agent.current_location)
+
+
+def adjust_departure_time(agent, objective, origin=None):
+    """
+    Ajusta hora de salida según los delays aprendidos en la ruta y la
+    congestión actual del mapa del modelo
+    
+    El adelanto se aplica siempre sobre el minuto planificado del
+    objetivo, así que recalcularlo no acumula adelantos. Si el minuto
+    cambia, el objetivo se vuelve a agendar en el calendario.
+    
+    Returns:
+        int: minutos de adelanto respecto del minuto planificado
+    """
+    from actions.learn_from_trip import _estimate_travel_time
+    
+    origin = origin if origin is not None else agent.pos
+    planned_minute = objective.setdefault('planned_minute', objective['minute'])
+    departure_minute = objective['hour'] * 60 + planned_minute
+    
+    route_key = agent.learned_delays.key(origin, objective['destination'], departure_minute)
+    learned_delay = agent.learned_delays.mean(route_key, default=0.0)
+    
+    mode = agent.current_mode or 'car'
+    congestion = agent.model.congestion.along(origin, objective['destination'])
+    congestion_delay = (_estimate_travel_time(agent, mode, objective['destination'], origin,
+                                              minute_of_day=departure_minute)
+                        * (time_multiplier(mode, congestion) - 1.0))
+    
+    avg_delay = learned_delay + congestion_delay
+    advance = int(avg_delay) if avg_delay >= 1 else 0
+    adjusted_minute = max(0, planned_minute - advance)
+    
+    if adjusted_minute != objective['minute']:
         objective['minute'] = adjusted_minute
+        agent.model.departure_calendar.schedule_objective(
+            agent, objective, agent.model.schedule.steps
+        )
         
-        print(f"⏰ Agente {agent.unique_id} adelanta salida {int(avg_delay)} min")
\ No newline at end of file
+        agent.model.event_log.emit(
+            'departure_adjusted', DEBUG,
+            agent=agent.unique_id, advance=advance, minute=adjusted_minute
+        )
+    
+    return advance
@@ -1,7 +1,16 @@
 """
 Acción: Elegir modo de transporte
 """
-import random
+import numpy as np
+from utils import decision_making
+from utils import batch_decision
+from utils.congestion_grid import MODE_SENSITIVITY, time_multiplier
+from utils.od_skim import network_distances, straight_line_distance
+
+# Temperatura del método probabilístico (igual que evaluate_alternatives)
+PROBABILISTIC_TEMPERATURE = 1.5
+
+DEFAULT_WEIGHTS = [0.25, 0.25, 0.25, 0.25]
 
 def _get_available_modes(agent):
     """Retorna modos disponibles"""
@@ -35,11 +44,36 @@ def _get_available_modes(agent):
 #     return modes
 
 
-def _calculate_distance(pos1, pos2):
-    """Calcula distancia"""
-    if isinstance(pos1, tuple) and isinstance(pos2, tuple):
-        return ((pos1[0] - pos2[0])**2 + (pos1[1] - pos2[1])**2)**0.5
-    return 10.0
+def _calculate_distance(model, pos1, pos2, mode):
+    """
+    Calcula distancia por red del modo (skim) o en línea recta; 10 si
+    origen o destino no son posiciones (igual que _distance_matrix)
+    """
+    if not (isinstance(pos1, tuple) and isinstance(pos2, tuple)):
+        return 10.0
+    
+    skim = model.od_skim
+    if skim is not None and mode in skim.distances:
+        return skim.distance(mode, pos1, pos2)
+    return straight_line_distance(pos1, pos2)
+
+
+def _distance_matrix(model, origins, destinations, modes):
+    """Distancias (viajes × modos); 10 si origen o destino no son posiciones"""
+    valid = np.array([
+        isinstance(origin, tuple) and isinstance(destination, tuple)
+        for origin, destination in zip(origins, destinations)
+    ])
+    origins = [origin if ok else (0, 0) for origin, ok in zip(origins, valid)]
+    destinations = [destination if ok else (0, 0) for destination, ok in zip(destinations, valid)]
+    
+    distances = np.column_stack([
+        network_distances(model.od_skim, origins, destinations, mode)
+        for mode in modes
+    ])
+    distances[~valid] = 10.0
+    
+    return distances
 
 
 def _normalize_criteria(candidates):
@@ -73,8 +107,39 @@ def _weighted_decision(candidates, weights):
     return min(scores, key=lambda x: x[0])[1]
 
 
+def _select_index(candidates, weights, method, rng=None):
+    """Aplica el método de decisión configurado y retorna un índice"""
+    if method == 'topsis':
+        return decision_making.topsis_decision(candidates, weights)
+    if method == 'probabilistic':
+        return decision_making.probabilistic_choice(
+            candidates, weights, temperature=PROBABILISTIC_TEMPERATURE, rng=rng
+        )
+    if method == 'lexicographic':
+        return decision_making.lexicographic_decision(candidates, weights)
+    
+    best_mode = _weighted_decision(candidates, weights)
+    return [c['mode'] for c in candidates].index(best_mode)
+
+
 def choose_transport_mode(agent, destination):
-    """Elige modo de transporte usando weighted decision making"""
+    """Elige modo de transporte usando el método de decisión del modelo"""
+    best_mode = score_transport_mode(agent, destination)
+    
+    agent.model.transport_usage[best_mode] += 1
+    
+    return best_mode
+
+
+def score_transport_mode(agent, destination):
+    """
+    Evalúa los modos y retorna el mejor, sin registrar el uso (no
+    modifica estado compartido; solo consume el rng del agente)
+    """
+    if getattr(agent.model, 'decision_table', None) is not None:
+        method = getattr(agent.model, 'decision_method', 'weighted_means')
+        available, indices = _table_decisions(agent.model, [agent], [destination], method)
+        return available[0][indices[0]]
     
     available_modes = _get_available_modes(agent)
     
@@ -82,14 +147,16 @@ def choose_transport_mode(agent, destination):
         return 'walking'
     
     candidates = []
+    congestion = _route_congestion(agent.model, [agent.pos], [destination])[0]
     
     for mode in available_modes:
         mode_data = agent.model.modes_characteristics.get(mode, {})
         
-        distance = _calculate_distance(agent.pos, destination)
+        distance = _calculate_distance(agent.model, agent.pos, destination, mode)
+        delay_factor = time_multiplier(mode, congestion)
         
         price = mode_data.get('fix_price', 0) + mode_data.get('price_per_km', 0) * distance
-        time = mode_data.get('waiting_time', 0) + distance / max(mode_data.get('speed', 1), 0.1)
+        time = mode_data.get('waiting_time', 0) + distance / max(mode_data.get('speed', 1), 0.1) * delay_factor
         social = mode_data.get('social_pattern', 0.5)
         difficulty = mode_data.get('difficulty', 0.5)
         
@@ -104,9 +171,289 @@ def choose_transport_mode(agent, destination):
     
     candidates = _normalize_criteria(candidates)
     
-    weights = agent.weights.get('work', [0.25, 0.25, 0.25, 0.25])
-    best_mode = _weighted_decision(candidates, weights)
+    weights = agent.weights.get('work', DEFAULT_WEIGHTS)
+    method = getattr(agent.model, 'decision_method', 'weighted_means')
+    return available_modes[_select_index(candidates, weights, method, agent.rng)]
+
+
+def _route_congestion(model, origins, destinations):
+    """Congestión media del mapa del modelo a lo largo de cada trayecto"""
+    return model.congestion.along_batch(
+        [_as_point(origin) for origin in origins],
+        [_as_point(destination) for destination in destinations]
+    )
+
+
+def _as_point(pos):
+    return pos if isinstance(pos, tuple) else (0, 0)
+
+
+def _mode_parameters(model, modes):
+    """Arrays de características por modo, indexados por código de modo"""
+    def column(key, default):
+        return np.array([
+            model.modes_characteristics.get(mode, {}).get(key, default)
+            for mode in modes
+        ], dtype=float)
     
-    agent.model.transport_usage[best_mode] += 1
+    return {
+        'fix_price': column('fix_price', 0),
+        'price_per_km': column('price_per_km', 0),
+        'waiting_time': column('waiting_time', 0),
+        'speed': np.maximum(column('speed', 1), 0.1),
+        'social_pattern': column('social_pattern', 0.5),
+        'difficulty': column('difficulty', 0.5),
+        'weather_coeff': column('weather_coeff', 0.5),
+        'congestion_sensitivity': np.array([
+            MODE_SENSITIVITY.get(mode, 0.0) for mode in modes
+        ], dtype=float)
+    }
+
+
+def build_criteria_tensor(model, agents, destinations):
+    """
+    Construye el tensor (agentes × modos × criterios) de una tanda de agentes
+    
+    Returns:
+        (criteria, mask, available): available es la lista de modos de
+        cada agente, en el orden de las columnas del tensor
+    """
+    available = [_get_available_modes(agent) for agent in agents]
+    codes, mask = _mode_codes(model, available)
+    
+    origins = [agent.pos for agent in agents]
+    modes = list(model.modes_characteristics.keys())
+    
+    distances = _distance_matrix(model, origins, destinations, modes + [None])
+    distances = np.take_along_axis(distances, codes, axis=1)
+    congestion = _route_congestion(model, origins, destinations)
+    
+    criteria = _criteria_tensor(model, codes, distances, congestion, model.weather_of_day)
+    
+    return criteria, mask, available
+
+
+def _mode_codes(model, available):
+    """
+    Códigos de modo (viajes × modos) en el orden de cada lista de modos
+    disponibles y máscara de columnas válidas
+    
+    Modos sin características y columnas de relleno usan el código extra
+    len(modos), con los valores por defecto de la ruta escalar.
+    """
+    modes = list(model.modes_characteristics.keys())
+    code_of = {mode: code for code, mode in enumerate(modes)}
+    
+    n_rows = len(available)
+    max_modes = max(len(a) for a in available)
+    
+    codes = np.full((n_rows, max_modes), len(modes), dtype=int)
+    mask = np.zeros((n_rows, max_modes), dtype=bool)
+    
+    for i, row_modes in enumerate(available):
+        codes[i, :len(row_modes)] = [code_of.get(m, len(modes)) for m in row_modes]
+        mask[i, :len(row_modes)] = True
+    
+    return codes, mask
+
+
+def _criteria_tensor(model, codes, distances, congestion, weather):
+    """
+    Criterios [precio, tiempo, social, dificultad] por viaje y modo
+    
+    Args:
+        distances: array (viajes × modos)
+        congestion: congestión del trayecto por viaje
+        weather: clima (escalar o uno por viaje)
+    """
+    modes = list(model.modes_characteristics.keys())
+    params = _mode_parameters(model, modes + [None])
+    
+    congestion = np.asarray(congestion, dtype=float).reshape(-1, 1)
+    delay_factor = 1.0 + params['congestion_sensitivity'][codes] * congestion
+    
+    price = params['fix_price'][codes] + params['price_per_km'][codes] * distances
+    time = params['waiting_time'][codes] + distances / params['speed'][codes] * delay_factor
+    social = params['social_pattern'][codes]
+    difficulty = params['difficulty'][codes]
+    
+    if model.weather_impact:
+        weather = np.reshape(np.asarray(weather, dtype=float), (-1, 1))
+        difficulty = difficulty * (1.0 + weather * params['weather_coeff'][codes])
+    
+    return np.stack([price, time, social, difficulty], axis=2)
+
+
+def _agent_weights(agents):
+    return np.array([agent.weights.get('work', DEFAULT_WEIGHTS) for agent in agents], dtype=float)
+
+
+def choose_transport_modes(agents, destinations, method=None):
+    """
+    Versión por lotes de choose_transport_mode
+    
+    Evalúa todos los agentes que deciden en el tick con operaciones de
+    arrays y retorna un modo por agente, idéntico a la ruta escalar.
+    """
+    if not agents:
+        return []
+    
+    model = agents[0].model
+    method = method or getattr(model, 'decision_method', 'weighted_means')
+    
+    if getattr(model, 'decision_table', None) is not None:
+        available, indices = _table_decisions(model, agents, destinations, method)
+    else:
+        criteria, mask, available = build_criteria_tensor(model, agents, destinations)
+        criteria = batch_decision.normalize_maxabs(criteria, mask)
+        
+        weights = _agent_weights(agents)
+        
+        draws = None
+        if method == 'probabilistic':
+            draws = np.array([agent.rng.random() for agent in agents])
+        
+        indices = _batch_indices(criteria, mask, weights, method, draws)
+    
+    chosen = [agent_modes[i] for agent_modes, i in zip(available, indices)]
+    
+    for mode in chosen:
+        model.transport_usage[mode] += 1
+    
+    return chosen
+
+
+def _batch_indices(criteria, mask, weights, method, draws=None):
+    """Aplica el método de decisión vectorizado y retorna un índice por fila"""
+    if method == 'topsis':
+        return batch_decision.topsis_batch(criteria, mask, weights)
+    if method == 'probabilistic':
+        return batch_decision.probabilistic_batch(
+            criteria, mask, weights, draws, temperature=PROBABILISTIC_TEMPERATURE
+        )
+    if method == 'lexicographic':
+        return batch_decision.lexicographic_batch(criteria, mask, weights)
+    return batch_decision.weighted_means_batch(criteria, mask, weights)
+
+
+def _table_decisions(model, agents, destinations, method):
+    """
+    Decisiones desde la tabla memoizada del modelo
+    
+    La clave se arma con entradas baratas (modos, pesos, distancia
+    escalar por modo, congestión del trayecto y clima); los criterios
+    solo se calculan para las claves que faltan, evaluadas juntas en el
+    centro de sus buckets, y para las consultas auditadas. En el método
+    probabilístico la tabla guarda probabilidades acumuladas y cada
+    agente sortea con su rng.
+    
+    Returns:
+        (available, indices) como en la ruta por lotes
+    """
+    table = model.decision_table
+    weather = model.weather_of_day
+    
+    available = [_get_available_modes(agent) for agent in agents]
+    origins = [agent.pos for agent in agents]
+    congestion = _route_congestion(model, origins, destinations)
+    
+    distances = []
+    keys = []
+    entries = []
+    audited = []
+    
+    for i, agent in enumerate(agents):
+        row_distances = [
+            _calculate_distance(model, origins[i], destinations[i], mode)
+            for mode in available[i]
+        ]
+        key = table.key(agent.weights.get('work', DEFAULT_WEIGHTS), available[i],
+                        row_distances, congestion[i], weather, method)
+        distances.append(row_distances)
+        keys.append(key)
+        entries.append(table.get(key))
+        
+        if table.audit_due():
+            audited.append(i)
+    
+    missing = {}
+    for i, (key, entry) in enumerate(zip(keys, entries)):
+        if entry is None:
+            missing.setdefault(key, i)
+    
+    if missing:
+        rows = list(missing.values())
+        centers = [table.representative(key) for key in missing]
+        
+        evaluated = _evaluate_rows(
+            model, [agents[i] for i in rows], [available[i] for i in rows],
+            [c[0] for c in centers], [c[1] for c in centers], [c[2] for c in centers], method
+        )
+        
+        filled = dict(zip(missing, evaluated))
+        for key, entry in filled.items():
+            table.put(key, entry)
+        
+        entries = [entry if entry is not None else filled[key]
+                   for key, entry in zip(keys, entries)]
+    
+    if audited:
+        exact = _evaluate_rows(
+            model, [agents[i] for i in audited], [available[i] for i in audited],
+            [distances[i] for i in audited], congestion[audited], weather, method
+        )
+        for i, entry in zip(audited, exact):
+            table.record_audit(entries[i], entry)
+    
+    indices = []
+    for agent, entry in zip(agents, entries):
+        if isinstance(entry, tuple):
+            draw = agent.rng.random()
+            entry = next((k for k, c in enumerate(entry) if draw <= c), len(entry) - 1)
+        indices.append(entry)
+    
+    return available, indices
+
+
+def _evaluate_rows(model, agents, available, distances, congestion, weather, method):
+    """_evaluate_contexts sobre listas de modos y distancias por agente"""
+    codes, mask = _mode_codes(model, available)
+    
+    padded = np.zeros(codes.shape)
+    for j, row_distances in enumerate(distances):
+        padded[j, :len(row_distances)] = row_distances
+    
+    return _evaluate_contexts(
+        model, codes, mask, padded, congestion, weather, _agent_weights(agents), method
+    )
+
+
+def _evaluate_contexts(model, codes, mask, distances, congestion, weather, weights, method):
+    """
+    Decisión de cada contexto: índice de modo, o probabilidades acumuladas
+    (tupla) en el método probabilístico
+    """
+    criteria = _criteria_tensor(model, codes, distances, congestion, weather)
+    criteria = batch_decision.normalize_maxabs(criteria, mask)
+    
+    if method == 'probabilistic':
+        cumulative = batch_decision.softmax_cumulative(
+            criteria, mask, weights, temperature=PROBABILISTIC_TEMPERATURE
+        )
+        return [tuple(float(c) for c in row[:n])
+                for row, n in zip(cumulative, mask.sum(axis=1))]
+    
+    return [int(i) for i in _batch_indices(criteria, mask, weights, method)]
+
+
+def sync_decision_table(model):
+    """Invalida la tabla de decisiones si cambiaron los modos o el clima"""
+    if getattr(model, 'decision_table', None) is None:
+        return
     
-    return best_mode
\ No newline at end of file
+    model.decision_table.sync(
+        model.modes_characteristics,
+        MODE_SENSITIVITY,
+        model.weather_impact,
+        PROBABILISTIC_TEMPERATURE
+    )
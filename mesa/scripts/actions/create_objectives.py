@@ -1,7 +1,9 @@
 """
 Acción: Crear objetivos de viaje diarios
 """
-import random
+from utils.event_log import DEBUG
+from utils.departure_calendar import MINUTES_PER_DAY
+
 
 def create_daily_schedule(agent):
     """Crea la agenda diaria del agente basada en su perfil"""
@@ -16,7 +18,7 @@ def create_daily_schedule(agent):
         if activity and activity != agent.current_activity:
             agent.daily_schedule.append({
                 'hour': hour,
-                'minute': random.randint(0, 59),
+                'minute': agent.rng.randint(0, 59),
                 'activity': activity
             })
     
@@ -24,6 +26,43 @@ def create_daily_schedule(agent):
     
     # 🆕 AGREGAR: Crear algunos viajes inmediatos para testing
     _create_immediate_test_trips(agent)
+    
+    _schedule_departures(agent)
+    
+    _prefetch_routes(agent)
+
+
+def _schedule_departures(agent):
+    """Registra las salidas del agente en el calendario del modelo"""
+    calendar = agent.model.departure_calendar
+    current_step = agent.model.schedule.steps
+    
+    for objective in agent.trip_objectives:
+        calendar.schedule_objective(agent, objective, current_step)
+
+
+def _prefetch_routes(agent):
+    """
+    Pide al conector precalcular las rutas de los viajes del día, para
+    cada modo con vehículo disponible (el modo se elige recién al salir)
+    """
+    connector = agent.model.sumo_connector
+    if connector.prefetcher is None:
+        return
+    
+    from actions.choose_mode import _get_available_modes
+    
+    modes = [mode for mode in _get_available_modes(agent) if mode != 'walking']
+    day_start = (agent.model.schedule.steps // MINUTES_PER_DAY) * MINUTES_PER_DAY
+    origin = agent.pos
+    
+    for objective in sorted(agent.trip_objectives, key=lambda o: (o['hour'], o['minute'])):
+        step = day_start + objective['hour'] * 60 + objective['minute']
+        
+        for mode in modes:
+            connector.prefetch_route(step, origin, objective['destination'], mode)
+        
+        origin = objective['destination']
 
 
 def _create_immediate_test_trips(agent):
@@ -32,20 +71,23 @@ def _create_immediate_test_trips(agent):
     Esto fuerza que algunos agentes viajen en los primeros minutos
     """
     # 20% de probabilidad de crear viaje inmediato
-    if random.random() < 0.2:
+    if agent.rng.random() < 0.2:
         destination = _find_destination(agent, 'work')
         
         if destination:
             immediate_trip = {
                 'hour': 0,  # Hora actual
-                'minute': random.randint(1, 10),  # Primeros 10 minutos
+                'minute': agent.rng.randint(1, 10),  # Primeros 10 minutos
                 'activity': 'work',
                 'destination': destination,
                 'completed': False,
                 'start_time': None
             }
             agent.trip_objectives.insert(0, immediate_trip)
-            print(f"🆕 Agente {agent.unique_id}: viaje inmediato programado en minuto {immediate_trip['minute']}")
+            agent.model.event_log.emit(
+                'test_trip_scheduled', DEBUG,
+                agent=agent.unique_id, minute=immediate_trip['minute']
+            )
 
 
 def _create_trip_objectives(agent):
@@ -70,26 +112,26 @@ def _create_trip_objectives(agent):
 def _find_destination(agent, activity):
     """Encuentra destino apropiado para la actividad"""
     options = activity.split('|')
-    activity_type = random.choice(options)
+    activity_type = agent.rng.choice(options)
     
     if activity_type in ['home', 'RM', 'RS', 'RL']:
         if not agent.home_location:
             agent.home_location = (
-                random.randint(0, agent.model.grid.width - 1),
-                random.randint(0, agent.model.grid.height - 1)
+                agent.rng.randint(0, agent.model.grid.width - 1),
+                agent.rng.randint(0, agent.model.grid.height - 1)
             )
         return agent.home_location
     
     elif activity_type in ['work', 'school', 'O', 'OS', 'OM', 'OL']:
         if not agent.work_location:
             agent.work_location = (
-                random.randint(0, agent.model.grid.width - 1),
-                random.randint(0, agent.model.grid.height - 1)
+                agent.rng.randint(0, agent.model.grid.width - 1),
+                agent.rng.randint(0, agent.model.grid.height - 1)
             )
         return agent.work_location
     
     else:
         return (
-            random.randint(0, agent.model.grid.width - 1),
-            random.randint(0, agent.model.grid.height - 1)
+            agent.rng.randint(0, agent.model.grid.width - 1),
+            agent.rng.randint(0, agent.model.grid.height - 1)
         )
\ No newline at end of file
@@ -1,9 +1,11 @@
 """
 Acción: Ejecutar viaje usando SUMO
 """
+from utils.event_log import WARNING
+from utils.od_skim import network_distances
 
-def check_and_execute_trip(agent):
-    """Verifica si es hora de iniciar un viaje"""
+def find_due_objective(agent):
+    """Retorna el primer objetivo cuya hora de salida ya llegó, o None"""
     current_step = agent.model.schedule.steps
     current_hour = (current_step // 60) % 24
     current_minute = current_step % 60
@@ -13,35 +15,44 @@ def check_and_execute_trip(agent):
             objective['minute'] <= current_minute and
             not objective['completed'] and
             not agent.in_transit):
-            
-            _start_trip(agent, objective)
-            break
+            return objective
+    
+    return None
 
 
-def _start_trip(agent, objective):
-    """Inicia un viaje hacia el objetivo"""
+def _start_trip(agent, objective, mode=None):
+    """Inicia un viaje hacia el objetivo (mode puede venir decidido en lote)"""
     from actions.choose_mode import choose_transport_mode
     
-    mode = choose_transport_mode(agent, objective['destination'])
+    if mode is None:
+        mode = choose_transport_mode(agent, objective['destination'])
+    
+    # Sin SUMO disponible el viaje se hace a pie
+    if mode != 'walking' and not _spawn_in_sumo(agent, mode, objective['destination']):
+        _count_as_walking(agent.model, mode)
+        mode = 'walking'
     
     # Walking sin SUMO
     if mode == 'walking':
         _handle_walking_trip(agent, objective)
-    else:
-        _spawn_in_sumo(agent, mode, objective['destination'])
     
     agent.current_objective = objective
     agent.current_mode = mode
     agent.in_transit = True
     agent.liveness = 360
     objective['start_time'] = agent.model.schedule.steps
+    objective['origin'] = agent.pos
     
-    print(f"🚗 Agente {agent.unique_id} inicia viaje en {mode} hacia {objective['activity']}")
+    agent.model.event_log.emit(
+        'trip_start',
+        agent=agent.unique_id, mode=mode, activity=objective['activity'],
+        origin=agent.pos, destination=objective['destination']
+    )
 
 
 def _handle_walking_trip(agent, objective):
     """Maneja viajes a pie sin SUMO"""
-    distance = _calculate_distance(agent.pos, objective['destination'])
+    distance = _calculate_distance(agent.model, agent.pos, objective['destination'])
     walking_speed = 3
     estimated_time = int((distance / walking_speed) * 60)
     
@@ -49,101 +60,207 @@ def _handle_walking_trip(agent, objective):
     agent.walking_destination = objective['destination']
 
 
-def _calculate_distance(pos1, pos2):
-    """Calcula distancia"""
+def _calculate_distance(model, pos1, pos2, mode='walking'):
+    """Calcula distancia por red del modo (skim) o en línea recta"""
     if isinstance(pos1, tuple) and isinstance(pos2, tuple):
-        return ((pos1[0] - pos2[0])**2 + (pos1[1] - pos2[1])**2)**0.5
+        return float(network_distances(model.od_skim, [pos1], [pos2], mode)[0])
     return 10.0
 
 
 def _spawn_in_sumo(agent, mode, destination):
-    """Crea vehículo en SUMO"""
-    agent.sumo_vehicle_id = f"agent_{agent.unique_id}_{mode}_{agent.model.schedule.steps}"
+    """
+    Pide el vehículo a SUMO; se inserta en el flush del tick y los
+    fallos vuelven vía handle_spawn_failure
+    """
+    vehicle_id = f"agent_{agent.unique_id}_{mode}_{agent.model.schedule.steps}"
     
-    success = agent.model.sumo_connector.add_vehicle(
-        vehicle_id=agent.sumo_vehicle_id,
+    queued = agent.model.sumo_connector.queue_vehicle(
+        vehicle_id=vehicle_id,
         vehicle_type=mode,
         origin=agent.pos,
         destination=destination
     )
     
-    if not success:
-        print(f"⚠️ No se pudo crear vehículo en SUMO para agente {agent.unique_id}")
-        agent.in_transit = False
-        agent.sumo_vehicle_id = None
+    if not queued:
+        agent.model.event_log.emit(
+            'spawn_failed', WARNING,
+            agent=agent.unique_id, vehicle=vehicle_id, mode=mode
+        )
+        return False
+    
+    agent.sumo_vehicle_id = vehicle_id
+    agent.model.vehicle_owners[vehicle_id] = agent
+    return True
 
 
-def update_trip_status(agent):
-    """Actualiza estado del viaje"""
+def _count_as_walking(model, mode):
+    """Pasa a caminata un viaje ya contado con el modo elegido"""
+    model.transport_usage[mode] -= 1
+    model.transport_usage['walking'] += 1
+
+
+def handle_spawn_failure(agent, vehicle_id, reason):
+    """
+    El vehículo encolado no se pudo insertar: el agente sigue el viaje a
+    pie desde su posición y el viaje cuenta como caminata en las series
+    """
+    if not agent.in_transit or agent.sumo_vehicle_id != vehicle_id:
+        return False
+    
+    agent.model.vehicle_owners.pop(vehicle_id, None)
+    agent.sumo_vehicle_id = None
+    
+    agent.model.event_log.emit(
+        'spawn_failed', WARNING,
+        agent=agent.unique_id, vehicle=vehicle_id, mode=agent.current_mode, reason=reason
+    )
+    
+    _count_as_walking(agent.model, agent.current_mode)
+    agent.current_mode = 'walking'
+    _handle_walking_trip(agent, agent.current_objective)
+    return True
+
+
+def trip_outcome(agent):
+    """
+    Qué le pasa este tick al viaje en curso, leído del snapshot (sin efectos)
+    
+    Returns:
+        None, ('move', celda) o ('complete', celda o None)
+    """
     
     # Manejo walking
     if agent.current_mode == 'walking':
-        _update_walking_status(agent)
-        return
+        arrival_step = agent.walking_arrival_step
+        if arrival_step is None or agent.model.schedule.steps >= arrival_step:
+            destination = agent.walking_destination or agent.pos
+            
+            dest_x = min(max(0, destination[0]), agent.model.grid.width - 1)
+            dest_y = min(max(0, destination[1]), agent.model.grid.height - 1)
+            return ('complete', (dest_x, dest_y))
+        return None
     
     # Para otros modos, verificar existencia primero
     if not agent.sumo_vehicle_id:
-        return
+        return None
     
-    # ✅ NUEVO: Verificar si el vehículo existe antes de consultar
+    # Estado leído del snapshot del paso (sin llamadas a SUMO)
     if not agent.model.sumo_connector.vehicle_exists(agent.sumo_vehicle_id):
         # Vehículo ya no existe = llegó al destino
-        _complete_trip(agent)
-        return
+        return ('complete', None)
     
     # Obtener posición
     position = agent.model.sumo_connector.get_vehicle_position(agent.sumo_vehicle_id)
     
     if position is None:
-        _complete_trip(agent)
-        return
+        # Aún pendiente de inserción en la red
+        return None
     
-    # Actualizar posición en grilla
+    # Posición en grilla
     grid_x = min(int(position[0]), agent.model.grid.width - 1)
     grid_y = min(int(position[1]), agent.model.grid.height - 1)
     
-    grid_x = max(0, grid_x)
-    grid_y = max(0, grid_y)
-    
-    agent.model.grid.move_agent(agent, (grid_x, grid_y))
+    return ('move', (max(0, grid_x), max(0, grid_y)))
 
 
-def _update_walking_status(agent):
-    """Actualiza estado de viaje a pie"""
-    if agent.model.schedule.steps >= getattr(agent, 'walking_arrival_step', 0):
-        destination = getattr(agent, 'walking_destination', agent.pos)
-        
-        dest_x = min(max(0, destination[0]), agent.model.grid.width - 1)
-        dest_y = min(max(0, destination[1]), agent.model.grid.height - 1)
-        
-        agent.model.grid.move_agent(agent, (dest_x, dest_y))
+def apply_trip_outcome(agent, outcome):
+    """Aplica el resultado de trip_outcome: mueve al agente y/o completa el viaje"""
+    if outcome is None:
+        return
+    
+    kind, cell = outcome
+    
+    if cell is not None:
+        agent.model.grid.move_agent(agent, cell)
+    
+    if kind == 'complete':
         _complete_trip(agent)
 
 
+def deliver_departure(agent, vehicle_id):
+    """
+    El vehículo del agente entró a la red durante la última ventana de
+    SUMO: registra la salida real y reinicia la cuenta de liveness, que
+    no debe gastarse esperando inserción
+    """
+    if not agent.in_transit or agent.sumo_vehicle_id != vehicle_id:
+        return False
+    
+    objective = agent.current_objective
+    objective['departure_time'] = agent.model.schedule.steps
+    agent.liveness = 360
+    
+    agent.model.event_log.emit(
+        'vehicle_departed',
+        agent=agent.unique_id, vehicle=vehicle_id,
+        wait=objective['departure_time'] - objective['start_time']
+    )
+    return True
+
+
+def deliver_teleport(agent, vehicle_id):
+    """
+    SUMO teletransportó el vehículo del agente (atascado) durante la
+    última ventana: se cuenta en el objetivo y se registra
+    """
+    if not agent.in_transit or agent.sumo_vehicle_id != vehicle_id:
+        return False
+    
+    objective = agent.current_objective
+    objective['teleports'] = objective.get('teleports', 0) + 1
+    
+    agent.model.event_log.emit(
+        'vehicle_teleported', WARNING,
+        agent=agent.unique_id, vehicle=vehicle_id
+    )
+    return True
+
+
+def deliver_arrival(agent, vehicle_id):
+    """
+    Completa el viaje de un agente cuyo vehículo llegó durante la última
+    ventana de SUMO (entrega en lote desde el modelo)
+    """
+    if not agent.in_transit or agent.sumo_vehicle_id != vehicle_id:
+        return False
+    
+    _complete_trip(agent)
+    return True
+
+
 def _complete_trip(agent):
     """Completa el viaje actual"""
     if not agent.current_objective:
         return
     
-    print(f"✅ Agente {agent.unique_id} completó viaje a {agent.current_objective['activity']}")
+    agent.model.event_log.emit(
+        'trip_end',
+        agent=agent.unique_id, mode=agent.current_mode,
+        activity=agent.current_objective['activity'],
+        duration=agent.model.schedule.steps - agent.current_objective['start_time'],
+        teleports=agent.current_objective.get('teleports', 0)
+    )
     
     agent.in_transit = False
     agent.current_objective['completed'] = True
+    agent.model.record_activity_change(agent.current_activity,
+                                       agent.current_objective['activity'])
     agent.current_activity = agent.current_objective['activity']
     agent.current_location = agent.current_objective['destination']
     
     from actions.learn_from_trip import learn_from_experience
+    from actions.adapt_departure import adapt_next_departure
     learn_from_experience(agent)
+    adapt_next_departure(agent)
     
     # Limpiar
     if agent.sumo_vehicle_id:
+        agent.model.vehicle_owners.pop(agent.sumo_vehicle_id, None)
         agent.model.sumo_connector.remove_vehicle(agent.sumo_vehicle_id)
         agent.sumo_vehicle_id = None
     
     agent.current_objective = None
     agent.liveness = 360
     
-    if hasattr(agent, 'walking_arrival_step'):
-        delattr(agent, 'walking_arrival_step')
-    if hasattr(agent, 'walking_destination'):
-        delattr(agent, 'walking_destination')
\ No newline at end of file
+    agent.walking_arrival_step = None
+    agent.walking_destination = None
\ No newline at end of file
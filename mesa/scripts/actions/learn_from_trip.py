@@ -1,6 +1,10 @@
 """
 Acción: Aprender de la experiencia de viaje
 """
+import math
+from utils.congestion_grid import time_multiplier
+from utils.departure_calendar import MINUTES_PER_DAY
+from utils.od_skim import network_distances
 
 def learn_from_experience(agent):
     """Registra y aprende del viaje completado"""
@@ -9,44 +13,99 @@ def learn_from_experience(agent):
     
     start_time = agent.current_objective.get('start_time', 0)
     actual_time = agent.model.schedule.steps - start_time
+    origin = agent.current_objective.get('origin', agent.pos)
     
-    trip_record = {
-        'origin': agent.pos,
+    trip_index = agent.model.trip_table.append(
+        agent.unique_id,
+        origin,
+        agent.current_objective['destination'],
+        agent.current_mode,
+        start_time,
+        actual_time,
+        agent.model.weather_of_day
+    )
+    
+    # Ventana acotada de viajes recientes, con índice a la tabla del modelo
+    agent.remember_trip({
+        'trip': trip_index,
+        'origin': origin,
         'destination': agent.current_objective['destination'],
         'mode': agent.current_mode,
         'actual_time': actual_time,
-        'weather': agent.model.weather_of_day,
         'step': agent.model.schedule.steps
-    }
-    
-    agent.travel_history.append(trip_record)
+    })
     
+    # La congestión ya visible en el mapa no cuenta como delay sorpresa
     expected_time = _estimate_travel_time(agent, agent.current_mode, 
-                                         agent.current_objective['destination'])
+                                         agent.current_objective['destination'],
+                                         origin, minute_of_day=start_time % MINUTES_PER_DAY)
+    expected_time *= time_multiplier(
+        agent.current_mode,
+        agent.model.congestion.along(origin, agent.current_objective['destination'])
+    )
     
     if actual_time > expected_time * 1.5:
         delay = actual_time - expected_time
-        route_key = (agent.pos, agent.current_objective['destination'])
-        
-        if route_key not in agent.learned_delays:
-            agent.learned_delays[route_key] = []
+        objective = agent.current_objective
+        route_key = agent.learned_delays.key(
+            origin,
+            objective['destination'],
+            objective['hour'] * 60 + objective['minute']
+        )
         
-        agent.learned_delays[route_key].append(delay)
+        agent.learned_delays.update(route_key, delay)
         
-        print(f"📚 Agente {agent.unique_id} aprendió delay de {delay} min en ruta")
+        agent.model.event_log.emit(
+            'delay_learned',
+            agent=agent.unique_id, mode=agent.current_mode, delay=delay
+        )
 
 
-def _estimate_travel_time(agent, mode, destination):
-    """Estima tiempo de viaje esperado"""
+def _estimate_travel_time(agent, mode, destination, origin=None, minute_of_day=None):
+    """
+    Estima tiempo de viaje esperado en ticks (por defecto desde la
+    posición actual)
+    
+    Con skim, los modos que corren en SUMO usan el tiempo por red del
+    skim (del tramo del día si lo tiene) pasado a ticks con los segundos
+    SUMO que avanza cada tick. Sin skim, o si el skim no tiene tiempo
+    para el par, se estima con la distancia y la velocidad del modo.
+    """
+    origin = origin if origin is not None else agent.pos
+    
+    skim_time = _skim_travel_time(agent.model, mode, origin, destination, minute_of_day)
+    if skim_time is not None:
+        return skim_time
+    
     mode_data = agent.model.modes_characteristics.get(mode, {})
     speed = mode_data.get('speed', 5)
     
-    if isinstance(agent.pos, tuple) and isinstance(destination, tuple):
-        distance = ((agent.pos[0] - destination[0])**2 + 
-                   (agent.pos[1] - destination[1])**2)**0.5
+    if isinstance(origin, tuple) and isinstance(destination, tuple):
+        distance = float(network_distances(agent.model.od_skim, [origin], [destination], mode)[0])
     else:
         distance = 10
     
     time = (distance / speed) * 60 if speed > 0 else 30
     
-    return time
\ No newline at end of file
+    return time
+
+
+def _skim_travel_time(model, mode, origin, destination, minute_of_day=None):
+    """Tiempo del skim en ticks, o None si no aplica"""
+    skim = model.od_skim
+    
+    # A pie no se simula en SUMO: su duración sale de la distancia
+    if skim is None or mode == 'walking' or mode not in skim.modes:
+        return None
+    if not (isinstance(origin, tuple) and isinstance(destination, tuple)):
+        return None
+    
+    second_of_day = minute_of_day * 60 if minute_of_day is not None else None
+    seconds = skim.time(mode, origin, destination, second_of_day)
+    
+    # Misma zona o sin camino: el skim no distingue el viaje
+    if not math.isfinite(seconds) or seconds <= 0:
+        return None
+    
+    connector = model.sumo_connector
+    return seconds / (connector.substeps * connector.step_length)
@@ -2,30 +2,38 @@
 Acción: Compartir información de tráfico con red social
 """
 
-def share_info(agent):
-    """Comparte información de congestión con amigos"""
+def observed_congestion(agent):
+    """Nivel de congestión que vive el vehículo del agente, o None (sin efectos)"""
     if not agent.in_transit or not agent.sumo_vehicle_id:
-        return
+        return None
     
     vehicle_data = agent.model.sumo_connector.get_vehicle_data(agent.sumo_vehicle_id)
     
     if not vehicle_data:
-        return
+        return None
     
     speed = vehicle_data.get('speed', 0)
     max_speed = vehicle_data.get('max_speed', 50)
     
     if speed < max_speed * 0.3:
-        congestion_level = 1 - (speed / max_speed)
-        
-        traffic_info = {
-            'location': agent.pos,
-            'severity': congestion_level,
-            'step': agent.model.schedule.steps,
-            'reporter': agent.unique_id
-        }
-        
-        for friend in agent.social_network:
-            friend.received_traffic_info.append(traffic_info)
-        
-        print(f"📢 Agente {agent.unique_id} reporta congestión nivel {congestion_level:.2f}")
\ No newline at end of file
+        return 1 - (speed / max_speed)
+    
+    return None
+
+
+def publish_congestion(agent, congestion_level):
+    """Publica el reporte a los amigos y avisa a la caché de rutas"""
+    # Un solo reporte en el bus; los amigos reciben una referencia
+    agent.model.traffic_bus.publish(
+        agent.unique_id,
+        agent.pos,
+        congestion_level,
+        agent.model.schedule.steps
+    )
+    
+    agent.model.sumo_connector.report_congestion(agent.pos, congestion_level)
+    
+    agent.model.event_log.emit(
+        'congestion_report',
+        agent=agent.unique_id, location=agent.pos, severity=congestion_level
+    )
\ No newline at end of file
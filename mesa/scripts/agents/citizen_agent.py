@@ -1,21 +1,36 @@
 """
 Agente ciudadano con comportamiento cognitivo y decisiones de movilidad
 """
+from collections import deque
 from mesa import Agent
+from utils.agent_store import ColumnMirror
+from utils.event_log import WARNING
 import random
 
-class CitizenAgent(Agent):
-    """Agente que representa una persona con rutinas, decisiones y movilidad"""
+# Viajes recientes que cada agente guarda en memoria; el historial completo
+# vive en la tabla de viajes del modelo
+TRAVEL_HISTORY_WINDOW = 20
+
+class CitizenBehavior:
+    """
+    Rutinas, decisiones y movilidad de una persona
     
-    def __init__(self, unique_id, model, profile_type):
-        super().__init__(unique_id, model)
+    Sin estado propio: lo comparten CitizenAgent (atributos en __dict__)
+    y StoredCitizenAgent (atributos en __slots__ y columnas del almacén).
+    """
+    __slots__ = ()
+    
+    def _init_citizen(self, model, profile_type):
+        """Estado inicial del ciudadano"""
+        # Subflujo aleatorio propio, derivado del RNG del modelo
+        self.rng = random.Random(model.random.getrandbits(64))
         
         self.profile_type = profile_type
         self.age = self._assign_age()
         self.color = self._assign_color()
         
-        self.has_car = random.random() < model.proba_car_per_type.get(profile_type, 0.5)
-        self.has_bike = random.random() < model.proba_bike_per_type.get(profile_type, 0.1)
+        self.has_car = self.rng.random() < model.proba_car_per_type.get(profile_type, 0.5)
+        self.has_bike = self.rng.random() < model.proba_bike_per_type.get(profile_type, 0.1)
         
         self.home_location = None
         self.work_location = None
@@ -25,21 +40,38 @@ class CitizenAgent(Agent):
         self.current_mode = None
         self.in_transit = False
         self.sumo_vehicle_id = None
+        self.walking_arrival_step = None
+        self.walking_destination = None
         
         self.daily_schedule = []
         self.trip_objectives = []
         self.current_objective = None
+        self.planned_mode = None
         
         self.weights = {}
         
-        self.travel_history = []
-        self.learned_delays = {}
-        
-        self.social_network = []
-        self.received_traffic_info = []
+        # Ventana de viajes recientes; se crea con el primer viaje
+        self.travel_history = None
+        self.learned_delays = model.delay_stats_for(profile_type)
         
         self.liveness = 360
-        
+    
+    def remember_trip(self, record):
+        """Agrega un viaje a la ventana de viajes recientes"""
+        if self.travel_history is None:
+            self.travel_history = deque(maxlen=TRAVEL_HISTORY_WINDOW)
+        self.travel_history.append(record)
+    
+    @property
+    def social_network(self):
+        """unique_id de los amigos en el grafo social del modelo"""
+        return self.model.social_graph.neighbors(self.unique_id)
+    
+    @property
+    def received_traffic_info(self):
+        """Reportes de tráfico vigentes recibidos de los amigos"""
+        return self.model.traffic_bus.inbox(self.unique_id, self.model.schedule.steps)
+    
     def _assign_age(self):
         """Asigna edad según perfil"""
         age_ranges = {
@@ -52,7 +84,7 @@ class CitizenAgent(Agent):
             "Retirees": (60, 85)
         }
         low, high = age_ranges.get(self.profile_type, (25, 65))
-        return random.randint(low, high)
+        return self.rng.randint(low, high)
     
     def _assign_color(self):
         """Asigna color según perfil"""
@@ -69,45 +101,113 @@ class CitizenAgent(Agent):
     
     def step(self):
         """Ejecutado cada tick de simulación"""
+        self.commit(self.decide())
+    
+    def decide(self):
+        """
+        Fase de decisión del tick, sin efectos sobre estado compartido
+        
+        Lee solo el estado del propio agente y lo que no cambia durante
+        la fase de agentes (snapshot de SUMO, mapa de congestión, skim) y
+        consume únicamente el rng del agente; los efectos quedan todos en
+        commit(). Para los agentes en viaje, utils.parallel_decide la
+        reproduce en lote: un cambio aquí debe reflejarse allí.
+        
+        Returns:
+            (inicio, resultado del viaje, congestión a reportar)
+        """
+        from actions.execute_trip import find_due_objective, trip_outcome
+        from actions.choose_mode import score_transport_mode
+        from actions.share_traffic_info import observed_congestion
+        
+        start = outcome = congestion = None
+        
         if not self.in_transit:
-            self._check_for_new_objective()
+            objective = find_due_objective(self)
+            if objective:
+                mode = self.planned_mode
+                scored = mode is None
+                if scored:
+                    mode = score_transport_mode(self, objective['destination'])
+                start = (objective, mode, scored)
+        else:
+            outcome = trip_outcome(self)
         
-        if self.in_transit and self.sumo_vehicle_id:
-            self._update_from_sumo()
+        # Un viaje recién iniciado aún no tiene datos en SUMO y uno
+        # completado ya no está en tránsito: ninguno reporta
+        if self.rng.random() < 0.1 and start is None and not (outcome and outcome[0] == 'complete'):
+            congestion = observed_congestion(self)
         
-        if random.random() < 0.1:
-            self._share_traffic_info()
+        return start, outcome, congestion
+    
+    def commit(self, plan):
+        """Fase de aplicación: movimientos, contadores, viajes y reportes"""
+        from actions.execute_trip import _start_trip, apply_trip_outcome
+        from actions.share_traffic_info import publish_congestion
         
-        if self.in_transit:
+        start, outcome, congestion = plan
+        
+        if not self.in_transit:
+            self.planned_mode = None
+            if start is not None:
+                objective, mode, scored = start
+                if scored:
+                    self.model.transport_usage[mode] += 1
+                _start_trip(self, objective, mode)
+        else:
+            apply_trip_outcome(self, outcome)
+        
+        if congestion is not None:
+            publish_congestion(self, congestion)
+        
+        # Una caminata termina en walking_arrival_step: el detector de
+        # atascos solo vigila vehículos SUMO
+        if self.in_transit and self.sumo_vehicle_id:
             self.liveness -= 1
             if self.liveness <= 0:
                 self._handle_stuck()
     
-    def _check_for_new_objective(self):
-        """Verifica si es hora de iniciar un nuevo viaje"""
-        from actions.execute_trip import check_and_execute_trip
-        check_and_execute_trip(self)
-    
-    def _update_from_sumo(self):
-        """Consulta estado del vehículo en SUMO"""
-        from actions.execute_trip import update_trip_status
-        update_trip_status(self)
-    
-    def _share_traffic_info(self):
-        """Comparte información de tráfico con red social"""
-        from actions.share_traffic_info import share_info
-        share_info(self)
-    
     def _handle_stuck(self):
         """Maneja agente atascado"""
-        print(f"⚠️ Agente {self.unique_id} atascado, reiniciando...")
+        self.model.event_log.emit('agent_stuck', WARNING, agent=self.unique_id)
         self.in_transit = False
         self.current_objective = None
         self.liveness = 360
         
         if self.sumo_vehicle_id:
+            self.model.vehicle_owners.pop(self.sumo_vehicle_id, None)
             try:
                 self.model.sumo_connector.remove_vehicle(self.sumo_vehicle_id)
             except:
                 pass
-            self.sumo_vehicle_id = None
\ No newline at end of file
+            self.sumo_vehicle_id = None
+
+
+class CitizenAgent(CitizenBehavior, Agent):
+    """Agente que representa una persona con rutinas, decisiones y movilidad"""
+    
+    def __init__(self, unique_id, model, profile_type):
+        super().__init__(unique_id, model)
+        self._init_citizen(model, profile_type)
+
+
+class StoredCitizenAgent(ColumnMirror, CitizenBehavior, Agent):
+    """
+    Ciudadano cuyo estado escalar vive en el AgentStore
+    
+    Los campos del almacén son propiedades sobre las columnas (ver
+    ColumnMirror) y el resto de los atributos va en __slots__, así que el
+    __dict__ heredado de mesa.Agent nunca se llega a crear.
+    """
+    __slots__ = (
+        'unique_id', 'model', 'pos', '_store', 'rng',
+        'sumo_vehicle_id', 'daily_schedule', 'trip_objectives', 'current_objective',
+        'planned_mode', 'weights', 'travel_history', 'learned_delays'
+    )
+    
+    def __init__(self, unique_id, model, profile_type):
+        self._store = model.agent_store
+        model.agent_store.allocate(unique_id)
+        
+        super().__init__(unique_id, model)
+        self._init_citizen(model, profile_type)
@@ -0,0 +1,235 @@
+"""
+Corridas headless y barridos de parámetros de MobilityModel
+
+Ejecuta el modelo por un número fijo de días simulados sin la interfaz
+web. Cada combinación de parámetros corre en un proceso del pool con su
+propia instancia de SUMO (libsumo en proceso, o un SUMO lanzado en un
+puerto distinto) y una semilla determinista. Los resultados se escriben
+en un único archivo Parquet a medida que terminan las corridas.
+
+Uso:
+    python scripts/batch_run.py --days 2 --n-agents 50 500 \\
+        --decision-method weighted_means topsis --weather 0.2 0.8 \\
+        --backend libsumo --workers 4 --output /app/results/sweep.parquet
+
+Con --from-checkpoint todas las corridas parten del mismo estado ya
+calentado (n_agents y grid_size salen del checkpoint) y siguen hasta el
+tick --days × 1440 contado desde el inicio de la corrida original.
+"""
+import argparse
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from models.mobility_model import MobilityModel
+
+MINUTES_PER_DAY = 1440
+
+
+def build_sweep(n_agents, grid_sizes, decision_methods, weathers, replicates, base_seed):
+    """Producto cartesiano de parámetros, con una semilla distinta por corrida"""
+    runs = []
+
+    combinations = itertools.product(n_agents, grid_sizes, decision_methods, weathers)
+    for n, size, method, weather in combinations:
+        for replicate in range(replicates):
+            run_id = len(runs)
+            runs.append({
+                'run_id': run_id,
+                'seed': base_seed + run_id,
+                'n_agents': n,
+                'grid_size': size,
+                'decision_method': method,
+                'weather': weather,
+                'replicate': replicate
+            })
+
+    return runs
+
+
+def run_model(params, days=1, backend="libsumo", sumo_config=None,
+              base_port=8813, sumo_host="sumo-server", checkpoint=None):
+    """
+    Ejecuta una corrida y retorna sus series como DataFrame
+
+    Con backend 'traci' se lanza un SUMO propio en base_port + run_id.
+    Con checkpoint, la corrida es una rama del estado guardado.
+    """
+    seed = params['seed']
+
+    if checkpoint is not None:
+        model = MobilityModel.restore(
+            checkpoint,
+            sumo_host=sumo_host,
+            sumo_port=base_port + params['run_id'],
+            sumo_backend=backend,
+            sumo_config=sumo_config,
+            sumo_launch=(backend == "traci"),
+            seed=seed,
+            decision_method=params['decision_method'],
+            weather_of_day=params['weather'],
+            checkpoint_every=0
+        )
+        model.fast_forward = True
+        params = dict(params, n_agents=model.n_agents, grid_size=model.grid.width)
+    else:
+        model = MobilityModel(
+            n_agents=params['n_agents'],
+            width=params['grid_size'],
+            height=params['grid_size'],
+            sumo_host=sumo_host,
+            sumo_port=base_port + params['run_id'],
+            sumo_backend=backend,
+            sumo_config=sumo_config,
+            sumo_launch=(backend == "traci"),
+            decision_method=params['decision_method'],
+            weather_of_day=params['weather'],
+            seed=seed,
+            fast_forward=True
+        )
+
+    try:
+        model.run_until(days * MINUTES_PER_DAY)
+    finally:
+        model.close()
+
+    df = model.datacollector.get_model_vars_dataframe().reset_index(drop=True)
+    df.insert(0, 'step', model.datacollector.get_steps())
+
+    for position, key in enumerate(['run_id', 'seed', 'n_agents', 'grid_size',
+                                    'decision_method', 'weather', 'replicate']):
+        value = params[key]
+        if key == 'weather' and value is None:
+            value = float('nan')
+        df.insert(position, key, value)
+
+    return df
+
+
+def run_sweep(runs, output, days=1, workers=None, **run_kwargs):
+    """
+    Ejecuta las corridas en un ProcessPoolExecutor y escribe cada resultado
+    al Parquet de salida apenas termina
+    """
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+
+    writer = None
+    completed = 0
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(run_model, params, days, **run_kwargs): params
+                for params in runs
+            }
+
+            for future in as_completed(futures):
+                params = futures[future]
+                try:
+                    df = future.result()
+                except Exception as e:
+                    print(f"💥 Corrida {params['run_id']} falló: {e}")
+                    continue
+
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(output, table.schema)
+                writer.write_table(table.cast(writer.schema))
+
+                completed += 1
+                print(f"✅ Corrida {params['run_id']} terminada ({completed}/{len(runs)})")
+    finally:
+        if writer is not None:
+            writer.close()
+
+    print(f"💾 {completed} corridas guardadas en {output}")
+    return completed
+
+
+def check_determinism(params, days=1, **run_kwargs):
+    """
+    Ejecuta la misma corrida dos veces en procesos separados y verifica que
+    la salida del DataCollector sea idéntica byte a byte
+    """
+    base_port = run_kwargs.pop('base_port', 8813)
+
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        # Puertos distintos por si el backend lanza un SUMO por corrida
+        futures = [
+            executor.submit(run_model, params, days, base_port=base_port + offset, **run_kwargs)
+            for offset in range(2)
+        ]
+        outputs = [future.result().to_csv(index=False).encode() for future in futures]
+
+    identical = outputs[0] == outputs[1]
+
+    if identical:
+        print(f"✅ Corrida determinista (seed {params['seed']}, {len(outputs[0])} bytes)")
+    else:
+        print(f"💥 Corridas con seed {params['seed']} difieren")
+
+    return identical
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Barridos headless de MobilityModel")
+    parser.add_argument("--days", type=int, default=1)
+    parser.add_argument("--n-agents", type=int, nargs="+", default=[50])
+    parser.add_argument("--grid-size", type=int, nargs="+", default=[50])
+    parser.add_argument("--decision-method", nargs="+", default=["weighted_means"],
+                        choices=["weighted_means", "topsis", "probabilistic", "lexicographic"])
+    parser.add_argument("--weather", type=float, nargs="+", default=None,
+                        help="Clima fijo por corrida (por defecto aleatorio cada día)")
+    parser.add_argument("--replicates", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--backend", choices=["libsumo", "traci"], default="libsumo")
+    parser.add_argument("--sumo-config", default=os.getenv("SUMO_CONFIG"))
+    parser.add_argument("--base-port", type=int, default=int(os.getenv("SUMO_PORT", "8813")))
+    parser.add_argument("--output", default="/app/results/sweep.parquet")
+    parser.add_argument("--from-checkpoint", default=None,
+                        help="Directorio de checkpoint desde el que parten todas las corridas")
+    parser.add_argument("--check-determinism", action="store_true",
+                        help="Corre la primera combinación dos veces y compara las salidas")
+    args = parser.parse_args()
+
+    if args.from_checkpoint:
+        # La población y la grilla vienen del checkpoint
+        args.n_agents, args.grid_size = [None], [None]
+
+    runs = build_sweep(
+        args.n_agents,
+        args.grid_size,
+        args.decision_method,
+        args.weather or [None],
+        args.replicates,
+        args.seed
+    )
+
+    run_kwargs = {
+        'backend': args.backend,
+        'sumo_config': args.sumo_config,
+        'base_port': args.base_port,
+        'checkpoint': args.from_checkpoint
+    }
+
+    if args.check_determinism:
+        identical = check_determinism(runs[0], args.days, **run_kwargs)
+        raise SystemExit(0 if identical else 1)
+
+    print(f"🚀 {len(runs)} corridas de {args.days} día(s) con backend {args.backend}")
+
+    run_sweep(
+        runs,
+        args.output,
+        days=args.days,
+        workers=args.workers,
+        **run_kwargs
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark de backends SUMO: TraCI remoto vs libsumo en proceso
+
+Mide ticks por segundo de MobilityModel para distintos tamaños de
+población. El backend 'traci' requiere el servidor SUMO levantado
+(docker-compose); 'libsumo' requiere SUMO_CONFIG o --sumo-config.
+
+Una fila solo es válida si SUMO siguió acoplado durante todo el loop:
+si la conexión se cae a mitad de camino el modelo sigue avanzando sin
+SUMO y los ticks/seg no miden el acoplamiento. Esas filas quedan
+marcadas como desacopladas y el script termina con código 1.
+
+Uso:
+    python scripts/benchmark_backends.py --agents 50 500 5000 --ticks 120
+"""
+import argparse
+import csv
+import os
+import time
+from models.mobility_model import MobilityModel
+
+
+def benchmark_backend(backend, n_agents, ticks, sumo_config=None):
+    """
+    Ejecuta `ticks` pasos del modelo y retorna (ticks/segundo, acoplado)
+
+    ticks/segundo es None si no hubo conexión; acoplado es False si la
+    conexión se perdió durante el loop.
+    """
+    model = MobilityModel(
+        n_agents=n_agents,
+        sumo_host=os.getenv("SUMO_HOST", "sumo-server"),
+        sumo_port=int(os.getenv("SUMO_PORT", "8813")),
+        sumo_backend=backend,
+        sumo_config=sumo_config
+    )
+
+    if not model.sumo_connector.connected:
+        model.close()
+        return None, False
+
+    start = time.perf_counter()
+    for _ in range(ticks):
+        model.step()
+    elapsed = time.perf_counter() - start
+
+    coupled = model.sumo_connector.connected
+    model.close()
+
+    return (ticks / elapsed if elapsed > 0 else float('inf')), coupled
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de backends SUMO")
+    parser.add_argument("--agents", type=int, nargs="+", default=[50, 500, 5000])
+    parser.add_argument("--ticks", type=int, default=120)
+    parser.add_argument("--backends", nargs="+", default=["traci", "libsumo"])
+    parser.add_argument("--sumo-config", default=os.getenv("SUMO_CONFIG"))
+    parser.add_argument("--output", default="/app/results/benchmark_backends.csv")
+    args = parser.parse_args()
+
+    results = []
+
+    for backend in args.backends:
+        for n_agents in args.agents:
+            print(f"⏱️ Backend {backend}, {n_agents} agentes, {args.ticks} ticks...")
+            ticks_per_sec, coupled = benchmark_backend(backend, n_agents, args.ticks, args.sumo_config)
+            if ticks_per_sec is not None and not coupled:
+                print("⚠️ SUMO se desconectó durante la corrida: la medición no es válida")
+            results.append({
+                'backend': backend,
+                'n_agents': n_agents,
+                'ticks': args.ticks,
+                'ticks_per_sec': ticks_per_sec,
+                'coupled': coupled
+            })
+
+    print("\n📊 Resultados (ticks/seg)")
+    print(f"{'backend':<10}{'agentes':>10}{'ticks/seg':>14}")
+    for row in results:
+        if row['ticks_per_sec'] is None:
+            value = "sin conexión"
+        elif not row['coupled']:
+            value = "desacoplado"
+        else:
+            value = f"{row['ticks_per_sec']:.2f}"
+        print(f"{row['backend']:<10}{row['n_agents']:>10}{value:>14}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=['backend', 'n_agents', 'ticks',
+                                                   'ticks_per_sec', 'coupled'])
+            writer.writeheader()
+            writer.writerows(results)
+        print(f"💾 Resultados guardados en {args.output}")
+
+    if any(row['ticks_per_sec'] is not None and not row['coupled'] for row in results):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
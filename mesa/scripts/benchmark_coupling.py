@@ -0,0 +1,166 @@
+"""
+Benchmark del acoplamiento Mesa ↔ SUMO: llamadas por hora simulada
+
+Envuelve el módulo del backend (traci o libsumo) con un proxy que cuenta
+cada llamada a la API y ejecuta una hora simulada de Mesa (60 ticks) con
+distintos `substeps` por tick. Con traci, las lecturas de resultados de
+suscripción son locales y no cuentan como round trip.
+
+Para substeps > 1 se informa también cuántos round trips costaría cubrir
+el mismo tiempo SUMO con un simulationStep() por subpaso.
+
+Uso:
+    python scripts/benchmark_coupling.py --agents 200 --substeps 1 60 \\
+        --backend traci --launch --sumo-config /app/network/config.sumocfg
+"""
+import argparse
+import csv
+import inspect
+import os
+from collections import Counter
+
+from models.mobility_model import MobilityModel
+
+TICKS_PER_HOUR = 60
+
+# Lecturas que traci resuelve sin ir al servidor
+LOCAL_CALLS = {
+    'getSubscriptionResults',
+    'getAllSubscriptionResults',
+    'getContextSubscriptionResults',
+    'getAllContextSubscriptionResults'
+}
+
+
+class _CountingDomain:
+    """Proxy de un dominio TraCI (vehicle, simulation, ...) que cuenta llamadas"""
+
+    def __init__(self, name, domain, counts):
+        self._name = name
+        self._domain = domain
+        self._counts = counts
+
+    def __getattr__(self, attr):
+        value = getattr(self._domain, attr)
+        if not callable(value):
+            return value
+
+        key = f"{self._name}.{attr}"
+        counts = self._counts
+
+        def counted(*args, **kwargs):
+            counts[key] += 1
+            return value(*args, **kwargs)
+
+        return counted
+
+
+class CountingBackend:
+    """Proxy del módulo traci/libsumo que cuenta las llamadas por función"""
+
+    def __init__(self, module):
+        self._module = module
+        self.counts = Counter()
+
+    def __getattr__(self, attr):
+        value = getattr(self._module, attr)
+
+        # traci expone dominios como módulos y libsumo como clases
+        if inspect.isroutine(value):
+            counts = self.counts
+
+            def counted(*args, **kwargs):
+                counts[attr] += 1
+                return value(*args, **kwargs)
+
+            return counted
+
+        return _CountingDomain(attr, value, self.counts)
+
+    def round_trips(self):
+        return sum(n for key, n in self.counts.items()
+                   if key.rsplit('.', 1)[-1] not in LOCAL_CALLS)
+
+
+def benchmark_coupling(substeps, n_agents, hours, backend, sumo_config=None,
+                       launch=False, seed=0):
+    """Ejecuta `hours` horas simuladas y retorna las llamadas por hora"""
+    model = MobilityModel(
+        n_agents=n_agents,
+        sumo_host=os.getenv("SUMO_HOST", "sumo-server"),
+        sumo_port=int(os.getenv("SUMO_PORT", "8813")),
+        sumo_backend=backend,
+        sumo_config=sumo_config,
+        sumo_launch=launch,
+        sumo_substeps=substeps,
+        seed=seed
+    )
+
+    connector = model.sumo_connector
+    if not connector.connected:
+        model.close()
+        return None
+
+    counting = CountingBackend(connector._sumo)
+    connector._sumo = counting
+
+    sumo_start = connector.sim_time
+    ticks = hours * TICKS_PER_HOUR
+    for _ in range(ticks):
+        model.step()
+    sumo_seconds = connector.sim_time - sumo_start
+
+    connector._sumo = counting._module
+    model.close()
+
+    round_trips = counting.round_trips() / hours
+    steps = counting.counts['simulationStep'] / hours
+
+    return {
+        'substeps': substeps,
+        'n_agents': n_agents,
+        'round_trips_per_hour': round_trips,
+        'simulation_steps_per_hour': steps,
+        'sumo_seconds_per_hour': sumo_seconds / hours,
+        'unit_step_round_trips_per_hour': round_trips + (substeps - 1) * steps
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Round trips Mesa ↔ SUMO por hora simulada")
+    parser.add_argument("--agents", type=int, default=200)
+    parser.add_argument("--hours", type=int, default=1)
+    parser.add_argument("--substeps", type=int, nargs="+", default=[1, 60])
+    parser.add_argument("--backend", choices=["traci", "libsumo"], default="libsumo")
+    parser.add_argument("--sumo-config", default=os.getenv("SUMO_CONFIG"))
+    parser.add_argument("--launch", action="store_true",
+                        help="Con traci, lanza un SUMO local en vez de usar el servidor")
+    parser.add_argument("--output", default="/app/results/benchmark_coupling.csv")
+    args = parser.parse_args()
+
+    results = []
+
+    for substeps in args.substeps:
+        print(f"⏱️ {substeps} subpasos por tick, {args.agents} agentes, {args.hours} h...")
+        row = benchmark_coupling(substeps, args.agents, args.hours, args.backend,
+                                 args.sumo_config, args.launch)
+        if row is not None:
+            results.append(row)
+
+    print("\n📊 Resultados por hora simulada")
+    print(f"{'subpasos':>9}{'round trips':>13}{'seg. SUMO':>11}{'con pasos unitarios':>21}")
+    for row in results:
+        print(f"{row['substeps']:>9}{row['round_trips_per_hour']:>13.0f}"
+              f"{row['sumo_seconds_per_hour']:>11.0f}{row['unit_step_round_trips_per_hour']:>21.0f}")
+
+    if args.output and results:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(results[0].keys()))
+            writer.writeheader()
+            writer.writerows(results)
+        print(f"💾 Resultados guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
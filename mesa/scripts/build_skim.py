@@ -0,0 +1,75 @@
+"""
+Construye el skim origen-destino de un escenario (ver utils/od_skim.py)
+
+Lee la red con sumolib, calcula distancias y tiempos a flujo libre por
+modo entre todas las zonas de la grilla y los guarda como .npy +
+metadata.json. Con --edgedata (salida edgeData de SUMO) agrega tiempos
+por intervalo con las velocidades observadas.
+
+Uso:
+    python scripts/build_skim.py --net-file /app/network/red.net.xml \\
+        --output /app/results/skim --zone-size 5
+"""
+import argparse
+import os
+import time
+
+from utils.od_skim import ODSkim, MODE_VCLASS
+from utils.projection import Projection
+
+
+def read_edgedata(path):
+    """Intervalos [(inicio, fin, {edge_id: velocidad})] de un archivo edgeData"""
+    import sumolib
+
+    intervals = []
+
+    for interval in sumolib.xml.parse(path, 'interval'):
+        speeds = {
+            edge.id: float(edge.speed)
+            for edge in interval.getChild('edge') or []
+            if edge.hasAttribute('speed')
+        }
+        intervals.append((float(interval.begin), float(interval.end), speeds))
+
+    return intervals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Skim origen-destino precalculado")
+    parser.add_argument("--net-file", default=os.getenv("SUMO_NET_FILE"))
+    parser.add_argument("--output", default=os.getenv("OD_SKIM_PATH", "/app/results/skim"))
+    parser.add_argument("--width", type=int, default=50)
+    parser.add_argument("--height", type=int, default=50)
+    parser.add_argument("--zone-size", type=int, default=5)
+    parser.add_argument("--scale", type=float, default=10.0)
+    parser.add_argument("--modes", nargs="+", default=list(MODE_VCLASS))
+    parser.add_argument("--edgedata", help="Salida edgeData de SUMO para tiempos por tramo")
+    args = parser.parse_args()
+
+    if not args.net_file:
+        parser.error("Falta --net-file (o SUMO_NET_FILE)")
+
+    import sumolib
+
+    start = time.perf_counter()
+    print(f"🗺️ Leyendo red {args.net_file}...")
+    net = sumolib.net.readNet(args.net_file)
+    projection = Projection.from_net_file(args.net_file, scale=args.scale)
+
+    intervals = read_edgedata(args.edgedata) if args.edgedata else None
+
+    skim = ODSkim.build(
+        net, projection, args.width, args.height,
+        zone_size=args.zone_size, modes=args.modes, intervals=intervals
+    )
+    skim.metadata['net_file'] = os.path.abspath(args.net_file)
+    skim.save(args.output)
+
+    print(f"✅ Skim de {skim.n_zones} zonas × {len(skim.modes)} modos "
+          f"({len(skim.time_slots)} tramos) en {time.perf_counter() - start:.1f} s")
+    print(f"💾 Guardado en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
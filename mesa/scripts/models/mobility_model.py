@@ -2,32 +2,116 @@
 Modelo principal de simulación de movilidad
 """
 from mesa import Model
-from mesa.time import RandomActivation
 from mesa.space import MultiGrid
-from mesa.datacollection import DataCollector
-from agents.citizen_agent import CitizenAgent
+from agents.citizen_agent import CitizenAgent, StoredCitizenAgent
+from models.schedulers import EventDrivenActivation
 from utils.sumo_connector import SumoConnector
 from utils.data_loader import DataLoader
-import random
+from utils.agent_store import AgentStore
+from utils.buffered_collector import BufferedDataCollector
+from utils.event_log import EventLog
+from utils.trip_table import TripTable
+from utils.delay_stats import DelayStats
+from utils.social_graph import SocialGraph
+from utils.traffic_bus import TrafficBus
+from utils.congestion_grid import CongestionGrid
+from utils.od_skim import ODSkim, METADATA_FILE
+from utils.decision_table import DecisionTable
+from utils.departure_calendar import DepartureCalendar, MINUTES_PER_DAY
+from utils.checkpoint import (METADATA_FILE as CHECKPOINT_METADATA, SUMO_STATE_FILE,
+                              checkpoint_path, latest_checkpoint, read_checkpoint,
+                              write_checkpoint)
+from actions.choose_mode import sync_decision_table
+from collections import Counter
+import numpy as np
+import os
+
+# Atributos del proceso: no van en los checkpoints y se recrean al restaurar
+RUNTIME_ATTRIBUTES = ('sumo_connector', 'event_log', 'route_prefetcher', 'od_skim')
+
+
+def _activity_count(model, *activities):
+    """Agentes en alguna de las actividades (de la columna si hay almacén columnar)"""
+    if model.agent_store is not None:
+        return model.agent_store.count('current_activity', activities)
+    return sum(model.activity_counts[activity] for activity in activities)
+
+
+def _model_reporters():
+    """Series del modelo (también se reasocian al restaurar un checkpoint)"""
+    return {
+        "Walking": lambda m: m.transport_usage["walking"],
+        "Bike": lambda m: m.transport_usage["bike"],
+        "Car": lambda m: m.transport_usage["car"],
+        "Bus": lambda m: m.transport_usage["bus"],
+        "Home": lambda m: _activity_count(m, "home"),
+        "Work": lambda m: _activity_count(m, "work", "school"),
+        "Leisure": lambda m: _activity_count(m, "leisure")
+    }
+
 
 class MobilityModel(Model):
     """Modelo de simulación de movilidad urbana"""
     
     def __init__(self, n_agents=50, width=50, height=50, 
-                 sumo_host="sumo-server", sumo_port=8813):
+                 sumo_host="sumo-server", sumo_port=8813,
+                 sumo_backend=None, sumo_config=None,
+                 decision_method="weighted_means", columnar_agents=False,
+                 collect_every=1, collect_on_change=False,
+                 weather_of_day=None, sumo_launch=False, seed=None,
+                 event_log_path=None, trip_table_path=None,
+                 social_graph="small_world", social_degree=6,
+                 congestion_decay=0.9, sumo_substeps=None, fast_forward=False,
+                 od_skim_path=None, route_prefetch=None, decide_workers=None,
+                 decision_table=None, checkpoint_every=None, checkpoint_dir=None,
+                 route_invalidation_threshold=None):
         super().__init__()
         
         self.n_agents = n_agents
+        self.decision_method = decision_method
+        self.fast_forward = fast_forward
+        self.horizon = None
+        self.skipped_steps = 0
         self.grid = MultiGrid(width, height, torus=False)
-        self.schedule = RandomActivation(self)
+        self.departure_calendar = DepartureCalendar()
         
-        # Conexión SUMO
-        self.sumo_connector = SumoConnector(
-            sumo_host, 
-            sumo_port, 
-            mesa_to_sumo_scale=10.0
+        # Procesos de la fase de decisión de los viajeros (1 = activación
+        # serial) y viajeros por tanda (o DECIDE_WORKERS / DECIDE_CHUNK)
+        if decide_workers is None:
+            decide_workers = int(os.getenv("DECIDE_WORKERS", "1"))
+        self.schedule = EventDrivenActivation(
+            self, self.departure_calendar, workers=decide_workers,
+            chunk_size=int(os.getenv("DECIDE_CHUNK", "2048"))
+        )
+        
+        # Severidad de congestión reportada desde la que se invalidan las
+        # rutas cacheadas que cruzan la zona (o ROUTE_CACHE_INVALIDATION_THRESHOLD)
+        self.route_invalidation_threshold = route_invalidation_threshold
+        
+        # Log de eventos, conexión SUMO y prefetch de rutas
+        self._open_runtime(
+            sumo_host, sumo_port, sumo_backend, sumo_config, sumo_launch,
+            sumo_seed=seed if isinstance(seed, int) else None,
+            sumo_substeps=sumo_substeps,
+            event_log_path=event_log_path,
+            route_prefetch=route_prefetch
         )
         
+        # Checkpoints periódicos (cada N ticks o CHECKPOINT_EVERY; 0 = no)
+        self._configure_checkpoints(checkpoint_every, checkpoint_dir)
+        
+        # Vehículo SUMO -> agente dueño, para entregar llegadas en lote
+        self.vehicle_owners = {}
+        
+        # Mapa de congestión alimentado por las estadísticas de edges de SUMO
+        self.congestion = CongestionGrid(width, height, decay=congestion_decay)
+        if self.sumo_connector.connected:
+            self.congestion.bind_edges(*self.sumo_connector.edge_layout())
+        
+        # Skim origen-destino precalculado (build_skim.py); sin él, línea recta
+        self.od_skim_path = od_skim_path or os.getenv("OD_SKIM_PATH")
+        self.od_skim = self._load_od_skim(self.od_skim_path)
+        
         # Cargar datos
         self.data_loader = DataLoader()
         self.proba_car_per_type = self.data_loader.load_proba_car()
@@ -37,9 +121,40 @@ class MobilityModel(Model):
         self.modes_characteristics = self.data_loader.load_modes()
         self.activity_per_profile = self.data_loader.load_activities()
         
+        # Almacén columnar opcional para poblaciones grandes
+        self.agent_store = None
+        if columnar_agents:
+            self.agent_store = AgentStore(
+                capacity=n_agents,
+                categories={
+                    'profile_type': list(self.proportion_per_type.keys()),
+                    'current_activity': ["home", "work", "school", "leisure"],
+                    'current_mode': list(self.modes_characteristics.keys())
+                }
+            )
+        
+        # Tabla memoizada de decisiones de modo (True, una DecisionTable
+        # con otra cuantización, o DECISION_TABLE=1)
+        if decision_table is None:
+            decision_table = os.getenv("DECISION_TABLE", "0") == "1"
+        if decision_table is True:
+            decision_table = DecisionTable()
+        self.decision_table = decision_table if decision_table is not False else None
+        
         # Clima
         self.weather_impact = True
-        self.weather_of_day = random.uniform(0, 1)
+        self.fixed_weather = weather_of_day
+        self.weather_of_day = weather_of_day if weather_of_day is not None else self.random.uniform(0, 1)
+        
+        # Tabla de viajes completados (se vuelca a Parquet con path o TRIP_TABLE_PATH)
+        modes = list(self.modes_characteristics.keys())
+        if trip_table_path is not None:
+            self.trip_table = TripTable(path=trip_table_path, modes=modes)
+        else:
+            self.trip_table = TripTable.from_env(modes=modes)
+        
+        # Delays aprendidos, compartidos por perfil
+        self.delay_stats = {}
         
         # Estadísticas
         self.transport_usage = {
@@ -49,61 +164,397 @@ class MobilityModel(Model):
             "bus": 0
         }
         
+        # Contadores de actividad, actualizados al completar cada viaje
+        self.activity_counts = Counter()
+        
         # Data collection
-        self.datacollector = DataCollector(
-            model_reporters={
-                "Walking": lambda m: m.transport_usage["walking"],
-                "Bike": lambda m: m.transport_usage["bike"],
-                "Car": lambda m: m.transport_usage["car"],
-                "Bus": lambda m: m.transport_usage["bus"],
-                "Home": lambda m: sum(1 for a in m.schedule.agents if a.current_activity == "home"),
-                "Work": lambda m: sum(1 for a in m.schedule.agents if a.current_activity in ["work", "school"]),
-                "Leisure": lambda m: sum(1 for a in m.schedule.agents if a.current_activity == "leisure")
-            }
+        self.datacollector = BufferedDataCollector(
+            model_reporters=_model_reporters(),
+            collect_every=collect_every,
+            on_change=collect_on_change
         )
         
         # Crear agentes
         self._create_agents()
         
+        # Red social y bus de reportes de tráfico
+        self.social_graph = self._build_social_graph(social_graph, social_degree)
+        self.traffic_bus = TrafficBus(self.social_graph)
+        
         print(f"✅ Modelo inicializado con {n_agents} agentes")
     
+    def _open_runtime(self, sumo_host, sumo_port, sumo_backend, sumo_config, sumo_launch,
+                      sumo_seed=None, sumo_substeps=None, event_log_path=None,
+                      route_prefetch=None):
+        """Crea lo que pertenece al proceso: log de eventos, conexión SUMO y prefetch"""
+        # Log de eventos (deshabilitado si no hay path ni EVENT_LOG_PATH)
+        if event_log_path is not None:
+            self.event_log = EventLog(event_log_path, clock=self._current_step)
+        else:
+            self.event_log = EventLog.from_env(clock=self._current_step)
+        
+        # Conexión SUMO
+        self.sumo_connector = SumoConnector(
+            sumo_host, 
+            sumo_port, 
+            mesa_to_sumo_scale=10.0,
+            backend=sumo_backend,
+            sumo_config=sumo_config,
+            launch=sumo_launch,
+            sumo_seed=sumo_seed,
+            event_log=self.event_log,
+            substeps=sumo_substeps,
+            congestion_invalidation_threshold=self.route_invalidation_threshold
+        )
+        
+        # Prefetch de rutas de las agendas en un hilo de fondo (ROUTE_PREFETCH=1)
+        if route_prefetch is None:
+            route_prefetch = os.getenv("ROUTE_PREFETCH", "0") == "1"
+        self.route_prefetcher = self.sumo_connector.enable_prefetch() if route_prefetch else None
+    
+    def _configure_checkpoints(self, checkpoint_every, checkpoint_dir):
+        if checkpoint_every is None:
+            checkpoint_every = int(os.getenv("CHECKPOINT_EVERY", "0"))
+        self.checkpoint_every = checkpoint_every or None
+        self.checkpoint_dir = checkpoint_dir or os.getenv("CHECKPOINT_DIR", "checkpoints")
+    
+    def record_activity_change(self, old_activity, new_activity):
+        """Actualiza los contadores cuando un agente cambia de actividad"""
+        self.activity_counts[old_activity] -= 1
+        self.activity_counts[new_activity] += 1
+    
+    def delay_stats_for(self, profile):
+        """Estadística de delays compartida por los agentes de un perfil"""
+        stats = self.delay_stats.get(profile)
+        if stats is None:
+            stats = self.delay_stats[profile] = DelayStats()
+        return stats
+    
+    def _load_od_skim(self, path):
+        """Abre el skim si existe y corresponde a la grilla del modelo"""
+        if not path or not os.path.exists(os.path.join(path, METADATA_FILE)):
+            return None
+        
+        skim = ODSkim.load(path)
+        
+        if (skim.width, skim.height) != (self.grid.width, self.grid.height):
+            print(f"⚠️ Skim {path} es para una grilla {skim.width}x{skim.height}, se ignora")
+            return None
+        
+        print(f"🧭 Skim OD cargado: {skim.n_zones} zonas, modos {', '.join(skim.modes)}")
+        return skim
+    
     def _create_agents(self):
         """Crea los agentes ciudadanos"""
         from actions.create_objectives import create_daily_schedule
         
+        agent_class = StoredCitizenAgent if self.agent_store is not None else CitizenAgent
+        
         for i in range(self.n_agents):
             profile = self._select_profile()
             
-            agent = CitizenAgent(i, self, profile)
+            agent = agent_class(i, self, profile)
             
             x = self.random.randrange(self.grid.width)
             y = self.random.randrange(self.grid.height)
             self.grid.place_agent(agent, (x, y))
             
             self.schedule.add(agent)
+            self.activity_counts[agent.current_activity] += 1
             
             create_daily_schedule(agent)
     
+    def _build_social_graph(self, kind, degree):
+        """Genera la red social: 'small_world', 'profile_blocks' o None (sin amigos)"""
+        rng = np.random.default_rng(self.random.getrandbits(64))
+        
+        if kind == "small_world":
+            return SocialGraph.small_world(self.n_agents, degree=degree, rng=rng)
+        
+        if kind == "profile_blocks":
+            agents = sorted(self.schedule.agents, key=lambda a: a.unique_id)
+            profiles = [agent.profile_type for agent in agents]
+            return SocialGraph.stochastic_block(
+                profiles,
+                degree_in=degree * 0.8,
+                degree_out=degree * 0.2,
+                rng=rng
+            )
+        
+        return SocialGraph.from_edges(self.n_agents, [], [])
+    
     def _select_profile(self):
         """Selecciona perfil según proporciones"""
         profiles = list(self.proportion_per_type.keys())
         weights = list(self.proportion_per_type.values())
-        return random.choices(profiles, weights=weights)[0]
+        return self.random.choices(profiles, weights=weights)[0]
     
     def step(self):
-        """Avanza un paso la simulación"""
+        """Avanza un paso la simulación (o salta un periodo inactivo)"""
+        previous = self.schedule.steps
+        self._update_prefetch_window()
+        sync_decision_table(self)
+        
+        if self.fast_forward:
+            target = self._idle_until()
+            if target is not None:
+                self._skip_to(target)
+                self._periodic_checkpoint(previous)
+                return
+        
         self.schedule.step()
+        self._flush_spawns()
         
         self.sumo_connector.simulation_step()
+        self._deliver_vehicle_events()
+        self.congestion.update(self.sumo_connector.edge_snapshot)
         
         self.datacollector.collect(self)
         
-        if self.schedule.steps % 1440 == 0:
-            self.weather_of_day = random.uniform(0, 1)
+        self._new_day_weather()
+        self._periodic_checkpoint(previous)
+    
+    def _update_prefetch_window(self):
+        """El prefetch trabaja solo mientras nadie tiene salida en el tick"""
+        if self.route_prefetcher is None:
+            return
+        
+        due = self.departure_calendar.next_due_step()
+        self.route_prefetcher.set_quiet(due is None or due > self.schedule.steps)
+    
+    def _new_day_weather(self):
+        """Sortea el clima al comenzar cada día (si no es fijo)"""
+        if self.schedule.steps % MINUTES_PER_DAY == 0 and self.fixed_weather is None:
+            self.weather_of_day = self.random.uniform(0, 1)
+    
+    def run_until(self, step):
+        """Avanza hasta el tick `step`; los saltos no lo sobrepasan"""
+        self.horizon = step
+        try:
+            while self.schedule.steps < step:
+                self.step()
+        finally:
+            self.horizon = None
+    
+    def _idle_until(self):
+        """
+        Tick hasta el que no pasa nada, o None si hay que simular este
+        
+        Inactivo = nadie en viaje y ninguna salida agendada antes del
+        tick objetivo. El salto se corta al comienzo del día siguiente
+        (sorteo de clima) y en el horizonte de run_until.
+        """
+        if self.schedule.travelers:
+            return None
+        
+        current = self.schedule.steps
+        target = (current // MINUTES_PER_DAY + 1) * MINUTES_PER_DAY
+        
+        next_due = self.departure_calendar.next_due_step()
+        if next_due is not None:
+            target = min(target, next_due)
+        if self.horizon is not None:
+            target = min(target, self.horizon)
+        
+        # Saltar un solo tick no ahorra nada
+        return target if target - current >= 2 else None
+    
+    def _skip_to(self, target):
+        """Avanza reloj, SUMO y series hasta `target` en un solo movimiento"""
+        ticks = target - self.schedule.steps
+        first = self.schedule.steps + 1
+        
+        self.schedule.steps += ticks
+        self.schedule.time += ticks
+        self.skipped_steps += ticks
+        
+        self.sumo_connector.advance(ticks)
+        self._deliver_vehicle_events()
+        self.congestion.update(self.sumo_connector.edge_snapshot, steps=ticks)
+        
+        self.datacollector.fill(self, first, target)
+        
+        self._new_day_weather()
+    
+    def _flush_spawns(self):
+        """Inserta los vehículos pedidos en el tick y avisa los fallos a sus agentes"""
+        from actions.execute_trip import handle_spawn_failure
+        
+        failed = self.sumo_connector.flush_spawns()
+        
+        for vehicle_id in sorted(failed):
+            agent = self.vehicle_owners.get(vehicle_id)
+            if agent is not None:
+                handle_spawn_failure(agent, vehicle_id, failed[vehicle_id])
+    
+    def _deliver_vehicle_events(self):
+        """
+        Entrega en lote las salidas, teletransportes y llegadas de la
+        ventana de SUMO a los agentes dueños de los vehículos
+        """
+        from actions.execute_trip import deliver_departure, deliver_teleport, deliver_arrival
+        
+        connector = self.sumo_connector
+        
+        for vehicle_id in sorted(connector.departed_vehicles):
+            agent = self.vehicle_owners.get(vehicle_id)
+            if agent is not None:
+                deliver_departure(agent, vehicle_id)
+        
+        for vehicle_id in sorted(connector.teleported_vehicles):
+            agent = self.vehicle_owners.get(vehicle_id)
+            if agent is not None:
+                deliver_teleport(agent, vehicle_id)
+        
+        for vehicle_id in sorted(connector.arrived_vehicles):
+            agent = self.vehicle_owners.get(vehicle_id)
+            if agent is not None and deliver_arrival(agent, vehicle_id):
+                self.schedule.release(agent)
+    
+    def _periodic_checkpoint(self, previous):
+        """Checkpoint al primer tick alcanzado tras cada múltiplo de checkpoint_every"""
+        every = self.checkpoint_every
+        if every and self.schedule.steps // every > previous // every:
+            self.checkpoint()
+    
+    def checkpoint(self, path=None):
+        """
+        Guarda el estado de SUMO y un snapshot del modelo en `path`
+        (por defecto checkpoint_dir/step_NNNNNNN) y retorna el directorio
+        
+        Se llama entre ticks: la cola de inserciones ya está vacía y el
+        snapshot del conector corresponde al último paso de SUMO.
+        """
+        step = self.schedule.steps
+        path = os.path.abspath(path or checkpoint_path(self.checkpoint_dir, step))
+        os.makedirs(path, exist_ok=True)
+        
+        connector_state = self.sumo_connector.save_state(os.path.join(path, SUMO_STATE_FILE))
+        if connector_state is None:
+            print(f"⚠️ Checkpoint del tick {step} sin estado SUMO (sin conexión o error al guardar)")
+        
+        write_checkpoint(
+            path,
+            {'model': self, 'connector': connector_state},
+            {
+                'step': step,
+                'n_agents': self.n_agents,
+                'width': self.grid.width,
+                'height': self.grid.height,
+                'decision_method': self.decision_method,
+                'sim_time': self.sumo_connector.sim_time,
+                'sumo_state': connector_state is not None,
+                'sumo_substeps': self.sumo_connector.substeps
+            }
+        )
+        
+        self.event_log.emit('checkpoint_saved', path=path)
+        print(f"💾 Checkpoint del tick {step} en {path}")
+        return path
+    
+    @classmethod
+    def restore(cls, path, sumo_host="sumo-server", sumo_port=8813,
+                sumo_backend=None, sumo_config=None, sumo_launch=False,
+                event_log_path=None, trip_table_path=None, route_prefetch=None,
+                decide_workers=None, checkpoint_every=None, checkpoint_dir=None,
+                seed=None, decision_method=None, weather_of_day=None):
+        """
+        Modelo en el estado de un checkpoint, conectado a un SUMO nuevo
+        
+        SUMO arranca con su configuración y carga el estado guardado: sirve
+        para retomar tras una caída del servidor y para ramificar un barrido
+        desde un estado ya calentado. seed, decision_method y weather_of_day
+        cambian la rama; sin ellos la corrida sigue como si no se hubiera
+        cortado. La cadencia de checkpoints y los procesos de decisión se
+        conservan salvo que se indiquen. Los viajes volcados desde aquí van a una parte nueva de
+        la tabla de viajes (ver read_trips).
+        
+        `path` puede ser un checkpoint o un checkpoint_dir; en ese caso se
+        usa el checkpoint completo más reciente.
+        """
+        if not os.path.exists(os.path.join(path, CHECKPOINT_METADATA)):
+            path = latest_checkpoint(path) or path
+        
+        snapshot, metadata = read_checkpoint(path)
+        model = snapshot['model']
+        connector_state = snapshot['connector']
+        
+        model._open_runtime(
+            sumo_host, sumo_port, sumo_backend, sumo_config, sumo_launch,
+            sumo_seed=model._seed if isinstance(model._seed, int) else None,
+            sumo_substeps=metadata['sumo_substeps'],
+            event_log_path=event_log_path,
+            route_prefetch=route_prefetch
+        )
+        
+        sumo_state = os.path.join(os.path.abspath(path), SUMO_STATE_FILE)
+        if connector_state is None or not model.sumo_connector.load_state(sumo_state, connector_state):
+            print("⚠️ Sin estado SUMO: los vehículos en curso no se recuperan")
+        
+        model.od_skim = model._load_od_skim(model.od_skim_path)
+        model.datacollector.bind(_model_reporters())
+        
+        if trip_table_path is None:
+            trip_table_path = os.getenv("TRIP_TABLE_PATH") or None
+        model.trip_table.redirect(trip_table_path, step=metadata['step'])
+        
+        if decide_workers is not None:
+            model.schedule.workers = max(1, int(decide_workers))
+        if checkpoint_every is not None:
+            model.checkpoint_every = checkpoint_every or None
+        if checkpoint_dir is not None:
+            model.checkpoint_dir = checkpoint_dir
+        
+        if seed is not None:
+            model.reseed(seed)
+        if decision_method is not None:
+            model.decision_method = decision_method
+        if weather_of_day is not None:
+            model.fixed_weather = model.weather_of_day = weather_of_day
+        
+        model.event_log.emit('checkpoint_restored', path=path)
+        print(f"♻️ Modelo restaurado desde {path} (tick {metadata['step']})")
+        return model
+    
+    def reseed(self, seed):
+        """Nueva semilla para el modelo y los agentes (ramas de un mismo checkpoint)"""
+        self._seed = seed
+        self.random.seed(seed)
+        
+        for agent in sorted(self.schedule.agents, key=lambda a: a.unique_id):
+            agent.rng.seed(self.random.getrandbits(64))
+    
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for name in RUNTIME_ATTRIBUTES:
+            state[name] = None
+        state['horizon'] = None
+        state.pop('_closed', None)
+        return state
+    
+    def _current_step(self):
+        return self.schedule.steps
+    
+    def close(self):
+        """Cierra la conexión SUMO y vacía el log de eventos y la tabla de viajes"""
+        if getattr(self, '_closed', False):
+            return
+        self._closed = True
+        
+        self.schedule.close()
+        self.sumo_connector.close()
+        
+        if self.decision_table is not None:
+            stats = self.decision_table.stats()
+            print(f"🧮 Tabla de decisiones: {stats['size']} contextos, "
+                  f"hit rate {stats['hit_rate']:.2f}, "
+                  f"discrepancia auditada {stats['disagreement_rate']:.3f}")
+        self.trip_table.close()
+        self.event_log.close()
     
     def __del__(self):
         """Limpieza al destruir el modelo"""
         try:
-            self.sumo_connector.close()
+            self.close()
         except:
             pass
\ No newline at end of file
@@ -0,0 +1,136 @@
+"""
+Schedulers del modelo de movilidad
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from mesa.time import RandomActivation
+
+from utils import parallel_decide
+
+
+class EventDrivenActivation(RandomActivation):
+    """
+    Activa en orden aleatorio solo a los agentes con una salida agendada
+    en el tick o que están en viaje
+
+    Los agentes ociosos no se activan: el costo por tick depende de
+    cuántos salen o viajan, no del tamaño de la población.
+
+    Con workers > 1, la decisión de los agentes en viaje se evalúa por
+    tandas de chunk_size en un pool de procesos antes de activarlos (ver
+    utils.parallel_decide); luego cada agente aplica su plan en serie, en
+    el mismo orden aleatorio, con el mismo resultado que la activación
+    serial. Los que no viajan deciden en serie, al activarse.
+    """
+
+    def __init__(self, model, calendar, workers=1, chunk_size=2048):
+        super().__init__(model)
+        self.calendar = calendar
+        self.travelers = {}
+
+        self.workers = max(1, int(workers))
+        self.chunk_size = max(1, int(chunk_size))
+        self._executor = None
+
+    def step(self):
+        """Activa a los agentes con salida pendiente y a los viajeros"""
+        departing = self.calendar.pop_due(self.steps)
+        self._plan_departures(departing)
+
+        active = {agent.unique_id: agent for agent in departing}
+        active.update(self.travelers)
+
+        agents = [active[unique_id] for unique_id in sorted(active)]
+        self.model.random.shuffle(agents)
+
+        plans = self._decide_travelers(agents) if self.workers > 1 else {}
+
+        for agent in agents:
+            was_in_transit = agent.in_transit
+            plan = plans.get(agent.unique_id)
+            if plan is None:
+                agent.step()
+            else:
+                agent.commit(plan)
+            self.track(agent, was_in_transit)
+
+        self.steps += 1
+        self.time += 1
+
+    def _decide_travelers(self, agents):
+        """Planes de los agentes en viaje, por unique_id, decididos en el pool"""
+        travelers = [agent for agent in agents if agent.in_transit]
+
+        # Con una sola tanda el viaje al pool cuesta más que decidir aquí
+        if len(travelers) <= self.chunk_size:
+            return {}
+
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+
+        inputs = parallel_decide.gather_travelers(self.model, travelers)
+        chunks = parallel_decide.split(inputs, self.chunk_size)
+
+        plans = []
+        for result in self._executor.map(parallel_decide.decide_chunk, chunks):
+            plans.extend(parallel_decide.to_plans(*result))
+
+        return {agent.unique_id: plan for agent, plan in zip(travelers, plans)}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_executor'] = None
+        return state
+
+    def close(self):
+        """Libera el pool de la fase de decisión"""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def track(self, agent, was_in_transit):
+        """Actualiza el conjunto de viajeros tras activar a un agente"""
+        if agent.in_transit:
+            self.travelers[agent.unique_id] = agent
+            return
+
+        self.travelers.pop(agent.unique_id, None)
+
+        # Al terminar un viaje se revisan objetivos pendientes en el tick siguiente
+        if was_in_transit:
+            self.calendar.schedule(agent, self.steps + 1)
+
+    def release(self, agent):
+        """
+        Saca de los viajeros a un agente cuyo viaje terminó fuera de su
+        activación; revisa objetivos pendientes en el tick siguiente
+        """
+        self.travelers.pop(agent.unique_id, None)
+        self.calendar.schedule(agent, self.steps)
+    
+    def _plan_departures(self, agents):
+        """Elige en lote el modo de todos los agentes que salen en el tick"""
+        from actions.execute_trip import find_due_objective
+        from actions.choose_mode import choose_transport_modes
+
+        departing = []
+        destinations = []
+
+        for agent in agents:
+            if agent.in_transit:
+                continue
+
+            objective = find_due_objective(agent)
+            if objective:
+                departing.append(agent)
+                destinations.append(objective['destination'])
+
+        modes = choose_transport_modes(departing, destinations)
+
+        for agent, mode in zip(departing, modes):
+            agent.planned_mode = mode
+
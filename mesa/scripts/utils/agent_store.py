@@ -0,0 +1,168 @@
+"""
+Almacén columnar (struct-of-arrays) del estado de los agentes
+
+Guarda los campos numéricos y de flags en arrays NumPy y los campos
+categóricos (perfil, actividad, modo) como códigos enteros, para conteos
+y reporters vectorizados.
+
+Los agentes con ColumnMirror son vistas delgadas: cada campo del almacén
+es una propiedad que lee y escribe la fila del agente, así que las
+acciones existentes siguen usando `agent.campo` sin cambios y el estado
+escalar vive una sola vez, en las columnas.
+"""
+import numpy as np
+
+# Centinela para posiciones ausentes (None)
+NO_POSITION = -1
+NO_STEP = -1
+
+
+class AgentStore:
+    """Columnas de estado de agentes, una fila por agente (su unique_id)"""
+
+    # Tipos mínimos para los rangos del modelo: edad < 128, liveness <= 360,
+    # ticks < 2^31 y coordenadas de grilla < 2^15
+    NUMERIC_FIELDS = {
+        'age': np.int8,
+        'has_car': np.bool_,
+        'has_bike': np.bool_,
+        'in_transit': np.bool_,
+        'liveness': np.int16,
+        'walking_arrival_step': np.int32
+    }
+
+    # Campos numéricos donde None se guarda como centinela
+    OPTIONAL_FIELDS = {'walking_arrival_step': NO_STEP}
+
+    POSITION_FIELDS = (
+        'home_location',
+        'work_location',
+        'current_location',
+        'walking_destination'
+    )
+
+    CATEGORICAL_FIELDS = (
+        'profile_type',
+        'color',
+        'current_activity',
+        'current_mode'
+    )
+
+    FIELDS = frozenset(NUMERIC_FIELDS) | frozenset(POSITION_FIELDS) | frozenset(CATEGORICAL_FIELDS)
+
+    def __init__(self, capacity=1024, categories=None):
+        self.capacity = max(1, capacity)
+        self.size = 0
+
+        self.columns = {}
+        for name, dtype in self.NUMERIC_FIELDS.items():
+            self.columns[name] = np.zeros(self.capacity, dtype=dtype)
+        for name in self.POSITION_FIELDS:
+            self.columns[name] = np.full((self.capacity, 2), NO_POSITION, dtype=np.int16)
+        for name in self.CATEGORICAL_FIELDS:
+            self.columns[name] = np.zeros(self.capacity, dtype=np.int16)
+
+        # Código 0 reservado para None en todas las columnas categóricas
+        self.categories = {name: [None] for name in self.CATEGORICAL_FIELDS}
+        self._codes = {name: {None: 0} for name in self.CATEGORICAL_FIELDS}
+
+        for name, values in (categories or {}).items():
+            for value in values:
+                self.encode(name, value)
+
+    def allocate(self, row):
+        """Reserva la fila `row` (el unique_id del agente)"""
+        if row >= self.capacity:
+            self._grow(row + 1)
+
+        self.size = max(self.size, row + 1)
+
+    def _grow(self, minimum):
+        new_capacity = max(self.capacity * 2, minimum)
+
+        for name, column in self.columns.items():
+            if column.ndim == 2:
+                grown = np.full((new_capacity, 2), NO_POSITION, dtype=column.dtype)
+            else:
+                grown = np.zeros(new_capacity, dtype=column.dtype)
+            grown[:self.capacity] = column
+            self.columns[name] = grown
+
+        self.capacity = new_capacity
+
+    def encode(self, name, value):
+        """Retorna el código de una categoría, registrándola si es nueva"""
+        codes = self._codes[name]
+        code = codes.get(value)
+
+        if code is None:
+            code = len(self.categories[name])
+            self.categories[name].append(value)
+            codes[value] = code
+
+        return code
+
+    def view(self, name):
+        """Vista de una columna limitada a las filas en uso"""
+        return self.columns[name][:self.size]
+
+    def count(self, name, values):
+        """Cuenta filas cuya categoría está en `values`"""
+        codes = [self._codes[name][v] for v in values if v in self._codes[name]]
+        if not codes:
+            return 0
+        return int(np.isin(self.view(name), codes).sum())
+
+    def get(self, name, row):
+        column = self.columns[name]
+
+        if name in self._codes:
+            return self.categories[name][column[row]]
+
+        if column.ndim == 2:
+            x, y = column[row]
+            return None if x == NO_POSITION else (int(x), int(y))
+
+        value = column[row].item()
+        if name in self.OPTIONAL_FIELDS and value == self.OPTIONAL_FIELDS[name]:
+            return None
+        return value
+
+    def set(self, name, row, value):
+        column = self.columns[name]
+
+        if name in self._codes:
+            column[row] = self.encode(name, value)
+        elif column.ndim == 2:
+            column[row] = (NO_POSITION, NO_POSITION) if value is None else value
+        elif value is None:
+            column[row] = self.OPTIONAL_FIELDS[name]
+        else:
+            column[row] = value
+
+
+class ColumnMirror:
+    """
+    Base cuyos campos de AgentStore.FIELDS son propiedades sobre las columnas
+
+    Las subclases guardan el almacén en '_store' (asignado antes que
+    cualquier campo) y declaran en __slots__ sus demás atributos. La fila
+    del agente es su unique_id. Al serializar solo viajan los slots: el
+    almacén se guarda y restaura aparte.
+    """
+    __slots__ = ()
+
+
+def _column_property(name):
+    def get(self):
+        return self._store.get(name, self.unique_id)
+
+    def set(self, value):
+        self._store.set(name, self.unique_id, value)
+
+    return property(get, set, doc=f"Columna '{name}' del AgentStore")
+
+
+for _name in sorted(AgentStore.FIELDS):
+    setattr(ColumnMirror, _name, _column_property(_name))
+del _name
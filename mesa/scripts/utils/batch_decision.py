@@ -0,0 +1,145 @@
+"""
+Versiones vectorizadas (NumPy) de los métodos de decisión multi-criterio
+
+Operan sobre un tensor de criterios (agentes × modos × criterios) con una
+máscara de modos disponibles. Los modos disponibles de cada agente van al
+inicio de su fila, en el mismo orden que usa la ruta escalar, para que los
+desempates coincidan con `utils/decision_making.py`.
+"""
+import numpy as np
+
+
+def normalize_maxabs(criteria, mask):
+    """
+    Normaliza cada criterio por su máximo valor absoluto entre los modos
+    disponibles de cada agente
+
+    Args:
+        criteria: array (A, M, K)
+        mask: array bool (A, M)
+
+    Returns:
+        array (A, M, K) normalizado
+    """
+    abs_values = np.where(mask[:, :, None], np.abs(criteria), -np.inf)
+    max_values = abs_values.max(axis=1)
+    max_values = np.where(max_values > 0, max_values, 1.0)
+
+    return criteria / max_values[:, None, :]
+
+
+def weighted_scores(criteria, weights):
+    """
+    Suma ponderada por criterio, acumulada en el mismo orden que sum()
+
+    Args:
+        criteria: array (A, M, K)
+        weights: array (A, K)
+
+    Returns:
+        array (A, M)
+    """
+    scores = np.zeros(criteria.shape[:2])
+
+    for k in range(criteria.shape[2]):
+        scores = scores + weights[:, k, None] * criteria[:, :, k]
+
+    return scores
+
+
+def weighted_means_batch(criteria, mask, weights):
+    """Índice del modo con menor score ponderado para cada agente"""
+    scores = np.where(mask, weighted_scores(criteria, weights), np.inf)
+    return scores.argmin(axis=1)
+
+
+def topsis_batch(criteria, mask, weights):
+    """TOPSIS vectorizado; criterios con peso positivo son beneficiosos"""
+    n_agents, n_modes, n_criteria = criteria.shape
+    available = mask[:, :, None]
+
+    sum_squares = np.zeros((n_agents, n_criteria))
+    for m in range(n_modes):
+        sum_squares = sum_squares + np.where(mask[:, m, None], criteria[:, m, :] ** 2, 0.0)
+
+    norm_factor = np.where(sum_squares > 0, sum_squares ** 0.5, 1.0)
+    weighted = criteria / norm_factor[:, None, :] * np.abs(weights)[:, None, :]
+
+    col_max = np.where(available, weighted, -np.inf).max(axis=1)
+    col_min = np.where(available, weighted, np.inf).min(axis=1)
+
+    beneficial = weights > 0
+    ideal_best = np.where(beneficial, col_max, col_min)
+    ideal_worst = np.where(beneficial, col_min, col_max)
+
+    dist_best = np.zeros((n_agents, n_modes))
+    dist_worst = np.zeros((n_agents, n_modes))
+    for k in range(n_criteria):
+        dist_best = dist_best + (weighted[:, :, k] - ideal_best[:, k, None]) ** 2
+        dist_worst = dist_worst + (weighted[:, :, k] - ideal_worst[:, k, None]) ** 2
+
+    dist_best = dist_best ** 0.5
+    dist_worst = dist_worst ** 0.5
+
+    total = dist_best + dist_worst
+    with np.errstate(invalid='ignore', divide='ignore'):
+        closeness = np.where(total == 0, 0.0, dist_worst / total)
+
+    closeness = np.where(mask, closeness, -np.inf)
+    return closeness.argmax(axis=1)
+
+
+def probabilistic_batch(criteria, mask, weights, draws, temperature=1.0):
+    """
+    Selección softmax vectorizada
+
+    Args:
+        draws: array (A,) con un número aleatorio uniforme por agente,
+               generado en el mismo orden que la ruta escalar
+    """
+    cumulative = softmax_cumulative(criteria, mask, weights, temperature)
+
+    chosen = (draws[:, None] <= cumulative) & mask
+    fallback = mask.sum(axis=1) - 1
+
+    return np.where(chosen.any(axis=1), chosen.argmax(axis=1), fallback)
+
+
+def softmax_cumulative(criteria, mask, weights, temperature=1.0):
+    """Probabilidades softmax acumuladas por modo (A, M) de probabilistic_batch"""
+    scores = -weighted_scores(criteria, weights)
+    scores = np.where(mask, scores, -np.inf)
+
+    max_score = scores.max(axis=1, keepdims=True)
+    exp_scores = np.where(mask, np.exp((scores - max_score) / temperature), 0.0)
+
+    sum_exp = np.zeros(len(criteria))
+    for m in range(criteria.shape[1]):
+        sum_exp = sum_exp + exp_scores[:, m]
+
+    probabilities = exp_scores / sum_exp[:, None]
+    return np.cumsum(probabilities, axis=1)
+
+
+def lexicographic_batch(criteria, mask, weights):
+    """Decisión lexicográfica vectorizada: criterio más pesado primero"""
+    n_agents = criteria.shape[0]
+    rows = np.arange(n_agents)
+
+    # Orden estable por |peso| descendente, igual que sorted(..., reverse=True)
+    order = np.argsort(-np.abs(weights), axis=1, kind='stable')
+
+    possible = mask.copy()
+
+    for position in range(order.shape[1]):
+        criterion = order[:, position]
+        values = criteria[rows, :, criterion]
+        minimize = weights[rows, criterion] < 0
+
+        best_min = np.where(possible, values, np.inf).min(axis=1)
+        best_max = np.where(possible, values, -np.inf).max(axis=1)
+        best = np.where(minimize, best_min, best_max)
+
+        possible &= values == best[:, None]
+
+    return possible.argmax(axis=1)
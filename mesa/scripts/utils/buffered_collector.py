@@ -0,0 +1,170 @@
+"""
+DataCollector con buffers NumPy preasignados
+
+Reemplaza las listas de Python de mesa.DataCollector por un buffer
+(filas × reporters) que crece por bloques. Puede registrar solo cada N
+ticks o solo cuando algún valor cambia, y mantiene la interfaz que usan
+los ChartModule y get_model_vars_dataframe.
+"""
+import numpy as np
+import pandas as pd
+
+
+class _ColumnView:
+    """Vista de solo lectura de una columna, con escalares de Python"""
+
+    def __init__(self, collector, column):
+        self._collector = collector
+        self._column = column
+
+    def _array(self):
+        return self._collector._values[:self._collector._rows, self._column]
+
+    def __len__(self):
+        return self._collector._rows
+
+    def __getitem__(self, index):
+        value = self._array()[index]
+        return value.item() if np.ndim(value) == 0 else value
+
+    def __iter__(self):
+        return iter(self._array().tolist())
+
+
+class BufferedDataCollector:
+    """Recolector de variables de modelo sobre buffers preasignados"""
+
+    def __init__(self, model_reporters, collect_every=1, on_change=False,
+                 chunk_size=1440, dtype=np.int64):
+        self.model_reporters = dict(model_reporters)
+        self.collect_every = max(1, int(collect_every))
+        self.on_change = on_change
+        self.chunk_size = chunk_size
+
+        self._names = list(self.model_reporters.keys())
+        self._values = np.zeros((chunk_size, len(self._names)), dtype=dtype)
+        self._steps = np.zeros(chunk_size, dtype=np.int64)
+        self._rows = 0
+
+        self.model_vars = {
+            name: _ColumnView(self, column)
+            for column, name in enumerate(self._names)
+        }
+
+    def __len__(self):
+        return self._rows
+
+    def __getstate__(self):
+        # Los reporters suelen ser lambdas: se vuelven a asociar con bind()
+        state = self.__dict__.copy()
+        state['_values'] = self._values[:self._rows].copy()
+        state['_steps'] = self._steps[:self._rows].copy()
+        state['model_reporters'] = None
+        state['model_vars'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        values, steps = self._values, self._steps
+        self._values = np.zeros((0, len(self._names)), dtype=values.dtype)
+        self._steps = np.zeros(0, dtype=np.int64)
+        self._rows = 0
+        self._ensure_capacity(max(len(steps), 1))
+        self._values[:len(steps)] = values
+        self._steps[:len(steps)] = steps
+        self._rows = len(steps)
+
+    def bind(self, model_reporters):
+        """Asocia los reporters de un recolector restaurado (mismas columnas)"""
+        if list(model_reporters) != self._names:
+            raise ValueError(f"Reporters {list(model_reporters)} no coinciden con {self._names}")
+
+        self.model_reporters = dict(model_reporters)
+        self.model_vars = {
+            name: _ColumnView(self, column)
+            for column, name in enumerate(self._names)
+        }
+
+    @property
+    def sparse(self):
+        """True si no se registra una fila por tick"""
+        return self.collect_every > 1 or self.on_change
+
+    def _ensure_capacity(self, rows):
+        capacity = len(self._steps)
+        if rows <= capacity:
+            return
+
+        new_capacity = capacity + self.chunk_size * (1 + (rows - capacity - 1) // self.chunk_size)
+
+        values = np.zeros((new_capacity, len(self._names)), dtype=self._values.dtype)
+        values[:self._rows] = self._values[:self._rows]
+        steps = np.zeros(new_capacity, dtype=np.int64)
+        steps[:self._rows] = self._steps[:self._rows]
+
+        self._values = values
+        self._steps = steps
+
+    def collect(self, model):
+        """Registra los reporters si corresponde en este tick"""
+        step = model.schedule.steps
+
+        if step % self.collect_every != 0:
+            return
+
+        row = [reporter(model) for reporter in self.model_reporters.values()]
+
+        if self.on_change and self._rows and np.array_equal(self._values[self._rows - 1], row):
+            return
+
+        self._append(step, row)
+
+    def fill(self, model, first_step, last_step):
+        """
+        Registra de una vez los ticks first_step..last_step (inclusive) en
+        que el modelo no cambió, con los valores actuales de los reporters
+        
+        Equivale a llamar collect() en cada uno de esos ticks.
+        """
+        steps = np.arange(first_step, last_step + 1, dtype=np.int64)
+        steps = steps[steps % self.collect_every == 0]
+        
+        if not len(steps):
+            return
+        
+        row = [reporter(model) for reporter in self.model_reporters.values()]
+        
+        if self.on_change:
+            if self._rows and np.array_equal(self._values[self._rows - 1], row):
+                return
+            steps = steps[:1]
+        
+        start = self._rows
+        self._ensure_capacity(start + len(steps))
+        self._values[start:start + len(steps)] = row
+        self._steps[start:start + len(steps)] = steps
+        self._rows += len(steps)
+    
+    def _append(self, step, row):
+        self._ensure_capacity(self._rows + 1)
+        self._values[self._rows] = row
+        self._steps[self._rows] = step
+        self._rows += 1
+
+    def get_steps(self):
+        """Ticks en que se registró cada fila"""
+        return self._steps[:self._rows].copy()
+
+    def get_model_vars_dataframe(self):
+        """
+        DataFrame con una columna por reporter
+
+        En modo denso el índice es implícito (una fila por tick), igual que
+        mesa.DataCollector; en modo disperso el índice es el tick registrado.
+        """
+        df = pd.DataFrame(self._values[:self._rows].copy(), columns=self._names)
+
+        if self.sparse:
+            df.index = pd.Index(self._steps[:self._rows].copy(), name="Step")
+
+        return df
@@ -0,0 +1,70 @@
+"""
+Checkpoints de corridas acopladas Mesa + SUMO
+
+Un checkpoint es un directorio con:
+- sumo_state.xml: estado de SUMO (simulation.saveState). Lo escribe el
+  proceso SUMO, así que el directorio debe verse con el mismo path desde
+  ambos contenedores
+- model.pkl: snapshot del modelo (agentes, scheduler, calendario, RNGs,
+  buffers del recolector, vehículo -> agente y seguimiento del conector)
+- checkpoint.json: tick y parámetros; se escribe al final, así que un
+  directorio sin él es un checkpoint incompleto
+
+Lo que pertenece al proceso (conexión SUMO, hilos, memmaps del skim) no
+se guarda: el modelo lo vuelve a crear al restaurar.
+"""
+import json
+import os
+import pickle
+
+MODEL_FILE = "model.pkl"
+SUMO_STATE_FILE = "sumo_state.xml"
+METADATA_FILE = "checkpoint.json"
+
+
+def checkpoint_path(directory, step):
+    """Directorio del checkpoint de un tick dentro de `directory`"""
+    return os.path.join(directory, f"step_{step:07d}")
+
+
+def write_checkpoint(path, snapshot, metadata):
+    """Escribe el snapshot y luego los metadatos (marca de checkpoint completo)"""
+    os.makedirs(path, exist_ok=True)
+
+    model_file = os.path.join(path, MODEL_FILE)
+    partial = f"{model_file}.{os.getpid()}.tmp"
+    with open(partial, "wb") as f:
+        pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(partial, model_file)
+
+    with open(os.path.join(path, METADATA_FILE), "w", encoding="utf-8") as f:
+        json.dump(metadata, f, indent=2, sort_keys=True)
+
+
+def read_checkpoint(path):
+    """Retorna (snapshot, metadatos) de un checkpoint completo"""
+    metadata_file = os.path.join(path, METADATA_FILE)
+
+    if not os.path.exists(metadata_file):
+        raise FileNotFoundError(f"{path} no es un checkpoint completo (falta {METADATA_FILE})")
+
+    with open(metadata_file, encoding="utf-8") as f:
+        metadata = json.load(f)
+
+    with open(os.path.join(path, MODEL_FILE), "rb") as f:
+        snapshot = pickle.load(f)
+
+    return snapshot, metadata
+
+
+def latest_checkpoint(directory):
+    """Checkpoint completo más reciente dentro de `directory`, o None"""
+    if not directory or not os.path.isdir(directory):
+        return None
+
+    complete = [
+        name for name in os.listdir(directory)
+        if name.startswith("step_") and os.path.exists(os.path.join(directory, name, METADATA_FILE))
+    ]
+
+    return os.path.join(directory, max(complete)) if complete else None
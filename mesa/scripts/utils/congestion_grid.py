@@ -0,0 +1,131 @@
+"""
+Mapa de congestión del modelo, alineado con la grilla de Mesa
+
+Cada paso se alimenta de las estadísticas por edge de SUMO (velocidad
+media y número de vehículos, leídas por suscripción) y se guarda como un
+array NumPy (width × height) con decaimiento exponencial. Las acciones
+leen la congestión de una celda o a lo largo de un trayecto sin consultar
+vehículos individuales.
+"""
+import numpy as np
+
+# Sensibilidad del tiempo de viaje de cada modo a la congestión
+MODE_SENSITIVITY = {
+    'car': 1.0,
+    'bus': 1.0,
+    'bike': 0.0,
+    'walking': 0.0
+}
+
+# Celdas muestreadas a lo largo de un trayecto
+ROUTE_SAMPLES = 8
+_SAMPLE_FRACTIONS = np.linspace(0.0, 1.0, ROUTE_SAMPLES)[None, :, None]
+
+
+def time_multiplier(mode, congestion):
+    """Factor sobre el tiempo de viaje libre de un modo"""
+    return 1.0 + MODE_SENSITIVITY.get(mode, 0.0) * congestion
+
+
+class CongestionGrid:
+    """Congestión en [0, 1] por celda (0 = flujo libre)"""
+
+    def __init__(self, width, height, decay=0.9):
+        self.width = width
+        self.height = height
+        self.decay = decay
+        self.values = np.zeros((width, height), dtype=float)
+
+        # edge -> (celda aplanada, velocidad libre)
+        self._edge_cells = {}
+
+    def bind_edges(self, edge_points, edge_speeds):
+        """
+        Asocia cada edge a la celda de su punto representativo
+
+        Args:
+            edge_points: {edge_id: (x, y)} en coordenadas Mesa
+            edge_speeds: {edge_id: velocidad máxima en m/s}
+        """
+        self._edge_cells = {}
+
+        for edge_id, (x, y) in edge_points.items():
+            cx, cy = int(x), int(y)
+            if not (0 <= cx < self.width and 0 <= cy < self.height):
+                continue
+
+            speed = edge_speeds.get(edge_id)
+            if not speed:
+                continue
+
+            self._edge_cells[edge_id] = (cx * self.height + cy, speed)
+
+    @property
+    def edge_ids(self):
+        return list(self._edge_cells)
+
+    def update(self, edge_stats, steps=1):
+        """
+        Aplica el decaimiento e incorpora las observaciones del paso
+
+        Args:
+            edge_stats: {edge_id: (velocidad media, vehículos)}; los edges
+                sin vehículos no aportan observación
+            steps: ticks transcurridos desde la última actualización (el
+                decaimiento se aplica una vez por tick)
+        """
+        cells = []
+        levels = []
+        counts = []
+
+        for edge_id, (mean_speed, vehicles) in edge_stats.items():
+            if vehicles <= 0:
+                continue
+
+            bound = self._edge_cells.get(edge_id)
+            if bound is None:
+                continue
+
+            cell, free_speed = bound
+            cells.append(cell)
+            levels.append(1.0 - min(1.0, max(0.0, mean_speed) / free_speed))
+            counts.append(vehicles)
+
+        self.values *= self.decay ** steps
+
+        if not cells:
+            return
+
+        size = self.width * self.height
+        weights = np.bincount(cells, weights=counts, minlength=size)
+        weighted = np.bincount(cells, weights=np.multiply(levels, counts), minlength=size)
+
+        observed = np.divide(weighted, weights, out=np.zeros(size), where=weights > 0)
+        self.values += (1.0 - self.decay) * observed.reshape(self.width, self.height)
+
+    def at(self, pos):
+        """Congestión de la celda de una posición"""
+        x = min(max(0, int(pos[0])), self.width - 1)
+        y = min(max(0, int(pos[1])), self.height - 1)
+        return float(self.values[x, y])
+
+    def along_batch(self, origins, destinations):
+        """
+        Congestión media a lo largo del segmento recto de cada par (N × 2)
+
+        Se muestrean ROUTE_SAMPLES celdas equiespaciadas entre origen y
+        destino y se promedian.
+        """
+        origins = np.asarray(origins, dtype=float).reshape(-1, 2)
+        destinations = np.asarray(destinations, dtype=float).reshape(-1, 2)
+
+        points = origins[:, None, :] + _SAMPLE_FRACTIONS * (destinations - origins)[:, None, :]
+
+        xs = np.clip(points[..., 0].astype(int), 0, self.width - 1)
+        ys = np.clip(points[..., 1].astype(int), 0, self.height - 1)
+
+        return self.values[xs, ys].mean(axis=1)
+
+    def along(self, origin, destination):
+        """Congestión media a lo largo de un trayecto (misma cuenta que along_batch)"""
+        return float(self.along_batch([origin], [destination])[0])
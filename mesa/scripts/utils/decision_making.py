@@ -185,7 +185,7 @@ def topsis_decision(candidates: List[Dict], weights: List[float],
 
 
 def probabilistic_choice(candidates: List[Dict], weights: List[float], 
-                        temperature: float = 1.0) -> int:
+                        temperature: float = 1.0, rng=None) -> int:
     """
     Selección probabilística basada en scores (softmax)
     
@@ -195,6 +195,7 @@ def probabilistic_choice(candidates: List[Dict], weights: List[float],
         candidates: Lista de candidatos
         weights: Pesos para criterios
         temperature: Controla aleatoriedad (0 = determinista, >1 = más aleatorio)
+        rng: Generador random.Random a usar (por defecto el módulo random)
     
     Returns:
         int: Índice del candidato seleccionado probabilísticamente
@@ -223,7 +224,7 @@ def probabilistic_choice(candidates: List[Dict], weights: List[float],
     probabilities = [e / sum_exp for e in exp_scores]
     
     # Selección probabilística
-    rand = random.random()
+    rand = (rng or random).random()
     cumulative = 0
     
     for i, prob in enumerate(probabilities):
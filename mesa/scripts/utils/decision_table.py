@@ -0,0 +1,144 @@
+"""
+Tabla memoizada de decisiones de modo
+
+La elección de modo depende de pocas entradas con pocos valores
+distintos: pesos del agente, modos disponibles, distancia por modo,
+congestión del trayecto, clima del día y método de decisión. La tabla
+cuantiza las continuas y guarda, por contexto, el índice del modo
+elegido (o las probabilidades acumuladas en el método probabilístico,
+para sortear con el rng del agente).
+
+Cada entrada se evalúa en el centro de sus buckets, no con los valores
+del primer agente que la pidió, así que el resultado no depende del
+orden de llenado. El error de cuantización queda acotado por medio paso
+de cada entrada y se mide auditando una de cada `audit_every` consultas
+contra la evaluación exacta.
+
+Las características de los modos no son parte de la clave: la tabla se
+vacía cuando cambia su huella (sync, una vez por tick).
+"""
+import hashlib
+import json
+
+
+class DecisionTable:
+    """Contexto de decisión cuantizado -> decisión"""
+
+    def __init__(self, distance_step=1.0, congestion_step=0.05, weather_step=0.05,
+                 audit_every=100):
+        self.distance_step = float(distance_step)
+        self.congestion_step = float(congestion_step)
+        self.weather_step = float(weather_step)
+        self.audit_every = int(audit_every)
+
+        # Las entradas dependen solo de la clave, no del orden en que se
+        # llenan; la tabla se usa desde un solo hilo (la fase de agentes)
+        self._entries = {}
+        self._fingerprint = None
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.lookups = 0
+
+        self.audited = 0
+        self.disagreements = 0
+        self.max_probability_error = 0.0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    @staticmethod
+    def _bucket(value, step):
+        return int(round(float(value) / step))
+
+    def key(self, weights, modes, distances, congestion, weather, method):
+        """Clave cuantizada de un contexto de decisión"""
+        step = self.distance_step
+        return (
+            tuple(map(float, weights)),
+            tuple(modes),
+            tuple([round(d / step) for d in distances]),
+            self._bucket(congestion, self.congestion_step),
+            self._bucket(weather, self.weather_step),
+            method
+        )
+
+    def representative(self, key):
+        """(distancias, congestión, clima) en el centro de los buckets de la clave"""
+        _, _, distances, congestion, weather, _ = key
+        return (
+            [d * self.distance_step for d in distances],
+            congestion * self.congestion_step,
+            weather * self.weather_step
+        )
+
+    def get(self, key):
+        """Decisión guardada o None"""
+        self.lookups += 1
+        entry = self._entries.get(key)
+
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+
+        return entry
+
+    def put(self, key, entry):
+        self._entries[key] = entry
+
+    def audit_due(self):
+        """True para una de cada audit_every consultas"""
+        return self.audit_every > 0 and self.lookups % self.audit_every == 0
+
+    def record_audit(self, cached, exact):
+        """Compara una decisión de la tabla con la evaluada sin cuantizar"""
+        self.audited += 1
+
+        if isinstance(cached, tuple):
+            # Probabilidades acumuladas: se compara la probabilidad de cada
+            # modo y el modo más probable
+            cached, exact = _increments(cached), _increments(exact)
+            error = max(abs(a - b) for a, b in zip(cached, exact))
+            self.max_probability_error = max(self.max_probability_error, error)
+            if cached.index(max(cached)) != exact.index(max(exact)):
+                self.disagreements += 1
+        elif cached != exact:
+            self.disagreements += 1
+
+    def sync(self, *components):
+        """Vacía la tabla si cambió la huella de las entradas fuera de la clave"""
+        payload = json.dumps(components, sort_keys=True, default=str)
+        fingerprint = hashlib.sha1(payload.encode()).hexdigest()
+
+        if fingerprint != self._fingerprint:
+            if self._fingerprint is not None:
+                self.invalidations += 1
+            self._entries.clear()
+            self._fingerprint = fingerprint
+
+    def stats(self):
+        """Uso de la tabla y error de cuantización (cota y medido)"""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'invalidations': self.invalidations,
+            'max_distance_error': self.distance_step / 2,
+            'max_congestion_error': self.congestion_step / 2,
+            'max_weather_error': self.weather_step / 2,
+            'audited': self.audited,
+            'disagreements': self.disagreements,
+            'disagreement_rate': self.disagreements / self.audited if self.audited else 0.0,
+            'max_probability_error': self.max_probability_error
+        }
+
+
+def _increments(cumulative):
+    return [b - a for a, b in zip((0.0,) + tuple(cumulative[:-1]), cumulative)]
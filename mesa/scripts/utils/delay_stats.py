@@ -0,0 +1,64 @@
+"""
+Estadísticas online de delays por par origen-destino
+
+Media y varianza con decaimiento exponencial, en memoria constante por
+clave. Las claves agrupan el origen y el destino en zonas de la grilla y
+la hora de salida en tramos del día, de modo que viajes casi iguales
+comparten estadística. Una instancia se comparte entre los agentes de un
+mismo perfil.
+"""
+
+MINUTES_PER_DAY = 1440
+
+
+class DelayStats:
+    """Media y varianza EWMA de delays por (zona origen, zona destino, tramo horario)"""
+
+    def __init__(self, alpha=0.2, zone_size=5, bucket_minutes=60):
+        self.alpha = alpha
+        self.zone_size = max(1, int(zone_size))
+        self.bucket_minutes = max(1, int(bucket_minutes))
+
+        # clave -> [media, varianza, observaciones]
+        self._stats = {}
+
+    def __len__(self):
+        return len(self._stats)
+
+    def __contains__(self, key):
+        return key in self._stats
+
+    def key(self, origin, destination, minute_of_day):
+        """Clave cuantizada de un viaje"""
+        zone = self.zone_size
+        return (
+            int(origin[0]) // zone, int(origin[1]) // zone,
+            int(destination[0]) // zone, int(destination[1]) // zone,
+            (int(minute_of_day) % MINUTES_PER_DAY) // self.bucket_minutes
+        )
+
+    def update(self, key, delay):
+        """Incorpora un delay observado a la estadística de la clave"""
+        stats = self._stats.get(key)
+
+        if stats is None:
+            self._stats[key] = [float(delay), 0.0, 1]
+            return
+
+        mean, var, count = stats
+        diff = delay - mean
+        increment = self.alpha * diff
+
+        stats[0] = mean + increment
+        stats[1] = (1 - self.alpha) * (var + diff * increment)
+        stats[2] = count + 1
+
+    def mean(self, key, default=None):
+        """Delay medio de la clave, o default si no hay observaciones"""
+        stats = self._stats.get(key)
+        return stats[0] if stats is not None else default
+
+    def get(self, key):
+        """(media, varianza, observaciones) de la clave, o None"""
+        stats = self._stats.get(key)
+        return tuple(stats) if stats is not None else None
@@ -0,0 +1,61 @@
+"""
+Calendario de salidas a nivel de modelo
+
+Agrupa a los agentes por el tick (minuto de simulación) en que deben
+revisar sus objetivos de viaje, para que el scheduler active solo a
+quienes tienen algo que hacer.
+"""
+import heapq
+
+MINUTES_PER_DAY = 1440
+
+
+class DepartureCalendar:
+    """Cola de buckets por minuto con un heap de los minutos ocupados"""
+
+    def __init__(self):
+        self._buckets = {}
+        self._heap = []
+        self._last_popped = -1
+
+    def __len__(self):
+        return sum(len(bucket) for bucket in self._buckets.values())
+
+    def schedule(self, agent, step):
+        """
+        Agenda a un agente para ser activado en `step`
+
+        Los ticks ya procesados no se pueden agendar; se corren al siguiente.
+        """
+        step = max(int(step), self._last_popped + 1)
+
+        bucket = self._buckets.get(step)
+        if bucket is None:
+            bucket = self._buckets[step] = {}
+            heapq.heappush(self._heap, step)
+
+        bucket[agent.unique_id] = agent
+
+    def schedule_objective(self, agent, objective, current_step):
+        """Agenda la salida de un objetivo (hora, minuto) del día en curso"""
+        day_start = (current_step // MINUTES_PER_DAY) * MINUTES_PER_DAY
+        step = day_start + objective['hour'] * 60 + objective['minute']
+        self.schedule(agent, step)
+
+    def pop_due(self, step):
+        """
+        Retorna los agentes agendados hasta `step` inclusive, ordenados por id
+        """
+        due = {}
+
+        while self._heap and self._heap[0] <= step:
+            bucket_step = heapq.heappop(self._heap)
+            due.update(self._buckets.pop(bucket_step, {}))
+
+        self._last_popped = max(self._last_popped, step)
+
+        return [due[unique_id] for unique_id in sorted(due)]
+
+    def next_due_step(self):
+        """Próximo tick con agentes agendados, o None si no hay"""
+        return self._heap[0] if self._heap else None
@@ -0,0 +1,174 @@
+"""
+Índice espacial de edges de la red SUMO
+
+Carga la geometría de la red una sola vez (desde el .net.xml con sumolib
+o con una pasada por TraCI) y responde consultas de edge más cercano sin
+llamadas de red.
+"""
+import math
+
+
+class EdgeIndex:
+    """Grilla de buckets sobre los segmentos de cada edge"""
+
+    def __init__(self, cell_size=50.0):
+        self.cell_size = cell_size
+        self.buckets = {}
+        self.segments = []
+        self.edge_ids = set()
+        self.edge_points = {}
+        self.edge_speeds = {}
+        self.cell_bounds = None
+
+    @classmethod
+    def from_net_file(cls, net_file, cell_size=50.0):
+        """Construye el índice leyendo la red con sumolib"""
+        import sumolib
+
+        return cls.from_net(sumolib.net.readNet(net_file), cell_size)
+
+    @classmethod
+    def from_net(cls, net, cell_size=50.0):
+        """Construye el índice desde una red sumolib ya leída"""
+        index = cls(cell_size)
+
+        for edge in net.getEdges():
+            index.add_edge(edge.getID(), edge.getShape(), edge.getSpeed())
+
+        return index
+
+    @classmethod
+    def from_traci(cls, sumo, cell_size=50.0):
+        """
+        Construye el índice con una única pasada por TraCI
+
+        TraCI expone la geometría por lane, así que se usa la forma de
+        cada lane y se asigna a su edge.
+        """
+        index = cls(cell_size)
+
+        for lane_id in sumo.lane.getIDList():
+            if lane_id.startswith(':'):
+                continue
+
+            edge_id = sumo.lane.getEdgeID(lane_id)
+            index.add_edge(edge_id, sumo.lane.getShape(lane_id), sumo.lane.getMaxSpeed(lane_id))
+
+        return index
+
+    def add_edge(self, edge_id, shape, speed=None):
+        """Registra los segmentos de un edge en los buckets que atraviesan"""
+        if edge_id.startswith(':') or not shape:
+            return
+
+        points = list(shape)
+
+        # Punto representativo y velocidad libre (el primer lane registrado)
+        if edge_id not in self.edge_ids:
+            self.edge_points[edge_id] = (
+                sum(p[0] for p in points) / len(points),
+                sum(p[1] for p in points) / len(points)
+            )
+            if speed is not None:
+                self.edge_speeds[edge_id] = speed
+
+        self.edge_ids.add(edge_id)
+
+        if len(points) == 1:
+            points.append(points[0])
+
+        for (x1, y1), (x2, y2) in zip(points[:-1], points[1:]):
+            segment_id = len(self.segments)
+            self.segments.append((edge_id, x1, y1, x2, y2))
+
+            cx_min, cy_min = self._cell(min(x1, x2), min(y1, y2))
+            cx_max, cy_max = self._cell(max(x1, x2), max(y1, y2))
+
+            for cx in range(cx_min, cx_max + 1):
+                for cy in range(cy_min, cy_max + 1):
+                    self.buckets.setdefault((cx, cy), []).append(segment_id)
+
+            if self.cell_bounds is None:
+                self.cell_bounds = [cx_min, cy_min, cx_max, cy_max]
+            else:
+                bounds = self.cell_bounds
+                bounds[0] = min(bounds[0], cx_min)
+                bounds[1] = min(bounds[1], cy_min)
+                bounds[2] = max(bounds[2], cx_max)
+                bounds[3] = max(bounds[3], cy_max)
+
+    def __len__(self):
+        return len(self.edge_ids)
+
+    def _cell(self, x, y):
+        return (int(math.floor(x / self.cell_size)),
+                int(math.floor(y / self.cell_size)))
+
+    def nearest_edge(self, point):
+        """
+        Retorna el edge más cercano a un punto en coordenadas SUMO
+
+        Recorre anillos de celdas alrededor del punto y se detiene cuando
+        el anillo siguiente ya no puede contener un segmento más cercano.
+        """
+        if not self.buckets:
+            return None
+
+        x, y = point
+        cx, cy = self._cell(x, y)
+
+        best_edge = None
+        best_distance = float('inf')
+        max_ring = self._max_ring(cx, cy)
+
+        for ring in range(max_ring + 1):
+            # Distancia mínima posible a cualquier celda de este anillo
+            if best_edge is not None and (ring - 1) * self.cell_size > best_distance:
+                break
+
+            for segment_id in self._ring_segments(cx, cy, ring):
+                edge_id, x1, y1, x2, y2 = self.segments[segment_id]
+                distance = _point_segment_distance(x, y, x1, y1, x2, y2)
+
+                if distance < best_distance:
+                    best_distance = distance
+                    best_edge = edge_id
+
+        return best_edge
+
+    def _max_ring(self, cx, cy):
+        """Anillo más lejano que todavía contiene buckets"""
+        min_x, min_y, max_x, max_y = self.cell_bounds
+        return max(abs(cx - min_x), abs(cx - max_x),
+                   abs(cy - min_y), abs(cy - max_y))
+
+    def _ring_segments(self, cx, cy, ring):
+        if ring == 0:
+            cells = [(cx, cy)]
+        else:
+            cells = []
+            for dx in range(-ring, ring + 1):
+                cells.append((cx + dx, cy - ring))
+                cells.append((cx + dx, cy + ring))
+            for dy in range(-ring + 1, ring):
+                cells.append((cx - ring, cy + dy))
+                cells.append((cx + ring, cy + dy))
+
+        for cell in cells:
+            for segment_id in self.buckets.get(cell, ()):
+                yield segment_id
+
+
+def _point_segment_distance(px, py, x1, y1, x2, y2):
+    """Distancia de un punto a un segmento"""
+    dx = x2 - x1
+    dy = y2 - y1
+    length_sq = dx * dx + dy * dy
+
+    if length_sq == 0:
+        return math.hypot(px - x1, py - y1)
+
+    t = ((px - x1) * dx + (py - y1) * dy) / length_sq
+    t = max(0.0, min(1.0, t))
+
+    return math.hypot(px - (x1 + t * dx), py - (y1 + t * dy))
@@ -0,0 +1,124 @@
+"""
+Registro de eventos estructurado con buffer en memoria
+
+Reemplaza los print() de las rutas calientes de la simulación. Los eventos
+se encolan en un ring buffer y un hilo en segundo plano los escribe por
+lotes en un archivo JSON lines. Deshabilitado (sin path), emit() retorna
+de inmediato.
+"""
+import json
+import os
+import threading
+from collections import deque
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+LEVEL_NAMES = {
+    DEBUG: "debug",
+    INFO: "info",
+    WARNING: "warning",
+    ERROR: "error"
+}
+
+LEVELS_BY_NAME = {name: level for level, name in LEVEL_NAMES.items()}
+
+
+class EventLog:
+    """
+    Log de eventos tipados (trip_start, trip_end, spawn_failed,
+    delay_learned, congestion_report, ...) con niveles
+    """
+
+    def __init__(self, path=None, level=INFO, capacity=65536,
+                 flush_interval=1.0, batch_size=4096, clock=None):
+        if isinstance(level, str):
+            level = LEVELS_BY_NAME[level.lower()]
+
+        self.path = path
+        self.level = level
+        self.enabled = path is not None
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.clock = clock
+
+        self.dropped = 0
+        self.written = 0
+
+        self._buffer = deque(maxlen=capacity)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._file = None
+
+        if self.enabled:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._file = open(path, "a", encoding="utf-8")
+            self._thread = threading.Thread(target=self._run, name="event-log", daemon=True)
+            self._thread.start()
+
+    @classmethod
+    def from_env(cls, clock=None):
+        """Crea el log según EVENT_LOG_PATH y EVENT_LOG_LEVEL"""
+        return cls(
+            path=os.getenv("EVENT_LOG_PATH") or None,
+            level=os.getenv("EVENT_LOG_LEVEL", "info"),
+            clock=clock
+        )
+
+    def emit(self, event, level=INFO, **fields):
+        """Encola un evento si el log está activo y el nivel alcanza el umbral"""
+        if not self.enabled or level < self.level:
+            return
+
+        if len(self._buffer) == self._buffer.maxlen:
+            self.dropped += 1
+
+        step = self.clock() if self.clock is not None else None
+        self._buffer.append((step, event, level, fields))
+
+        if len(self._buffer) >= self.batch_size:
+            self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self._drain()
+
+        self._drain()
+
+    def _drain(self):
+        """Escribe en el archivo todo lo encolado hasta ahora"""
+        lines = []
+
+        while self._buffer:
+            try:
+                step, event, level, fields = self._buffer.popleft()
+            except IndexError:
+                break
+
+            record = {'step': step, 'event': event, 'level': LEVEL_NAMES.get(level, level)}
+            record.update(fields)
+            lines.append(json.dumps(record, separators=(',', ':'), default=str))
+
+        if lines:
+            self._file.write("\n".join(lines) + "\n")
+            self._file.flush()
+            self.written += len(lines)
+
+    def close(self):
+        """Detiene el hilo, vacía el buffer y cierra el archivo"""
+        if not self.enabled:
+            return
+
+        self.enabled = False
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+        self._file.close()
+
+        if self.dropped:
+            print(f"⚠️ Event log: {self.dropped} eventos descartados por buffer lleno")
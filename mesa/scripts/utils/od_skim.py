@@ -0,0 +1,368 @@
+"""
+Matriz origen-destino precalculada sobre la red (skim)
+
+Guarda, por modo, la distancia por red (en unidades de la grilla Mesa) y
+el tiempo de viaje a flujo libre (segundos SUMO) entre todas las zonas de
+la grilla. Una zona agrupa `zone_size` × `zone_size` celdas.
+
+Se construye una vez por escenario desde el .net.xml (sumolib + Dijkstra
+desde cada nodo de origen, ver build_skim.py) y se guarda como archivos
+.npy más un metadata.json; al cargarla los arrays se abren con memmap,
+así que una consulta es una indexación sin tocar SUMO.
+
+Opcionalmente incluye tiempos por tramo del día calculados con las
+velocidades observadas (edgeData de SUMO).
+"""
+import heapq
+import json
+import math
+import os
+
+import numpy as np
+
+METADATA_FILE = "metadata.json"
+
+# vClass SUMO de cada modo Mesa
+MODE_VCLASS = {
+    'car': 'passenger',
+    'bus': 'bus',
+    'bike': 'bicycle',
+    'walking': 'pedestrian'
+}
+
+# Velocidad máxima propia del modo (m/s); None = límite de la vía
+MODE_MAX_SPEED = {
+    'car': None,
+    'bus': None,
+    'bike': 5.5,
+    'walking': 1.4
+}
+
+# Los peatones recorren los edges en ambos sentidos
+BIDIRECTIONAL_MODES = {'walking'}
+
+# Velocidad mínima considerada al usar velocidades observadas (m/s)
+MIN_SPEED = 0.1
+
+
+def straight_line(origins, destinations):
+    """Distancia euclidiana entre pares de puntos (N × 2)"""
+    origins = np.asarray(origins, dtype=float).reshape(-1, 2)
+    destinations = np.asarray(destinations, dtype=float).reshape(-1, 2)
+    delta = origins - destinations
+    return np.sqrt(delta[:, 0] ** 2 + delta[:, 1] ** 2)
+
+
+def straight_line_distance(origin, destination):
+    """Distancia euclidiana entre dos puntos (igual que straight_line)"""
+    dx = float(origin[0]) - float(destination[0])
+    dy = float(origin[1]) - float(destination[1])
+    return math.sqrt(dx * dx + dy * dy)
+
+
+def network_distances(skim, origins, destinations, mode):
+    """Distancia por red si hay skim con el modo; si no, en línea recta"""
+    if skim is None or mode not in skim.modes:
+        return straight_line(origins, destinations)
+    return skim.distance_batch(mode, origins, destinations)
+
+
+class ODSkim:
+    """Distancias y tiempos zona a zona por modo, sobre arrays (memmap)"""
+
+    def __init__(self, width, height, zone_size, distances, times,
+                 time_slots=None, slot_times=None, metadata=None):
+        self.width = int(width)
+        self.height = int(height)
+        self.zone_size = max(1, int(zone_size))
+        self.zones_x = -(-self.width // self.zone_size)
+        self.zones_y = -(-self.height // self.zone_size)
+
+        # modo -> array (zonas × zonas)
+        self.distances = distances
+        self.times = times
+
+        # [(inicio, fin)] en segundos del día y modo -> [array por tramo]
+        self.time_slots = [tuple(slot) for slot in time_slots or []]
+        self.slot_times = slot_times or {}
+
+        self.metadata = metadata or {}
+
+    @property
+    def modes(self):
+        return list(self.distances)
+
+    @property
+    def n_zones(self):
+        return self.zones_x * self.zones_y
+
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        """Abre un skim guardado con save()"""
+        with open(os.path.join(path, METADATA_FILE)) as f:
+            metadata = json.load(f)
+
+        def array(name):
+            return np.load(os.path.join(path, name), mmap_mode=mmap_mode)
+
+        distances = {}
+        times = {}
+        slot_times = {}
+
+        for mode in metadata['modes']:
+            distances[mode] = array(f"distance_{mode}.npy")
+            times[mode] = array(f"time_{mode}.npy")
+            slot_times[mode] = [array(f"time_{mode}_{k}.npy")
+                                for k in range(len(metadata.get('time_slots', [])))]
+
+        return cls(
+            metadata['width'], metadata['height'], metadata['zone_size'],
+            distances, times,
+            time_slots=metadata.get('time_slots'),
+            slot_times=slot_times,
+            metadata=metadata
+        )
+
+    def save(self, path):
+        """Escribe los arrays (.npy) y metadata.json en un directorio"""
+        os.makedirs(path, exist_ok=True)
+
+        for mode in self.modes:
+            np.save(os.path.join(path, f"distance_{mode}.npy"), self.distances[mode])
+            np.save(os.path.join(path, f"time_{mode}.npy"), self.times[mode])
+            for k, times in enumerate(self.slot_times.get(mode, [])):
+                np.save(os.path.join(path, f"time_{mode}_{k}.npy"), times)
+
+        metadata = dict(self.metadata)
+        metadata.update({
+            'width': self.width,
+            'height': self.height,
+            'zone_size': self.zone_size,
+            'modes': self.modes,
+            'time_slots': [list(slot) for slot in self.time_slots]
+        })
+
+        with open(os.path.join(path, METADATA_FILE), "w") as f:
+            json.dump(metadata, f, indent=2)
+
+    def zone_of(self, points):
+        """Índice de zona de cada punto (N × 2) de la grilla"""
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        zx = np.clip(points[:, 0].astype(int) // self.zone_size, 0, self.zones_x - 1)
+        zy = np.clip(points[:, 1].astype(int) // self.zone_size, 0, self.zones_y - 1)
+        return zx * self.zones_y + zy
+
+    def zone(self, point):
+        """Índice de zona de un punto (zone_of sin arrays)"""
+        zx = min(max(int(float(point[0])) // self.zone_size, 0), self.zones_x - 1)
+        zy = min(max(int(float(point[1])) // self.zone_size, 0), self.zones_y - 1)
+        return zx * self.zones_y + zy
+
+    def zone_centroids(self):
+        """Centro (en la grilla) de cada zona, en el orden de los índices"""
+        zx, zy = np.divmod(np.arange(self.n_zones), self.zones_y)
+        x = np.minimum((zx + 0.5) * self.zone_size, self.width)
+        y = np.minimum((zy + 0.5) * self.zone_size, self.height)
+        return np.column_stack([x, y])
+
+    def distance_batch(self, mode, origins, destinations):
+        """
+        Distancia por red (grilla) de cada par origen-destino
+
+        Dentro de una misma zona, o entre zonas sin camino, se usa la
+        línea recta.
+        """
+        origins = np.asarray(origins, dtype=float).reshape(-1, 2)
+        destinations = np.asarray(destinations, dtype=float).reshape(-1, 2)
+
+        values = np.asarray(
+            self.distances[mode][self.zone_of(origins), self.zone_of(destinations)],
+            dtype=float
+        )
+        usable = np.isfinite(values) & (values > 0)
+
+        return np.where(usable, values, straight_line(origins, destinations))
+
+    def distance(self, mode, origin, destination):
+        """distance_batch de un solo par, sin arrays intermedios"""
+        value = float(self.distances[mode][self.zone(origin), self.zone(destination)])
+        if math.isfinite(value) and value > 0:
+            return value
+        return straight_line_distance(origin, destination)
+
+    def time_batch(self, mode, origins, destinations, second_of_day=None):
+        """
+        Tiempo de viaje por red (segundos) de cada par, NaN si no hay camino
+
+        Con second_of_day y tramos del día, usa los tiempos observados del
+        tramo; fuera de los tramos, el tiempo a flujo libre.
+        """
+        table = self.times[mode]
+
+        if second_of_day is not None:
+            slot = self._slot_of(second_of_day)
+            if slot is not None:
+                table = self.slot_times[mode][slot]
+
+        values = np.asarray(
+            table[self.zone_of(origins), self.zone_of(destinations)], dtype=float
+        )
+        return np.where(np.isfinite(values), values, np.nan)
+
+    def time(self, mode, origin, destination, second_of_day=None):
+        return float(self.time_batch(mode, [origin], [destination], second_of_day)[0])
+
+    def _slot_of(self, second_of_day):
+        second_of_day = second_of_day % 86400
+        for k, (begin, end) in enumerate(self.time_slots):
+            if begin <= second_of_day < end:
+                return k
+        return None
+
+    @classmethod
+    def build(cls, net, projection, width, height, zone_size=5, modes=None,
+              intervals=None):
+        """
+        Calcula el skim desde una red sumolib
+
+        Args:
+            net: red leída con sumolib.net.readNet
+            projection: Projection grilla ↔ XY de la red
+            modes: modos a incluir (por defecto los de MODE_VCLASS)
+            intervals: [(inicio, fin, {edge_id: velocidad observada})] para
+                los tiempos por tramo del día
+        """
+        skim = cls(width, height, zone_size, {}, {})
+        centroids = projection.grid_to_xy(skim.zone_centroids())
+        intervals = intervals or []
+
+        skim.time_slots = [(begin, end) for begin, end, _ in intervals]
+
+        for mode in modes or list(MODE_VCLASS):
+            graph = _ModeGraph(net, mode)
+            sources = graph.nearest_nodes(centroids)
+
+            distance, time = graph.all_pairs(sources)
+            skim.distances[mode] = (distance / projection.scale).astype(np.float32)
+            skim.times[mode] = time.astype(np.float32)
+
+            skim.slot_times[mode] = []
+            for _, _, speeds in intervals:
+                _, slot_time = _ModeGraph(net, mode, speeds).all_pairs(sources)
+                skim.slot_times[mode].append(slot_time.astype(np.float32))
+
+        skim.metadata = {'scale': projection.scale}
+        return skim
+
+
+class _ModeGraph:
+    """Grafo de nodos de la red (CSR) con los edges que permiten un modo"""
+
+    def __init__(self, net, mode, speeds=None):
+        vclass = MODE_VCLASS[mode]
+        max_speed = MODE_MAX_SPEED.get(mode)
+        speeds = speeds or {}
+
+        node_ids = {}
+        coords = []
+        arcs = []
+
+        def node(n):
+            index = node_ids.get(n.getID())
+            if index is None:
+                index = node_ids[n.getID()] = len(coords)
+                coords.append(n.getCoord())
+            return index
+
+        for edge in net.getEdges():
+            if not edge.allows(vclass):
+                continue
+
+            speed = speeds.get(edge.getID(), edge.getSpeed())
+            if max_speed is not None:
+                speed = min(speed, max_speed)
+            speed = max(speed, MIN_SPEED)
+
+            length = edge.getLength()
+            a = node(edge.getFromNode())
+            b = node(edge.getToNode())
+
+            arcs.append((a, b, length, length / speed))
+            if mode in BIDIRECTIONAL_MODES:
+                arcs.append((b, a, length, length / speed))
+
+        self.coords = np.asarray(coords, dtype=float).reshape(-1, 2)
+        self.n_nodes = len(coords)
+
+        arcs.sort()
+        self.indptr = np.zeros(self.n_nodes + 1, dtype=np.int64)
+        for a, _, _, _ in arcs:
+            self.indptr[a + 1] += 1
+        self.indptr = np.cumsum(self.indptr).tolist()
+
+        self.heads = [b for _, b, _, _ in arcs]
+        self.lengths = [length for _, _, length, _ in arcs]
+        self.costs = [cost for _, _, _, cost in arcs]
+
+    def nearest_nodes(self, points, chunk=256):
+        """Nodo más cercano a cada punto XY (-1 si el grafo está vacío)"""
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+
+        if not self.n_nodes:
+            return np.full(len(points), -1, dtype=np.int64)
+
+        nearest = np.empty(len(points), dtype=np.int64)
+        for start in range(0, len(points), chunk):
+            block = points[start:start + chunk]
+            d2 = ((block[:, None, :] - self.coords[None, :, :]) ** 2).sum(axis=2)
+            nearest[start:start + chunk] = d2.argmin(axis=1)
+
+        return nearest
+
+    def shortest_from(self, source):
+        """Dijkstra por tiempo desde un nodo; retorna (distancia, tiempo) por nodo"""
+        time = [float('inf')] * self.n_nodes
+        distance = [float('inf')] * self.n_nodes
+        time[source] = 0.0
+        distance[source] = 0.0
+
+        indptr, heads, lengths, costs = self.indptr, self.heads, self.lengths, self.costs
+        heap = [(0.0, source)]
+
+        while heap:
+            t, u = heapq.heappop(heap)
+            if t > time[u]:
+                continue
+
+            for k in range(indptr[u], indptr[u + 1]):
+                v = heads[k]
+                candidate = t + costs[k]
+                if candidate < time[v]:
+                    time[v] = candidate
+                    distance[v] = distance[u] + lengths[k]
+                    heapq.heappush(heap, (candidate, v))
+
+        return distance, time
+
+    def all_pairs(self, sources):
+        """Matrices (zonas × zonas) de distancia y tiempo entre nodos de zona"""
+        n = len(sources)
+        distance = np.full((n, n), np.inf)
+        time = np.full((n, n), np.inf)
+
+        valid = sources >= 0
+        targets = sources[valid]
+        solved = {}
+
+        for i, source in enumerate(sources):
+            if source < 0:
+                continue
+
+            # Varias zonas comparten nodo más cercano: un Dijkstra por nodo
+            if source not in solved:
+                d, t = self.shortest_from(int(source))
+                solved[source] = (np.asarray(d)[targets], np.asarray(t)[targets])
+
+            distance[i, valid], time[i, valid] = solved[source]
+
+        return distance, time
@@ -0,0 +1,159 @@
+"""
+Fase de decisión de los viajeros en un pool de procesos
+
+Para un agente en viaje, decide() es aritmética sobre su propio estado y
+el snapshot de SUMO del paso. Aquí esos datos se juntan en arrays NumPy
+en el proceso principal (de las columnas del AgentStore cuando lo hay),
+se evalúan por tandas en procesos aparte y vuelven como los mismos
+planes que arma decide(). El rng de cada agente se consume en el
+proceso principal, una vez por agente como en decide().
+"""
+import numpy as np
+
+from utils.agent_store import NO_POSITION, NO_STEP
+
+# Resultado del viaje en el tick
+OUTCOME_NONE = 0
+OUTCOME_MOVE = 1
+OUTCOME_COMPLETE = 2
+
+_OUTCOME_KINDS = {OUTCOME_MOVE: 'move', OUTCOME_COMPLETE: 'complete'}
+
+
+def gather_travelers(model, agents):
+    """
+    Entradas de decide() de los viajeros, en arrays alineados con `agents`
+
+    Consume un número del rng de cada agente (el sorteo del reporte de
+    congestión de decide()).
+    """
+    n = len(agents)
+    connector = model.sumo_connector
+
+    walking = np.zeros(n, dtype=np.bool_)
+    arrival = np.full(n, NO_STEP, dtype=np.int64)
+    destination = np.full((n, 2), NO_POSITION, dtype=np.int64)
+
+    store = model.agent_store
+    if store is not None:
+        rows = np.fromiter((agent.unique_id for agent in agents), dtype=np.int64, count=n)
+        walking[:] = store.columns['current_mode'][rows] == store.encode('current_mode', 'walking')
+        arrival[:] = store.columns['walking_arrival_step'][rows]
+        destination[:] = store.columns['walking_destination'][rows]
+
+    has_vehicle = np.zeros(n, dtype=np.bool_)
+    exists = np.zeros(n, dtype=np.bool_)
+    position = np.full((n, 2), np.nan)
+    speed = np.full(n, np.nan)
+    max_speed = np.full(n, np.nan)
+    draw = np.empty(n)
+
+    for i, agent in enumerate(agents):
+        if store is None:
+            walking[i] = agent.current_mode == 'walking'
+            if agent.walking_arrival_step is not None:
+                arrival[i] = agent.walking_arrival_step
+            if agent.walking_destination is not None:
+                destination[i] = agent.walking_destination
+
+        # Sin destino de caminata se llega a la celda actual
+        if destination[i, 0] == NO_POSITION:
+            destination[i] = agent.pos
+
+        vehicle_id = agent.sumo_vehicle_id
+        if vehicle_id:
+            has_vehicle[i] = True
+            exists[i] = connector.vehicle_exists(vehicle_id)
+
+            data = connector.get_vehicle_data(vehicle_id)
+            if data:
+                position[i] = data['position']
+                speed[i] = data.get('speed', 0)
+                max_speed[i] = data.get('max_speed', 50)
+
+        draw[i] = agent.rng.random()
+
+    return {
+        'now': model.schedule.steps,
+        'width': model.grid.width,
+        'height': model.grid.height,
+        'walking': walking,
+        'arrival': arrival,
+        'destination': destination,
+        'has_vehicle': has_vehicle,
+        'exists': exists,
+        'position': position,
+        'speed': speed,
+        'max_speed': max_speed,
+        'draw': draw
+    }
+
+
+def split(inputs, chunk_size):
+    """Parte las entradas en tandas de a lo sumo chunk_size viajeros"""
+    n = len(inputs['draw'])
+    chunks = []
+
+    for start in range(0, n, chunk_size):
+        chunk = {}
+        for name, value in inputs.items():
+            chunk[name] = value[start:start + chunk_size] if isinstance(value, np.ndarray) else value
+        chunks.append(chunk)
+
+    return chunks
+
+
+def decide_chunk(chunk):
+    """
+    trip_outcome() y observed_congestion() de una tanda, vectorizados
+
+    Corre en los procesos del pool: solo usa NumPy.
+
+    Returns:
+        (tipos de resultado, celdas, congestión o NaN) como listas
+    """
+    walking = chunk['walking']
+    arrival = chunk['arrival']
+    has_vehicle = chunk['has_vehicle']
+    position = chunk['position']
+    limit = np.array([chunk['width'] - 1, chunk['height'] - 1])
+
+    kind = np.full(len(walking), OUTCOME_NONE, dtype=np.int8)
+    cell = np.full((len(walking), 2), NO_POSITION, dtype=np.int64)
+
+    # Caminatas: llegan en walking_arrival_step (o ya, si no lo tienen)
+    arrived = walking & ((arrival == NO_STEP) | (chunk['now'] >= arrival))
+    kind[arrived] = OUTCOME_COMPLETE
+    cell[arrived] = np.clip(chunk['destination'][arrived], 0, limit)
+
+    # Vehículos: fuera de la simulación = llegó; sin posición = pendiente
+    driving = ~walking & has_vehicle
+    kind[driving & ~chunk['exists']] = OUTCOME_COMPLETE
+
+    placed = driving & chunk['exists'] & ~np.isnan(position[:, 0])
+    kind[placed] = OUTCOME_MOVE
+    cell[placed] = np.maximum(0, np.minimum(np.trunc(position[placed]).astype(np.int64), limit))
+
+    speed = chunk['speed']
+    max_speed = chunk['max_speed']
+    congestion = np.full(len(walking), np.nan)
+
+    reports = ((chunk['draw'] < 0.1) & (kind != OUTCOME_COMPLETE) & has_vehicle
+               & ~np.isnan(speed))
+    reports[reports] = speed[reports] < max_speed[reports] * 0.3
+    congestion[reports] = 1 - (speed[reports] / max_speed[reports])
+
+    return kind.tolist(), cell.tolist(), congestion.tolist()
+
+
+def to_plans(kinds, cells, congestions):
+    """Planes (inicio, resultado, congestión) como los de decide()"""
+    plans = []
+
+    for kind, cell, congestion in zip(kinds, cells, congestions):
+        outcome = None
+        if kind != OUTCOME_NONE:
+            outcome = (_OUTCOME_KINDS[kind], None if cell[0] == NO_POSITION else tuple(cell))
+        plans.append((None, outcome, None if congestion != congestion else congestion))
+
+    return plans
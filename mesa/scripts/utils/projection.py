@@ -0,0 +1,86 @@
+"""
+Proyección vectorizada entre grilla Mesa, XY de SUMO y lon/lat
+
+Lee del .net.xml (vía sumolib) el offset y la proyección geográfica de la
+red y convierte arrays completos de puntos (N × 2) en una sola operación
+NumPy/pyproj, en cualquier dirección:
+
+    grilla  <->  XY de la red  <->  lon/lat
+
+La grilla es el XY de la red dividido por `scale`. Sin proyección
+geográfica (projParameter="!"), lon/lat son las coordenadas originales
+de la red (XY menos netOffset), igual que simulation.convertGeo.
+"""
+import numpy as np
+
+
+class Projection:
+    """Transformaciones grilla ↔ XY ↔ geo sobre arrays de puntos"""
+
+    def __init__(self, scale=10.0, offset=(0.0, 0.0), geo_proj=None):
+        self.scale = float(scale)
+        self.offset = np.asarray(offset, dtype=float)
+        self.geo_proj = geo_proj
+
+    @classmethod
+    def from_net_file(cls, net_file, scale=10.0):
+        """
+        Lee netOffset y projParameter del elemento <location> de la red
+
+        Usa el parser en streaming de sumolib y se detiene en el primer
+        <location>, sin construir el grafo completo.
+        """
+        import sumolib
+
+        location = next(sumolib.xml.parse(net_file, 'location'), None)
+        if location is None:
+            return cls(scale=scale)
+
+        offset = [float(v) for v in location.netOffset.split(',')]
+
+        geo_proj = None
+        if location.projParameter != '!':
+            import pyproj
+            geo_proj = pyproj.Proj(projparams=location.projParameter)
+
+        return cls(scale=scale, offset=offset, geo_proj=geo_proj)
+
+    @property
+    def has_geo(self):
+        return self.geo_proj is not None
+
+    @staticmethod
+    def _points(points):
+        return np.asarray(points, dtype=float).reshape(-1, 2)
+
+    def grid_to_xy(self, points):
+        return self._points(points) * self.scale
+
+    def xy_to_grid(self, points):
+        return self._points(points) / self.scale
+
+    def xy_to_geo(self, points):
+        """XY de la red → (lon, lat)"""
+        raw = self._points(points) - self.offset
+
+        if self.geo_proj is None:
+            return raw
+
+        lon, lat = self.geo_proj(raw[:, 0], raw[:, 1], inverse=True)
+        return np.column_stack([lon, lat])
+
+    def geo_to_xy(self, points):
+        """(lon, lat) → XY de la red"""
+        geo = self._points(points)
+
+        if self.geo_proj is not None:
+            x, y = self.geo_proj(geo[:, 0], geo[:, 1])
+            geo = np.column_stack([x, y])
+
+        return geo + self.offset
+
+    def grid_to_geo(self, points):
+        return self.xy_to_geo(self.grid_to_xy(points))
+
+    def geo_to_grid(self, points):
+        return self.xy_to_grid(self.geo_to_xy(points))
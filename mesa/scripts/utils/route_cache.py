@@ -0,0 +1,124 @@
+"""
+Caché LRU de rutas calculadas por SUMO
+"""
+import threading
+from collections import OrderedDict
+
+
+class RouteCache:
+    """
+    Caché acotada de rutas con política LRU y tiempo de vida opcional
+
+    Las claves son (edge_origen, edge_destino, vtype_sumo) y los valores
+    la lista de edges de la ruta. El tiempo de vida se mide en segundos
+    de simulación, por lo que quien consulta entrega el tiempo actual.
+
+    Es segura entre hilos: el prefetch de rutas escribe desde un hilo de
+    fondo mientras el modelo lee.
+    """
+
+    def __init__(self, max_size=10000, ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __getstate__(self):
+        with self._lock:
+            state = self.__dict__.copy()
+            state['_entries'] = OrderedDict(self._entries)
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+    def get(self, key, now=0.0):
+        """Retorna la ruta cacheada o None si no existe o expiró"""
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            edges, stored_at = entry
+
+            if self.ttl is not None and now - stored_at > self.ttl:
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return edges
+
+    def peek(self, key, now=0.0):
+        """Como get, pero sin contar hits/misses ni renovar la posición LRU"""
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                return None
+
+            edges, stored_at = entry
+            if self.ttl is not None and now - stored_at > self.ttl:
+                return None
+
+            return edges
+
+    def put(self, key, edges, now=0.0):
+        """Guarda una ruta, desalojando la menos usada si se excede el tamaño"""
+        if self.max_size <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (list(edges), now)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate_edge(self, edge_id):
+        """Elimina las rutas que pasan por un edge"""
+        with self._lock:
+            stale = [key for key, (edges, _) in self._entries.items() if edge_id in edges]
+
+            for key in stale:
+                del self._entries[key]
+
+            self.invalidations += len(stale)
+            return len(stale)
+
+    def clear(self):
+        """Vacía la caché sin reiniciar los contadores"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Retorna contadores de uso de la caché"""
+        with self._lock:
+            return self._stats()
+
+    def _stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations
+        }
@@ -0,0 +1,187 @@
+"""
+Prefetch de rutas en un hilo de fondo
+
+Los agentes conocen sus viajes del día desde que se crea la agenda. El
+prefetcher recibe esos pares origen-destino, resuelve edges y rutas con
+sumolib (TraCI no es seguro entre hilos) y deja el resultado en la caché
+de rutas del conector, donde lo encuentra la inserción de vehículos.
+
+El hilo solo trabaja en ticks tranquilos (sin salidas), para no competir
+con el modelo en la hora punta. Resuelve los edges con su propio índice
+espacial, construido desde su copia de la red, sin tocar el conector. Las rutas que no alcanzaron a
+precalcularse se calculan al momento de salir con el mismo algoritmo
+sobre otra copia de la red, así que el resultado no depende de cuánto
+avanzó el hilo y el tick nunca espera a que el hilo suelte el router.
+"""
+import itertools
+import queue
+import threading
+
+from utils.edge_index import EdgeIndex
+from utils.event_log import WARNING
+
+# vClass de sumolib para cada vtype SUMO usado por el conector
+VTYPE_VCLASS = {
+    'car': 'passenger',
+    'bicycle': 'bicycle',
+    'bus': 'bus',
+    'pedestrian': 'pedestrian'
+}
+
+
+class RoutePrefetcher:
+    """Calcula rutas sumolib por orden de salida y las guarda en una RouteCache"""
+
+    def __init__(self, net_file, route_cache, projection, clock=None, event_log=None):
+        """
+        Args:
+            net_file: .net.xml que lee sumolib (en el hilo de fondo)
+            route_cache: RouteCache compartida con el conector
+            projection: Projection grilla -> XY del conector (solo lectura)
+            clock: tiempo de simulación actual, para el TTL de la caché
+        """
+        self.net_file = net_file
+        self.route_cache = route_cache
+        self.projection = projection
+        self.clock = clock
+        self.event_log = event_log
+
+        self.prefetched = 0
+        self.computed_on_demand = 0
+
+        # Una red por hilo: sumolib no es seguro entre hilos
+        self._net = None
+        self._demand_net = None
+
+        # Índice de edges y memo por celda del hilo de fondo
+        self._edge_index = None
+        self._edge_memo = {}
+        self._ready = threading.Event()
+        self._quiet = threading.Event()
+        self._stopped = False
+
+        self._pending = queue.PriorityQueue()
+        self._sequence = itertools.count()
+
+        self._thread = threading.Thread(target=self._run, name="route-prefetch", daemon=True)
+        self._thread.start()
+
+    def request(self, departure_step, origin, destination, vtype):
+        """Encola un viaje futuro; los de salida más temprana se procesan antes"""
+        if self._stopped:
+            return
+        self._pending.put((departure_step, next(self._sequence), origin, destination, vtype))
+
+    def set_quiet(self, quiet):
+        """Habilita (tick tranquilo) o pausa el trabajo del hilo"""
+        if quiet:
+            self._quiet.set()
+        else:
+            self._quiet.clear()
+
+    @property
+    def pending(self):
+        return self._pending.qsize()
+
+    def route(self, origin_edge, dest_edge, vtype):
+        """
+        Ruta sumolib más rápida entre dos edges (lista de ids) o None
+
+        La usa el conector para las rutas no precalculadas, con su propia
+        copia de la red (no comparte estado con el hilo de fondo).
+        """
+        self._ready.wait()
+        return self._route(self._demand_net, origin_edge, dest_edge, vtype)
+
+    def _route(self, net, origin_edge, dest_edge, vtype):
+        if net is None:
+            return None
+
+        try:
+            path, _ = net.getFastestPath(
+                net.getEdge(origin_edge),
+                net.getEdge(dest_edge),
+                vClass=VTYPE_VCLASS.get(vtype)
+            )
+        except Exception as e:
+            if self.event_log is not None:
+                self.event_log.emit(
+                    'route_error', WARNING,
+                    origin_edge=origin_edge, dest_edge=dest_edge, error=str(e)
+                )
+            return None
+
+        return [edge.getID() for edge in path] if path else None
+
+    def _now(self):
+        return self.clock() if self.clock is not None else 0.0
+
+    def _run(self):
+        import sumolib
+
+        # Primero la red de las rutas al momento: es la que espera el modelo
+        try:
+            self._demand_net = sumolib.net.readNet(self.net_file)
+        finally:
+            self._ready.set()
+
+        self._net = sumolib.net.readNet(self.net_file)
+        self._edge_index = EdgeIndex.from_net(self._net)
+
+        while True:
+            item = self._pending.get()
+            if item is None or item[2] is None:
+                break
+
+            self._quiet.wait()
+            if self._stopped:
+                break
+
+            _, _, origin, destination, vtype = item
+            self._prefetch(origin, destination, vtype)
+
+    def _edge_near(self, mesa_position):
+        """Edge más cercano a una celda (mismo criterio que el conector)"""
+        edge_id = self._edge_memo.get(mesa_position)
+
+        if edge_id is None:
+            if isinstance(mesa_position, tuple) and len(mesa_position) == 2:
+                point = tuple(self.projection.grid_to_xy(mesa_position)[0].tolist())
+            else:
+                point = (0, 0)
+
+            edge_id = self._edge_index.nearest_edge(point)
+            if edge_id:
+                self._edge_memo[mesa_position] = edge_id
+
+        return edge_id
+
+    def _prefetch(self, origin, destination, vtype):
+        origin_edge = self._edge_near(origin)
+        dest_edge = self._edge_near(destination)
+
+        if not origin_edge or not dest_edge or origin_edge == dest_edge:
+            return
+
+        key = (origin_edge, dest_edge, vtype)
+        if self.route_cache.peek(key, now=self._now()) is not None:
+            return
+
+        edges = self._route(self._net, origin_edge, dest_edge, vtype)
+        if edges:
+            self.route_cache.put(key, edges, now=self._now())
+            self.prefetched += 1
+
+    def close(self, timeout=5.0):
+        """Detiene el hilo descartando lo que quede pendiente"""
+        self._stopped = True
+        self._pending.put((float('-inf'), -1, None, None, None))
+        self._quiet.set()
+        self._thread.join(timeout)
+
+    def stats(self):
+        return {
+            'prefetched': self.prefetched,
+            'computed_on_demand': self.computed_on_demand,
+            'pending': self.pending
+        }
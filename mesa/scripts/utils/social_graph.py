@@ -0,0 +1,120 @@
+"""
+Grafo social de los agentes en formato CSR
+
+Los vecinos del nodo i son indices[indptr[i]:indptr[i + 1]]; los nodos
+son los unique_id de los agentes (0..n-1). Los generadores trabajan con
+arrays NumPy y muestrean aristas en vez de recorrer todos los pares, por
+lo que escalan a cientos de miles de agentes.
+"""
+import numpy as np
+
+
+class SocialGraph:
+    """Grafo no dirigido sin auto-aristas, almacenado como CSR"""
+
+    def __init__(self, indptr, indices):
+        self.indptr = indptr
+        self.indices = indices
+
+    @property
+    def n_nodes(self):
+        return len(self.indptr) - 1
+
+    @property
+    def n_edges(self):
+        return len(self.indices) // 2
+
+    def neighbors(self, node):
+        """Vecinos de un nodo (vista sobre el array de índices)"""
+        return self.indices[self.indptr[node]:self.indptr[node + 1]]
+
+    def degree(self, node):
+        return int(self.indptr[node + 1] - self.indptr[node])
+
+    @classmethod
+    def from_edges(cls, n_nodes, sources, targets):
+        """Construye el CSR simetrizando y eliminando duplicados y auto-aristas"""
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+
+        keep = sources != targets
+        sources, targets = sources[keep], targets[keep]
+
+        both_sources = np.concatenate([sources, targets])
+        both_targets = np.concatenate([targets, sources])
+
+        pairs = np.unique(both_sources * n_nodes + both_targets)
+        rows = pairs // n_nodes
+        cols = pairs % n_nodes
+
+        indptr = np.zeros(n_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n_nodes), out=indptr[1:])
+
+        return cls(indptr, cols.astype(np.int32))
+
+    @classmethod
+    def small_world(cls, n_nodes, degree=6, rewire=0.1, rng=None):
+        """
+        Watts-Strogatz: anillo donde cada nodo se une a sus `degree`
+        vecinos más cercanos, y cada arista se recablea con prob. `rewire`
+        """
+        rng = rng or np.random.default_rng()
+
+        if n_nodes < 2:
+            return cls.from_edges(n_nodes, [], [])
+
+        half = max(1, min(degree // 2, (n_nodes - 1) // 2))
+
+        nodes = np.arange(n_nodes, dtype=np.int64)
+        sources = np.repeat(nodes, half)
+        offsets = np.tile(np.arange(1, half + 1, dtype=np.int64), n_nodes)
+        targets = (sources + offsets) % n_nodes
+
+        rewired = rng.random(len(targets)) < rewire
+        targets[rewired] = rng.integers(0, n_nodes, int(rewired.sum()))
+
+        return cls.from_edges(n_nodes, sources, targets)
+
+    @classmethod
+    def stochastic_block(cls, groups, degree_in=5, degree_out=1, rng=None):
+        """
+        Modelo de bloques estocástico: `groups[i]` es el bloque del nodo i
+        y cada nodo tiene en promedio `degree_in` vecinos de su bloque y
+        `degree_out` de los demás
+
+        Para cada par de bloques se muestrea el número de aristas de una
+        binomial y luego sus extremos, sin recorrer todos los pares.
+        """
+        rng = rng or np.random.default_rng()
+
+        groups = np.asarray(groups)
+        n_nodes = len(groups)
+        labels, codes = np.unique(groups, return_inverse=True)
+        members = [np.flatnonzero(codes == block) for block in range(len(labels))]
+
+        sources = []
+        targets = []
+
+        for a, members_a in enumerate(members):
+            for b in range(a, len(members)):
+                members_b = members[b]
+                size_a, size_b = len(members_a), len(members_b)
+
+                if a == b:
+                    pairs = size_a * (size_a - 1) // 2
+                    p = degree_in / max(1, size_a - 1)
+                else:
+                    pairs = size_a * size_b
+                    p = degree_out / max(1, n_nodes - size_a)
+
+                if pairs == 0:
+                    continue
+
+                n_edges = rng.binomial(pairs, min(1.0, p))
+                sources.append(members_a[rng.integers(0, size_a, n_edges)])
+                targets.append(members_b[rng.integers(0, size_b, n_edges)])
+
+        if not sources:
+            return cls.from_edges(n_nodes, [], [])
+
+        return cls.from_edges(n_nodes, np.concatenate(sources), np.concatenate(targets))
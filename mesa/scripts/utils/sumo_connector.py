@@ -1,26 +1,224 @@
 """
 Conector con SUMO vía TraCI - Versión con manejo de reconexión
+
+Soporta dos backends con la misma API pública:
+- 'traci': conexión TCP a un servidor SUMO remoto (setup Docker)
+- 'libsumo': SUMO embebido en el proceso, sin latencia de socket
+
+Con el backend 'traci' y launch=True el conector lanza su propio proceso
+SUMO en `port` (útil para corridas paralelas sin Docker).
+
+Cada simulation_step avanza `substeps` pasos de SUMO en una sola llamada
+(simulationStep hasta el tiempo objetivo). Las salidas, llegadas y
+teletransportes ocurridos dentro de la ventana se obtienen de las
+suscripciones al final de ella y el modelo los entrega en lote.
+
+Los vehículos pedidos durante la fase de agentes se encolan y se insertan
+juntos en flush_spawns(), una vez por tick, sobre rutas compartidas.
+
+save_state/load_state guardan y cargan el estado de SUMO para los
+checkpoints del modelo, junto con el seguimiento de vehículos del conector.
 """
 import traci
+from traci import constants as tc
 import time
-import math
+import os
+import xml.etree.ElementTree as ET
+from utils.edge_index import EdgeIndex
+from utils.route_cache import RouteCache
+from utils.route_prefetcher import RoutePrefetcher
+from utils.event_log import EventLog, DEBUG, WARNING
+from utils.projection import Projection
+
+# Variables leídas por suscripción para cada vehículo creado por Mesa
+VEHICLE_SUBSCRIPTION_VARS = [
+    tc.VAR_POSITION,
+    tc.VAR_SPEED,
+    tc.VAR_ROAD_ID,
+    tc.VAR_MAXSPEED
+]
+
+# Variables globales de la simulación leídas en cada paso
+SIMULATION_SUBSCRIPTION_VARS = [
+    tc.VAR_TIME,
+    tc.VAR_PENDING_VEHICLES,
+    # Acumulado sobre todos los subpasos de un simulationStep(t)
+    tc.VAR_TELEPORT_STARTING_VEHICLES_IDS
+]
+
+# Estadísticas por edge para el mapa de congestión
+EDGE_SUBSCRIPTION_VARS = [
+    tc.LAST_STEP_MEAN_SPEED,
+    tc.LAST_STEP_VEHICLE_NUMBER
+]
 
 class SumoConnector:
     
-    def __init__(self, host="sumo-server", port=8813, mesa_to_sumo_scale=10.0):
+    def __init__(self, host="sumo-server", port=8813, mesa_to_sumo_scale=10.0,
+                 net_file=None, route_cache_size=None, route_cache_ttl=None,
+                 congestion_invalidation_threshold=None, backend=None,
+                 sumo_config=None, launch=False, sumo_seed=None, event_log=None,
+                 edge_statistics=True, substeps=None):
+        self.backend = (backend or os.getenv("SUMO_BACKEND", "traci")).lower()
+        self.sumo_config = sumo_config or os.getenv("SUMO_CONFIG")
+        self.launch = launch
+        self.event_log = event_log or EventLog()
+        self.sumo_seed = sumo_seed
+        self.edge_statistics = edge_statistics
+        self.substeps = max(1, int(substeps or os.getenv("SUMO_SUBSTEPS", "1")))
+        self.step_length = 1.0
+        self._sumo = self._load_backend(self.backend)
         self.host = host
         self.port = port
         self.connected = False
         self.mesa_to_sumo_scale = mesa_to_sumo_scale
+        self.net_file = net_file or os.getenv("SUMO_NET_FILE")
+        self.projection = self._load_projection()
+        self._edge_index = None
+        self.sim_time = 0.0
+        
+        # Estado con que arranca el próximo SUMO propio (path, tiempo) y
+        # tiempo del estado cargado en un servidor remoto
+        self._resume = None
+        self._loaded_at = None
+        
+        # Snapshot por paso: se llena una vez en simulation_step y los
+        # agentes lo leen localmente
+        self._tracked_vehicles = set()
+        self._awaiting_departure = set()
+        self.vehicle_snapshot = {}
+        self.departed_vehicles = set()
+        self.arrived_vehicles = set()
+        self.teleported_vehicles = set()
+        self.edge_snapshot = {}
+        
+        # Inserciones diferidas hasta el flush del tick y rutas ya
+        # registradas en SUMO (lista de edges -> route id)
+        self._spawn_queue = {}
+        self._route_ids = {}
+        self._route_seq = 0
+        self._edge_memo = {}
+        
+        if route_cache_size is None:
+            route_cache_size = int(os.getenv("ROUTE_CACHE_SIZE", "10000"))
+        if route_cache_ttl is None and os.getenv("ROUTE_CACHE_TTL"):
+            route_cache_ttl = float(os.getenv("ROUTE_CACHE_TTL"))
+        if congestion_invalidation_threshold is None and os.getenv("ROUTE_CACHE_INVALIDATION_THRESHOLD"):
+            congestion_invalidation_threshold = float(os.getenv("ROUTE_CACHE_INVALIDATION_THRESHOLD"))
+        
+        self.route_cache = RouteCache(max_size=route_cache_size, ttl=route_cache_ttl)
+        self.congestion_invalidation_threshold = congestion_invalidation_threshold
+        self.prefetcher = None
+        
         self._connect()
     
+    def _load_projection(self):
+        """Proyección grilla ↔ XY ↔ geo, leída del .net.xml si está disponible"""
+        if self.net_file and os.path.exists(self.net_file):
+            return Projection.from_net_file(self.net_file, scale=self.mesa_to_sumo_scale)
+        return Projection(scale=self.mesa_to_sumo_scale)
+    
+    @staticmethod
+    def _load_backend(backend):
+        """Retorna el módulo que implementa la API TraCI"""
+        if backend == 'traci':
+            return traci
+        
+        if backend == 'libsumo':
+            try:
+                import libsumo
+            except ImportError as e:
+                raise ImportError("El backend 'libsumo' requiere el paquete libsumo") from e
+            return libsumo
+        
+        raise ValueError(f"Backend SUMO desconocido: {backend}")
+    
     def _connect(self):
-        """Conecta a SUMO con reintentos y manejo de reconexión"""
+        """Conecta a SUMO según el backend configurado"""
+        # Una reconexión puede apuntar a otra red
+        self.invalidate_edge_index()
+        self.route_cache.clear()
+        self._reset_snapshot()
+        
+        if self.backend == 'libsumo':
+            self._start_in_process()
+        elif self.launch:
+            self._launch_local()
+        else:
+            self._connect_remote()
+    
+    def _sumo_command(self):
+        """Línea de comandos para arrancar SUMO con la configuración local"""
+        command = ["sumo", "-c", self.sumo_config, "--no-step-log", "true",
+                   "--save-state.rng", "true"]
+        
+        if self.sumo_seed is not None:
+            command += ["--seed", str(self.sumo_seed)]
+        
+        # Retomar desde un estado: SUMO descarta los vehículos del archivo
+        # de rutas que salían antes de --begin
+        if self._resume is not None:
+            state_file, begin = self._resume
+            command += ["--load-state", state_file, "--begin", str(begin)]
+            end = self._configured_end()
+            if end is not None and end <= begin:
+                command += ["--end", "-1"]
+        
+        return command
+    
+    def _configured_end(self):
+        """Tiempo de fin de la configuración SUMO, o None si no lo fija"""
+        try:
+            end = ET.parse(self.sumo_config).getroot().find('time/end')
+        except (OSError, ET.ParseError):
+            return None
+        
+        if end is None or end.get('value') is None:
+            return None
+        return float(end.get('value'))
+    
+    def _start_in_process(self):
+        """Arranca SUMO dentro del proceso con libsumo"""
+        if not self.sumo_config:
+            print("💥 El backend libsumo requiere sumo_config (o SUMO_CONFIG)")
+            return
+        
+        try:
+            self._sumo.close()
+        except:
+            pass
+        
+        try:
+            print(f"🚦 Iniciando SUMO en proceso (libsumo) con {self.sumo_config}...")
+            self._sumo.start(self._sumo_command())
+            self.connected = True
+            self._subscribe_simulation()
+            print("✅ SUMO en proceso iniciado exitosamente")
+        except Exception as e:
+            print(f"💥 No se pudo iniciar SUMO con libsumo: {e}")
+    
+    def _launch_local(self):
+        """Lanza un proceso SUMO propio en self.port y se conecta vía TraCI"""
+        if not self.sumo_config:
+            print("💥 launch=True requiere sumo_config (o SUMO_CONFIG)")
+            return
+        
+        try:
+            print(f"🚦 Lanzando SUMO local en puerto {self.port} con {self.sumo_config}...")
+            self._sumo.start(self._sumo_command(), port=self.port)
+            self.connected = True
+            self._subscribe_simulation()
+            print("✅ SUMO local iniciado exitosamente")
+        except Exception as e:
+            print(f"💥 No se pudo lanzar SUMO local: {e}")
+    
+    def _connect_remote(self):
+        """Conecta a un servidor SUMO con reintentos y manejo de reconexión"""
         max_retries = 10
         
         # Primero intentar cerrar cualquier conexión existente
         try:
-            traci.close()
+            self._sumo.close()
             print("🔄 Conexión SUMO anterior cerrada")
             time.sleep(1)
         except:
@@ -29,18 +227,20 @@ class SumoConnector:
         for attempt in range(max_retries):
             try:
                 print(f"🚦 Intento {attempt + 1}/{max_retries}: Conectando a SUMO en {self.host}:{self.port}...")
-                traci.init(port=self.port, host=self.host)
+                self._sumo.init(port=self.port, host=self.host)
                 self.connected = True
+                self._subscribe_simulation()
                 print("✅ Conectado a SUMO exitosamente")
                 return
             except Exception as e:
                 # Si el error es "already active", intentar cerrar y reconectar
                 if "already active" in str(e).lower():
                     try:
-                        traci.close()
+                        self._sumo.close()
                         time.sleep(1)
-                        traci.init(port=self.port, host=self.host)
+                        self._sumo.init(port=self.port, host=self.host)
                         self.connected = True
+                        self._subscribe_simulation()
                         print("✅ Reconectado a SUMO exitosamente")
                         return
                     except:
@@ -51,132 +251,521 @@ class SumoConnector:
                 else:
                     print(f"💥 No se pudo conectar a SUMO: {e}")
     
+    def _subscribe_simulation(self):
+        """Suscribe las variables globales que se leen en cada paso"""
+        self.step_length = self._sumo.simulation.getDeltaT()
+        self.sim_time = self._sumo.simulation.getTime()
+        self._sumo.simulation.subscribe(SIMULATION_SUBSCRIPTION_VARS)
+        
+        if self.edge_statistics:
+            for edge_id in sorted(self._get_edge_index().edge_ids):
+                self._sumo.edge.subscribe(edge_id, EDGE_SUBSCRIPTION_VARS)
+    
+    def _reset_snapshot(self):
+        """Limpia el estado de vehículos seguidos"""
+        self._tracked_vehicles = set()
+        self._awaiting_departure = set()
+        self.vehicle_snapshot = {}
+        self.departed_vehicles = set()
+        self.arrived_vehicles = set()
+        self.teleported_vehicles = set()
+        self.edge_snapshot = {}
+        self._spawn_queue = {}
+        self._route_ids = {}
+        self._route_seq = 0
+        self._loaded_at = None
+    
+    def save_state(self, path):
+        """
+        Guarda el estado de SUMO en `path` (visto por el proceso SUMO)
+        
+        Returns:
+            dict: seguimiento de vehículos, snapshot del paso y caché de
+            rutas, para pasar a load_state; None si no se pudo guardar
+        """
+        if not self.connected:
+            return None
+        
+        try:
+            self._sumo.simulation.saveState(path)
+        except Exception as e:
+            self.event_log.emit('checkpoint_error', WARNING, path=path, error=str(e))
+            return None
+        
+        return {
+            'sim_time': self.sim_time,
+            'substeps': self.substeps,
+            'tracked_vehicles': set(self._tracked_vehicles),
+            'awaiting_departure': set(self._awaiting_departure),
+            'vehicle_snapshot': dict(self.vehicle_snapshot),
+            'departed_vehicles': set(self.departed_vehicles),
+            'arrived_vehicles': set(self.arrived_vehicles),
+            'teleported_vehicles': set(self.teleported_vehicles),
+            'edge_snapshot': dict(self.edge_snapshot),
+            'route_ids': dict(self._route_ids),
+            'route_seq': self._route_seq,
+            'route_cache': self.route_cache
+        }
+    
+    def load_state(self, path, state):
+        """
+        Carga un estado guardado con save_state y retoma el seguimiento
+        
+        Con libsumo o launch=True, SUMO se reinicia con --load-state y
+        --begin en el tiempo guardado, igual que la corrida sin cortar. Un
+        servidor remoto carga el estado con loadState, que vuelve a leer
+        el archivo de rutas: los vehículos de rutas que salían antes del
+        tiempo guardado se quitan al terminar la primera ventana.
+        
+        Los vehículos seguidos se vuelven a suscribir. Un vehículo que no
+        esté en el estado se da por llegado en el próximo paso.
+        
+        Returns:
+            bool: True si SUMO cargó el estado
+        """
+        if not self.connected:
+            return False
+        
+        if self.backend == 'libsumo' or self.launch:
+            self._resume = (path, state['sim_time'])
+            self.connected = False
+            try:
+                self._connect()
+            finally:
+                self._resume = None
+            
+            if not self.connected:
+                print(f"💥 No se pudo arrancar SUMO desde el estado {path}")
+                return False
+        else:
+            try:
+                self._sumo.simulation.loadState(path)
+            except Exception as e:
+                print(f"💥 No se pudo cargar el estado SUMO {path}: {e}")
+                return False
+            
+            self._subscribe_simulation()
+            self._loaded_at = (self.sim_time, set(self._sumo.simulation.getPendingVehicles()))
+        
+        self._tracked_vehicles = set(state['tracked_vehicles'])
+        self._awaiting_departure = set(state.get('awaiting_departure', ()))
+        self.vehicle_snapshot = dict(state['vehicle_snapshot'])
+        self.departed_vehicles = set(state.get('departed_vehicles', ()))
+        self.arrived_vehicles = set(state['arrived_vehicles'])
+        self.teleported_vehicles = set(state['teleported_vehicles'])
+        self.edge_snapshot = dict(state['edge_snapshot'])
+        self._spawn_queue = {}
+        self.route_cache = state['route_cache']
+        if self.prefetcher is not None:
+            self.prefetcher.route_cache = self.route_cache
+        
+        # Solo sobreviven las rutas que trae el estado; los ids nuevos
+        # siguen la numeración para no chocar con ellas
+        existing = set(self._sumo.route.getIDList())
+        self._route_ids = {
+            edges: route_id for edges, route_id in state['route_ids'].items()
+            if route_id in existing
+        }
+        self._route_seq = state['route_seq']
+        
+        for vehicle_id in sorted(self._tracked_vehicles):
+            try:
+                self._sumo.vehicle.subscribe(vehicle_id, VEHICLE_SUBSCRIPTION_VARS)
+            except Exception:
+                pass
+        
+        return True
+    
     def close(self):
         """Cierra la conexión SUMO"""
+        if self.prefetcher is not None:
+            self.prefetcher.close()
+            self.prefetcher = None
+        
         if self.connected:
             try:
-                traci.close()
+                self._sumo.close()
                 self.connected = False
-                print("🔌 Conexión SUMO cerrada")
+                stats = self.route_cache.stats()
+                print(f"🔌 Conexión SUMO cerrada (caché de rutas: {stats['hits']} hits, "
+                      f"{stats['misses']} misses)")
             except:
                 pass
     
     def simulation_step(self):
-        """Avanza un paso en SUMO"""
+        """
+        Avanza `substeps` pasos en SUMO con una sola llamada y actualiza
+        el snapshot de vehículos
+        """
         if self.connected:
             try:
-                traci.simulationStep()
+                if self.substeps == 1:
+                    self._sumo.simulationStep()
+                else:
+                    self._sumo.simulationStep(self.sim_time + self.substeps * self.step_length)
+                self._update_snapshot()
             except Exception as e:
                 print(f"⚠️ Error en simulation_step: {e}")
                 self.connected = False
     
+    def advance(self, ticks):
+        """
+        Avanza SUMO el equivalente a `ticks` ticks de Mesa en una sola
+        llamada (usado al saltar periodos sin actividad)
+        """
+        if self.connected:
+            try:
+                self._sumo.simulationStep(self.sim_time + ticks * self.substeps * self.step_length)
+                self._update_snapshot()
+            except Exception as e:
+                print(f"⚠️ Error en advance: {e}")
+                self.connected = False
+    
+    def _update_snapshot(self):
+        """
+        Lee todas las suscripciones del paso en una sola pasada
+        
+        Los vehículos se suscriben al crearlos, así que un vehículo seguido
+        que ya no está pendiente de inserción ni aparece en los resultados
+        de suscripción salió de la simulación en algún subpaso de la
+        ventana. Los que estaban esperando inserción y ya no están
+        pendientes salieron en la ventana (aunque también hayan llegado).
+        Los teletransportes de la suscripción cubren la ventana completa.
+        """
+        sim_results = self._sumo.simulation.getSubscriptionResults()
+        
+        self.sim_time = sim_results.get(tc.VAR_TIME, self.sim_time)
+        
+        if self._loaded_at is not None:
+            self._drop_replayed_vehicles()
+        
+        pending = self._tracked_vehicles.intersection(
+            sim_results.get(tc.VAR_PENDING_VEHICLES, ())
+        )
+        results = [
+            (vehicle_id, values)
+            for vehicle_id, values in self._sumo.vehicle.getAllSubscriptionResults().items()
+            if vehicle_id in self._tracked_vehicles and vehicle_id not in pending
+        ]
+        
+        running = {vehicle_id for vehicle_id, _ in results}
+        self.departed_vehicles = self._awaiting_departure - pending
+        self._awaiting_departure &= pending
+        self.arrived_vehicles = self._tracked_vehicles - running - pending
+        self.teleported_vehicles = self._tracked_vehicles.intersection(
+            sim_results.get(tc.VAR_TELEPORT_STARTING_VEHICLES_IDS, ())
+        )
+        self._tracked_vehicles -= self.arrived_vehicles
+        
+        # Todas las posiciones del paso se proyectan a la grilla de una vez
+        positions = self.projection.xy_to_grid(
+            [values[tc.VAR_POSITION] for _, values in results]
+        ).tolist()
+        
+        self.vehicle_snapshot = {
+            vehicle_id: {
+                'speed': values[tc.VAR_SPEED],
+                'max_speed': values[tc.VAR_MAXSPEED],
+                'position': tuple(position),
+                'edge': values[tc.VAR_ROAD_ID]
+            }
+            for (vehicle_id, values), position in zip(results, positions)
+        }
+        
+        if self.edge_statistics:
+            self.edge_snapshot = {
+                edge_id: (values[tc.LAST_STEP_MEAN_SPEED], values[tc.LAST_STEP_VEHICLE_NUMBER])
+                for edge_id, values in self._sumo.edge.getAllSubscriptionResults().items()
+            }
+    
+    def _drop_replayed_vehicles(self):
+        """
+        Quita los vehículos del archivo de rutas que loadState volvió a
+        insertar: salieron en la primera ventana tras cargar el estado
+        pero querían salir antes del tiempo guardado
+        """
+        loaded_time, pending_in_state = self._loaded_at
+        self._loaded_at = None
+        
+        for vehicle_id in self._sumo.simulation.getDepartedIDList():
+            if vehicle_id in self._tracked_vehicles or vehicle_id in pending_in_state:
+                continue
+            
+            try:
+                desired = self._sumo.vehicle.getDeparture(vehicle_id) - self._sumo.vehicle.getDepartDelay(vehicle_id)
+                if desired < loaded_time:
+                    self._sumo.vehicle.remove(vehicle_id)
+                    self.event_log.emit('replayed_vehicle_removed', DEBUG, vehicle=vehicle_id)
+            except Exception:
+                pass
+    
     def add_vehicle(self, vehicle_id, vehicle_type, origin, destination):
-        """Agrega vehículo a SUMO en su edge más cercano"""
+        """Agrega un vehículo a SUMO de inmediato (sin esperar al flush del tick)"""
         if not self.connected:
             return False
         
-        try:
-            origin_sumo = self._mesa_to_sumo_coords(origin)
-            dest_sumo = self._mesa_to_sumo_coords(destination)
-            
-            origin_edge = self._find_closest_edge(origin_sumo)
-            dest_edge = self._find_closest_edge(dest_sumo)
+        failed = self._insert_vehicles({vehicle_id: (vehicle_type, origin, destination)})
+        
+        if vehicle_id in failed:
+            self.event_log.emit('spawn_failed', WARNING, vehicle=vehicle_id, reason=failed[vehicle_id])
+            return False
+        return True
+    
+    def queue_vehicle(self, vehicle_id, vehicle_type, origin, destination):
+        """
+        Encola un vehículo para insertarlo en el próximo flush_spawns()
+        
+        Mientras está en cola cuenta como existente (vehicle_exists) y
+        remove_vehicle lo descarta sin tocar SUMO.
+        
+        Returns:
+            bool: False si no hay conexión con SUMO
+        """
+        if not self.connected:
+            return False
+        
+        self._spawn_queue[vehicle_id] = (vehicle_type, origin, destination)
+        return True
+    
+    def flush_spawns(self):
+        """
+        Inserta en lote todos los vehículos encolados durante el tick
+        
+        Returns:
+            dict: {vehicle_id: motivo} de los vehículos que no se pudieron
+            insertar
+        """
+        if not self._spawn_queue:
+            return {}
+        
+        queue, self._spawn_queue = self._spawn_queue, {}
+        return self._insert_vehicles(queue)
+    
+    def _insert_vehicles(self, requests):
+        """
+        Resuelve edges y rutas una vez por par origen-destino distinto y
+        agrega los vehículos sobre rutas compartidas
+        
+        Los edges salen del índice local (memorizados por celda) y las
+        rutas de la caché; solo los pares nuevos van a findRoute. Cada
+        lista de edges distinta se registra en SUMO una única vez. Los
+        fallos se retornan sin registrarlos: los registra quien los maneja.
+        """
+        failed = {}
+        routes = {}
+        
+        for vehicle_id, (vehicle_type, origin, destination) in requests.items():
+            origin_edge = self._edge_near(origin)
+            dest_edge = self._edge_near(destination)
             
             if not origin_edge or not dest_edge:
-                print(f"⚠️ No se encontraron edges para {vehicle_id}")
-                return False
+                failed[vehicle_id] = 'no_edge'
+                continue
             
-            route_edges = self._calculate_route(origin_edge, dest_edge, vehicle_type)
+            key = (origin_edge, dest_edge, vehicle_type)
+            if key not in routes:
+                routes[key] = self._calculate_route(origin_edge, dest_edge, vehicle_type)
+            route_edges = routes[key]
             
             if not route_edges:
-                print(f"⚠️ No se encontró ruta para {vehicle_id}")
-                return False
-            
-            route_id = f"route_{vehicle_id}"
-            traci.route.add(route_id, route_edges)
+                failed[vehicle_id] = 'no_route'
+                continue
             
-            sumo_vtype = self._map_vehicle_type(vehicle_type)
+            try:
+                self._sumo.vehicle.add(
+                    vehID=vehicle_id,
+                    routeID=self._shared_route(route_edges),
+                    typeID=self._map_vehicle_type(vehicle_type),
+                    depart='now',
+                    departLane='best',
+                    departSpeed='max'
+                )
+                
+                self._sumo.vehicle.subscribe(vehicle_id, VEHICLE_SUBSCRIPTION_VARS)
+                self._tracked_vehicles.add(vehicle_id)
+                self._awaiting_departure.add(vehicle_id)
+                
+            except Exception as e:
+                failed[vehicle_id] = str(e)
+                continue
             
-            traci.vehicle.add(
-                vehID=vehicle_id,
-                routeID=route_id,
-                typeID=sumo_vtype,
-                depart='now',
-                departLane='best',
-                departSpeed='max'
+            self.event_log.emit(
+                'vehicle_spawned', DEBUG,
+                vehicle=vehicle_id, origin_edge=origin_edge, dest_edge=dest_edge
             )
-            
-            print(f"✅ Vehículo {vehicle_id} creado: {origin_edge} → {dest_edge}")
-            return True
-            
-        except Exception as e:
-            print(f"⚠️ Error al agregar vehículo {vehicle_id}: {e}")
-            return False
+        
+        return failed
+    
+    def _edge_near(self, mesa_position):
+        """Edge más cercano a una posición Mesa, memorizado por posición"""
+        edge_id = self._edge_memo.get(mesa_position)
+        
+        if edge_id is None:
+            edge_id = self._find_closest_edge(self._mesa_to_sumo_coords(mesa_position))
+            if edge_id:
+                self._edge_memo[mesa_position] = edge_id
+        
+        return edge_id
+    
+    def _shared_route(self, route_edges):
+        """ID de ruta SUMO para una lista de edges, registrándola la primera vez"""
+        key = tuple(route_edges)
+        route_id = self._route_ids.get(key)
+        
+        if route_id is None:
+            route_id = f"mesa_route_{self._route_seq}"
+            self._sumo.route.add(route_id, list(key))
+            self._route_ids[key] = route_id
+            self._route_seq += 1
+        
+        return route_id
     
     def _mesa_to_sumo_coords(self, mesa_coords):
         """Convierte coordenadas Mesa a SUMO"""
         if not isinstance(mesa_coords, tuple) or len(mesa_coords) != 2:
             return (0, 0)
         
-        x_sumo = mesa_coords[0] * self.mesa_to_sumo_scale
-        y_sumo = mesa_coords[1] * self.mesa_to_sumo_scale
+        return tuple(self.projection.grid_to_xy(mesa_coords)[0].tolist())
+    
+    def _get_edge_index(self):
+        """
+        Retorna el índice espacial de edges, construyéndolo una sola vez
+        
+        Usa el .net.xml vía sumolib si está disponible; si no, hace una
+        única pasada por TraCI para leer la geometría.
+        """
+        if self._edge_index is None:
+            if self.net_file and os.path.exists(self.net_file):
+                self._edge_index = EdgeIndex.from_net_file(self.net_file)
+                source = self.net_file
+            else:
+                self._edge_index = EdgeIndex.from_traci(self._sumo)
+                source = "TraCI"
+            
+            print(f"🗺️ Índice de edges construido desde {source}: {len(self._edge_index)} edges")
         
-        return (x_sumo, y_sumo)
+        return self._edge_index
+    
+    def edge_layout(self):
+        """
+        Punto representativo (coordenadas Mesa) y velocidad libre de cada
+        edge, para alinear estadísticas de edges con la grilla
+        """
+        index = self._get_edge_index()
+        edge_ids = list(index.edge_points)
+        
+        grid_points = self.projection.xy_to_grid(
+            [index.edge_points[edge_id] for edge_id in edge_ids]
+        ).tolist()
+        
+        return dict(zip(edge_ids, map(tuple, grid_points))), dict(index.edge_speeds)
+    
+    def invalidate_edge_index(self):
+        """Descarta el índice de edges (llamar cuando cambie la red)"""
+        self._edge_index = None
+        self._edge_memo = {}
     
     def _find_closest_edge(self, sumo_coords):
-        """Encuentra el edge más cercano"""
+        """Encuentra el edge más cercano usando el índice espacial local"""
         try:
-            edges = traci.edge.getIDList()
-            
-            if not edges:
-                return None
-            
-            min_distance = float('inf')
-            closest_edge = None
-            
-            for edge_id in edges:
-                try:
-                    shape = traci.edge.getShape(edge_id)
-                    
-                    for point in shape:
-                        distance = self._euclidean_distance(sumo_coords, point)
-                        if distance < min_distance:
-                            min_distance = distance
-                            closest_edge = edge_id
-                
-                except:
-                    continue
-            
-            return closest_edge
+            return self._get_edge_index().nearest_edge(sumo_coords)
             
         except Exception as e:
-            print(f"⚠️ Error buscando edge: {e}")
+            self.event_log.emit('edge_lookup_error', WARNING, error=str(e))
             return None
     
-    def _euclidean_distance(self, point1, point2):
-        """Calcula distancia euclidiana"""
-        return math.sqrt((point1[0] - point2[0])**2 + (point1[1] - point2[1])**2)
-    
     def _calculate_route(self, origin_edge, dest_edge, vehicle_type='car'):
-        """Calcula ruta entre dos edges"""
+        """
+        Calcula ruta entre dos edges, reutilizando rutas cacheadas
+        
+        Retorna None si no hay ruta: insertar un vehículo con una ruta
+        inválida hace fallar el simulationStep siguiente y desconecta SUMO.
+        """
         try:
             if origin_edge == dest_edge:
                 return [origin_edge]
             
-            route = traci.simulation.findRoute(
-                fromEdge=origin_edge,
-                toEdge=dest_edge,
-                vType=self._map_vehicle_type(vehicle_type)
-            )
+            sumo_vtype = self._map_vehicle_type(vehicle_type)
+            cache_key = (origin_edge, dest_edge, sumo_vtype)
+            
+            cached = self.route_cache.get(cache_key, now=self.sim_time)
+            if cached is not None:
+                return list(cached)
             
-            if route and route.edges:
-                return list(route.edges)
+            if self.prefetcher is not None:
+                # Mismo router que el prefetch, para no depender de su avance
+                edges = self.prefetcher.route(origin_edge, dest_edge, sumo_vtype)
+                self.prefetcher.computed_on_demand += 1
+            else:
+                route = self._sumo.simulation.findRoute(
+                    fromEdge=origin_edge,
+                    toEdge=dest_edge,
+                    vType=sumo_vtype
+                )
+                edges = route.edges if route else None
             
-            return [origin_edge, dest_edge]
+            if edges:
+                self.route_cache.put(cache_key, edges, now=self.sim_time)
+                return list(edges)
+            
+            return None
             
         except Exception as e:
-            print(f"⚠️ Error calculando ruta: {e}")
-            return [origin_edge, dest_edge]
+            self.event_log.emit(
+                'route_error', WARNING,
+                origin_edge=origin_edge, dest_edge=dest_edge, error=str(e)
+            )
+            return None
+    
+    def enable_prefetch(self):
+        """
+        Arranca el prefetch de rutas en segundo plano (requiere el .net.xml)
+        
+        Desde entonces las rutas se calculan con sumolib en vez de
+        findRoute, tanto en el hilo de fondo como al salir.
+        """
+        if self.prefetcher is None and self.connected and self.net_file and os.path.exists(self.net_file):
+            self._get_edge_index()
+            self.prefetcher = RoutePrefetcher(
+                self.net_file,
+                self.route_cache,
+                self.projection,
+                clock=lambda: self.sim_time,
+                event_log=self.event_log
+            )
+            print("🧵 Prefetch de rutas en segundo plano activado")
+        
+        return self.prefetcher
+    
+    def prefetch_route(self, departure_step, origin, destination, vehicle_type):
+        """Pide precalcular la ruta de un viaje futuro (si hay prefetch)"""
+        if self.prefetcher is not None:
+            self.prefetcher.request(
+                departure_step, origin, destination, self._map_vehicle_type(vehicle_type)
+            )
+    
+    def report_congestion(self, mesa_position, severity):
+        """
+        Invalida rutas cacheadas que cruzan una zona congestionada
+        
+        Solo actúa si se configuró congestion_invalidation_threshold y la
+        severidad reportada lo supera.
+        """
+        threshold = self.congestion_invalidation_threshold
+        
+        if threshold is None or severity < threshold:
+            return 0
+        
+        edge_id = self._find_closest_edge(self._mesa_to_sumo_coords(mesa_position))
+        
+        if not edge_id:
+            return 0
+        
+        return self.route_cache.invalidate_edge(edge_id)
+    
+    def get_route_cache_stats(self):
+        """Retorna hits/misses de la caché de rutas"""
+        return self.route_cache.stats()
     
     def _map_vehicle_type(self, mesa_vehicle_type):
         """Mapea tipos de vehículo"""
@@ -189,55 +778,40 @@ class SumoConnector:
         return mapping.get(mesa_vehicle_type, 'car')
     
     def get_vehicle_position(self, vehicle_id):
-        """Obtiene posición del vehículo"""
-        if not self.connected:
-            return None
-        
-        try:
-            sumo_pos = traci.vehicle.getPosition(vehicle_id)
-            mesa_pos = (
-                sumo_pos[0] / self.mesa_to_sumo_scale,
-                sumo_pos[1] / self.mesa_to_sumo_scale
-            )
-            return mesa_pos
-        except:
-            return None
+        """Obtiene posición del vehículo desde el snapshot del paso"""
+        data = self.vehicle_snapshot.get(vehicle_id)
+        return data['position'] if data else None
     
     def get_vehicle_data(self, vehicle_id):
-        """Obtiene datos del vehículo"""
-        if not self.connected:
-            return None
-        
-        try:
-            return {
-                'speed': traci.vehicle.getSpeed(vehicle_id),
-                'max_speed': traci.vehicle.getMaxSpeed(vehicle_id),
-                'position': self.get_vehicle_position(vehicle_id),
-                'edge': traci.vehicle.getRoadID(vehicle_id)
-            }
-        except:
-            return None
+        """Obtiene datos del vehículo desde el snapshot del paso"""
+        return self.vehicle_snapshot.get(vehicle_id)
     
     def remove_vehicle(self, vehicle_id):
-        """Remueve vehículo de SUMO"""
-        if self.connected:
+        """Remueve vehículo de SUMO (si no llegó ya a su destino)"""
+        still_running = vehicle_id in self._tracked_vehicles
+        self._tracked_vehicles.discard(vehicle_id)
+        self._awaiting_departure.discard(vehicle_id)
+        self._spawn_queue.pop(vehicle_id, None)
+        self.vehicle_snapshot.pop(vehicle_id, None)
+        
+        if self.connected and still_running:
             try:
-                traci.vehicle.remove(vehicle_id)
+                self._sumo.vehicle.remove(vehicle_id)
             except:
                 pass
 
     def vehicle_exists(self, vehicle_id):
         """
-        Verifica si un vehículo existe en la simulación
+        Verifica si un vehículo sigue en la simulación (insertado o
+        pendiente de inserción), sin consultar a SUMO
+        
+        Sin conexión ningún vehículo sigue en la simulación: los viajes en
+        curso terminan en el tick siguiente en vez de esperar el timeout
+        de liveness.
         
         Returns:
             bool: True si existe, False si no
         """
         if not self.connected:
             return False
-        
-        try:
-            vehicle_list = traci.vehicle.getIDList()
-            return vehicle_id in vehicle_list
-        except:
-            return False
\ No newline at end of file
+        return vehicle_id in self._tracked_vehicles or vehicle_id in self._spawn_queue
@@ -0,0 +1,92 @@
+"""
+Bus de reportes de tráfico con buzones acotados por agente
+
+Cada reporte se publica una sola vez en un ring buffer del modelo. Los
+amigos del emisor reciben solo el número de secuencia del reporte en su
+buzón, también un ring buffer de tamaño fijo. Al leer un buzón se
+descartan los reportes sobrescritos en el bus o más viejos que el TTL.
+"""
+import numpy as np
+
+NO_REPORT = -1
+
+
+class TrafficBus:
+    """Reportes de congestión compartidos a través del grafo social"""
+
+    def __init__(self, graph, capacity=65536, inbox_size=16, ttl=60):
+        self.graph = graph
+        self.capacity = capacity
+        self.inbox_size = inbox_size
+        self.ttl = ttl
+
+        # Reportes, indexados por secuencia % capacity
+        self.published = 0
+        self._step = np.zeros(capacity, dtype=np.int64)
+        self._location = np.zeros((capacity, 2), dtype=np.int32)
+        self._severity = np.zeros(capacity, dtype=np.float32)
+        self._reporter = np.zeros(capacity, dtype=np.int64)
+
+        # Buzones: secuencias de reportes recibidos, por agente
+        n_agents = graph.n_nodes
+        self._inbox = np.full((n_agents, inbox_size), NO_REPORT, dtype=np.int64)
+        self._inbox_head = np.zeros(n_agents, dtype=np.int64)
+
+    def __getstate__(self):
+        # Solo los slots ya escritos del ring buffer
+        used = min(self.published, self.capacity)
+        state = self.__dict__.copy()
+        for name in ('_step', '_location', '_severity', '_reporter'):
+            state[name] = state[name][:used].copy()
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        for name in ('_step', '_location', '_severity', '_reporter'):
+            used = state[name]
+            column = np.zeros((self.capacity,) + used.shape[1:], dtype=used.dtype)
+            column[:len(used)] = used
+            setattr(self, name, column)
+
+    def publish(self, reporter, location, severity, step):
+        """Publica un reporte y lo entrega a los vecinos del emisor"""
+        seq = self.published
+        slot = seq % self.capacity
+
+        self._step[slot] = step
+        self._location[slot] = location
+        self._severity[slot] = severity
+        self._reporter[slot] = reporter
+        self.published += 1
+
+        friends = self.graph.neighbors(reporter)
+        if len(friends):
+            heads = self._inbox_head[friends]
+            self._inbox[friends, heads % self.inbox_size] = seq
+            self._inbox_head[friends] = heads + 1
+
+        return seq
+
+    def inbox(self, agent_id, now):
+        """Reportes vigentes recibidos por un agente, del más nuevo al más viejo"""
+        seqs = self._inbox[agent_id]
+        oldest_kept = self.published - self.capacity
+
+        valid = (seqs != NO_REPORT) & (seqs >= oldest_kept)
+        seqs = seqs[valid]
+        slots = seqs % self.capacity
+
+        fresh = self._step[slots] >= now - self.ttl
+        seqs, slots = seqs[fresh], slots[fresh]
+
+        order = np.argsort(-seqs, kind='stable')
+
+        return [
+            {
+                'location': tuple(int(v) for v in self._location[slot]),
+                'severity': float(self._severity[slot]),
+                'step': int(self._step[slot]),
+                'reporter': int(self._reporter[slot])
+            }
+            for slot in slots[order]
+        ]
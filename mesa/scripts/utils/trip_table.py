@@ -0,0 +1,232 @@
+"""
+Tabla columnar de viajes completados
+
+Registro append-only a nivel de modelo: una fila por viaje en columnas
+NumPy preasignadas por bloques. Con un path configurado, cada bloque
+lleno se vuelca como row group a un archivo Parquet y se reutiliza, por
+lo que la memoria queda acotada al tamaño de un bloque.
+
+Una corrida retomada desde un checkpoint vuelca a una parte nueva junto
+al archivo original (trips.step_NNNNNNN.parquet); read_trips las junta.
+"""
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+
+# Centinela para posiciones ausentes (None)
+NO_POSITION = -1
+
+# Metadato Parquet con el índice global del primer viaje de cada archivo
+FIRST_TRIP_KEY = b'first_trip'
+
+
+def part_path(path, step):
+    """Archivo de los viajes volcados tras retomar en el tick `step`"""
+    base, ext = os.path.splitext(path)
+    return f"{base}.step_{step:07d}{ext}"
+
+
+def read_trips(path):
+    """
+    Viajes volcados en `path` y en sus partes, como un solo DataFrame
+
+    Cada parte empieza en el viaje donde estaba el checkpoint: las filas
+    que el archivo anterior tenga desde ahí (volcadas antes del corte)
+    se repiten en la parte y se descartan.
+    """
+    import pyarrow.parquet as pq
+
+    base, ext = os.path.splitext(path)
+    files = [path] if os.path.exists(path) else []
+    files += sorted(glob.glob(f"{glob.escape(base)}.step_*{ext}"))
+
+    tables = []
+    for name in files:
+        table = pq.read_table(name)
+        metadata = table.schema.metadata or {}
+        tables.append((int(metadata.get(FIRST_TRIP_KEY, 0)), table))
+
+    frames = []
+    for k, (first_trip, table) in enumerate(tables):
+        if k + 1 < len(tables):
+            table = table.slice(0, max(0, tables[k + 1][0] - first_trip))
+        frames.append(table.to_pandas())
+
+    if not frames:
+        return pd.DataFrame(columns=list(TripTable.COLUMNS))
+    return pd.concat(frames, ignore_index=True)
+
+
+class TripTable:
+    """Columnas de viajes: agente, origen, destino, modo, inicio, duración, clima"""
+
+    COLUMNS = {
+        'agent_id': np.int64,
+        'origin_x': np.int32,
+        'origin_y': np.int32,
+        'destination_x': np.int32,
+        'destination_y': np.int32,
+        'mode': np.int16,
+        'start_step': np.int64,
+        'actual_time': np.int64,
+        'weather': np.float64
+    }
+
+    def __init__(self, chunk_size=65536, path=None, modes=None):
+        self.chunk_size = max(1, int(chunk_size))
+        self.path = path
+
+        self._chunk = self._new_chunk()
+        self._rows = 0
+        self._full_chunks = []
+
+        self.spilled = 0
+        self._first_trip = 0
+        self._writer = None
+
+        # Código 0 reservado para None, como en AgentStore
+        self.modes = [None]
+        self._mode_codes = {None: 0}
+        for mode in modes or []:
+            self._encode_mode(mode)
+
+    @classmethod
+    def from_env(cls, modes=None):
+        """Crea la tabla según TRIP_TABLE_PATH y TRIP_TABLE_CHUNK"""
+        return cls(
+            chunk_size=int(os.getenv("TRIP_TABLE_CHUNK", "65536")),
+            path=os.getenv("TRIP_TABLE_PATH") or None,
+            modes=modes
+        )
+
+    def __len__(self):
+        return self.spilled + len(self._full_chunks) * self.chunk_size + self._rows
+
+    def __getstate__(self):
+        # Solo las filas ocupadas del bloque abierto; el writer es del proceso
+        state = self.__dict__.copy()
+        state['_chunk'] = {name: column[:self._rows].copy() for name, column in self._chunk.items()}
+        state['_writer'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        chunk = self._new_chunk()
+        for name, column in state['_chunk'].items():
+            chunk[name][:len(column)] = column
+        self._chunk = chunk
+
+    def redirect(self, path, step=None):
+        """
+        Vuelca los bloques siguientes a `path` (al restaurar un checkpoint)
+
+        Con `step`, los bloques van a la parte de ese tick junto a `path`,
+        sin truncar el archivo de la corrida original. Las filas ya
+        volcadas quedan en el archivo anterior; los índices globales de
+        viaje se mantienen.
+        """
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+        if path is not None and step is not None:
+            path = part_path(path, step)
+        self.path = path
+        self._first_trip = self.spilled
+
+    def _new_chunk(self):
+        return {name: np.zeros(self.chunk_size, dtype=dtype)
+                for name, dtype in self.COLUMNS.items()}
+
+    def _encode_mode(self, mode):
+        code = self._mode_codes.get(mode)
+
+        if code is None:
+            code = len(self.modes)
+            self.modes.append(mode)
+            self._mode_codes[mode] = code
+
+        return code
+
+    def append(self, agent_id, origin, destination, mode, start_step, actual_time, weather):
+        """Agrega un viaje y retorna su índice global en la tabla"""
+        index = len(self)
+        chunk = self._chunk
+        row = self._rows
+
+        ox, oy = origin if origin is not None else (NO_POSITION, NO_POSITION)
+        dx, dy = destination if destination is not None else (NO_POSITION, NO_POSITION)
+
+        chunk['agent_id'][row] = agent_id
+        chunk['origin_x'][row] = ox
+        chunk['origin_y'][row] = oy
+        chunk['destination_x'][row] = dx
+        chunk['destination_y'][row] = dy
+        chunk['mode'][row] = self._encode_mode(mode)
+        chunk['start_step'][row] = start_step
+        chunk['actual_time'][row] = actual_time
+        chunk['weather'][row] = weather
+
+        self._rows += 1
+        if self._rows == self.chunk_size:
+            self._seal_chunk()
+
+        return index
+
+    def _seal_chunk(self):
+        """Vuelca el bloque lleno a Parquet o lo guarda en memoria"""
+        if self.path is not None:
+            self._spill(self._chunk, self._rows)
+        else:
+            self._full_chunks.append(self._chunk)
+
+        self._chunk = self._new_chunk()
+        self._rows = 0
+
+    def _spill(self, chunk, rows):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pandas(self._frame(chunk, rows), preserve_index=False)
+
+        if self._writer is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            schema = table.schema.with_metadata({
+                **(table.schema.metadata or {}),
+                FIRST_TRIP_KEY: str(self._first_trip).encode()
+            })
+            self._writer = pq.ParquetWriter(self.path, schema)
+
+        self._writer.write_table(table.cast(self._writer.schema))
+        self.spilled += rows
+
+    def _frame(self, chunk, rows):
+        data = {name: column[:rows].copy() for name, column in chunk.items()}
+        data['mode'] = np.array(self.modes, dtype=object)[data['mode']]
+        return pd.DataFrame(data)
+
+    def to_dataframe(self):
+        """
+        Viajes aún en memoria como DataFrame
+
+        Las filas ya volcadas a Parquet no se incluyen; se leen del archivo
+        después de close().
+        """
+        frames = [self._frame(chunk, self.chunk_size) for chunk in self._full_chunks]
+        frames.append(self._frame(self._chunk, self._rows))
+        return pd.concat(frames, ignore_index=True)
+
+    def close(self):
+        """Vuelca el bloque parcial y cierra el archivo Parquet"""
+        if self.path is None:
+            return
+
+        if self._rows:
+            self._spill(self._chunk, self._rows)
+            self._rows = 0
+
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
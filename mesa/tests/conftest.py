@@ -0,0 +1,10 @@
+"""
+Configuración de pytest: los módulos del modelo se importan relativos a
+mesa/scripts, igual que al correr los scripts
+"""
+import os
+import sys
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts")
+
+sys.path.insert(0, SCRIPTS_DIR)
@@ -0,0 +1,60 @@
+"""
+Calendario de salidas: buckets por tick, activación en orden de id y
+ticks ya procesados corridos al siguiente
+"""
+from types import SimpleNamespace
+
+from utils.departure_calendar import MINUTES_PER_DAY, DepartureCalendar
+
+
+def _agents(*ids):
+    return [SimpleNamespace(unique_id=unique_id) for unique_id in ids]
+
+
+def test_pop_due_returns_agents_up_to_step_sorted_by_id():
+    calendar = DepartureCalendar()
+    a, b, c, d = _agents(3, 1, 2, 4)
+    calendar.schedule(a, 10)
+    calendar.schedule(b, 12)
+    calendar.schedule(c, 10)
+    calendar.schedule(d, 20)
+
+    assert calendar.next_due_step() == 10
+    assert calendar.pop_due(9) == []
+    assert calendar.pop_due(12) == [b, c, a]
+    assert len(calendar) == 1
+    assert calendar.next_due_step() == 20
+    assert calendar.pop_due(20) == [d]
+    assert calendar.next_due_step() is None
+
+
+def test_agent_is_activated_once_per_bucket():
+    calendar = DepartureCalendar()
+    agent, = _agents(7)
+    calendar.schedule(agent, 5)
+    calendar.schedule(agent, 5)
+
+    assert len(calendar) == 1
+    assert calendar.pop_due(5) == [agent]
+
+
+def test_processed_steps_are_moved_to_the_next_one():
+    calendar = DepartureCalendar()
+    late, = _agents(1)
+    calendar.pop_due(30)
+
+    calendar.schedule(late, 12)
+
+    assert calendar.next_due_step() == 31
+    assert calendar.pop_due(30) == []
+    assert calendar.pop_due(31) == [late]
+
+
+def test_schedule_objective_uses_the_current_day():
+    calendar = DepartureCalendar()
+    agent, = _agents(1)
+    today = 2 * MINUTES_PER_DAY
+
+    calendar.schedule_objective(agent, {'hour': 8, 'minute': 15}, today + 100)
+
+    assert calendar.next_due_step() == today + 8 * 60 + 15
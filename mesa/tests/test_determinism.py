@@ -0,0 +1,36 @@
+"""
+Dos corridas con la misma semilla deben producir la misma salida del
+DataCollector, byte a byte
+"""
+import os
+
+import pytest
+
+pytest.importorskip("libsumo")
+
+from batch_run import run_model
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SUMO_CONFIG = os.path.join(REPO_ROOT, "sumo", "config", "simulation.sumocfg")
+
+
+def _run(seed):
+    params = {
+        'run_id': 0,
+        'seed': seed,
+        'n_agents': 60,
+        'grid_size': 20,
+        'decision_method': 'weighted_means',
+        'weather': 0.5,
+        'replicate': 0
+    }
+    df = run_model(params, days=1, backend="libsumo", sumo_config=SUMO_CONFIG)
+    return df.to_csv(index=False).encode()
+
+
+def test_same_seed_gives_identical_datacollector_output():
+    assert _run(seed=11) == _run(seed=11)
+
+
+def test_different_seed_changes_output():
+    assert _run(seed=11) != _run(seed=12)
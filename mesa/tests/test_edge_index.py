@@ -0,0 +1,53 @@
+"""
+Índice de edges: el edge más cercano coincide con una búsqueda
+exhaustiva sobre todos los segmentos
+"""
+import random
+
+from utils.edge_index import EdgeIndex, _point_segment_distance
+
+
+def _brute_force_distance(index, point):
+    return min(
+        _point_segment_distance(point[0], point[1], x1, y1, x2, y2)
+        for _, x1, y1, x2, y2 in index.segments
+    )
+
+
+def test_nearest_edge_matches_brute_force():
+    rng = random.Random(5)
+    index = EdgeIndex(cell_size=50.0)
+
+    for k in range(200):
+        x, y = rng.uniform(0, 2000), rng.uniform(0, 2000)
+        shape = [(x, y)]
+        for _ in range(rng.randint(1, 3)):
+            x, y = x + rng.uniform(-150, 150), y + rng.uniform(-150, 150)
+            shape.append((x, y))
+        index.add_edge(f"e{k}", shape, speed=13.9)
+
+    for _ in range(500):
+        # Incluye puntos fuera de la red, donde la búsqueda recorre más anillos
+        point = (rng.uniform(-500, 2500), rng.uniform(-500, 2500))
+        edge = index.nearest_edge(point)
+
+        distance = min(
+            _point_segment_distance(point[0], point[1], x1, y1, x2, y2)
+            for edge_id, x1, y1, x2, y2 in index.segments if edge_id == edge
+        )
+        assert distance == _brute_force_distance(index, point)
+
+
+def test_internal_edges_are_ignored():
+    index = EdgeIndex(cell_size=10.0)
+    index.add_edge(":junction_0", [(0, 0), (1, 0)])
+    index.add_edge("far", [(100, 100), (120, 100)], speed=8.3)
+
+    assert len(index) == 1
+    assert index.nearest_edge((0, 0)) == "far"
+    assert index.edge_points["far"] == (110.0, 100.0)
+    assert index.edge_speeds["far"] == 8.3
+
+
+def test_empty_index_has_no_nearest_edge():
+    assert EdgeIndex().nearest_edge((0, 0)) is None
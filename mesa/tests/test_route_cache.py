@@ -0,0 +1,73 @@
+"""
+Caché de rutas: desalojo LRU por tamaño, vencimiento por TTL e
+invalidación por edge
+"""
+import pickle
+
+from utils.route_cache import RouteCache
+
+
+def test_least_recently_used_route_is_evicted():
+    cache = RouteCache(max_size=2)
+    cache.put(('a', 'b', 'car'), ['a', 'x', 'b'])
+    cache.put(('a', 'c', 'car'), ['a', 'c'])
+
+    # Leer renueva la posición: el desalojado es ('a', 'c')
+    assert cache.get(('a', 'b', 'car')) == ['a', 'x', 'b']
+    cache.put(('b', 'c', 'car'), ['b', 'c'])
+
+    assert len(cache) == 2
+    assert cache.get(('a', 'c', 'car')) is None
+    assert cache.get(('a', 'b', 'car')) is not None
+    assert cache.stats()['evictions'] == 1
+
+
+def test_peek_does_not_renew_or_count():
+    cache = RouteCache(max_size=2)
+    cache.put(('a', 'b', 'car'), ['a', 'b'])
+    cache.put(('a', 'c', 'car'), ['a', 'c'])
+
+    assert cache.peek(('a', 'b', 'car')) == ['a', 'b']
+    cache.put(('b', 'c', 'car'), ['b', 'c'])
+
+    assert cache.peek(('a', 'b', 'car')) is None
+    assert cache.stats()['hits'] == cache.stats()['misses'] == 0
+
+
+def test_expired_route_is_a_miss():
+    cache = RouteCache(max_size=10, ttl=60.0)
+    cache.put(('a', 'b', 'car'), ['a', 'b'], now=100.0)
+
+    assert cache.get(('a', 'b', 'car'), now=160.0) == ['a', 'b']
+    assert cache.get(('a', 'b', 'car'), now=161.0) is None
+    assert len(cache) == 0
+    assert cache.stats()['misses'] == 1
+
+
+def test_zero_size_cache_stores_nothing():
+    cache = RouteCache(max_size=0)
+    cache.put(('a', 'b', 'car'), ['a', 'b'])
+
+    assert len(cache) == 0
+
+
+def test_invalidate_edge_drops_routes_through_it():
+    cache = RouteCache()
+    cache.put(('a', 'b', 'car'), ['a', 'x', 'b'])
+    cache.put(('a', 'c', 'car'), ['a', 'c'])
+
+    assert cache.invalidate_edge('x') == 1
+    assert cache.get(('a', 'b', 'car')) is None
+    assert cache.get(('a', 'c', 'car')) == ['a', 'c']
+
+
+def test_cache_survives_pickling():
+    cache = RouteCache(max_size=2)
+    cache.put(('a', 'b', 'car'), ['a', 'b'])
+    cache.put(('a', 'c', 'car'), ['a', 'c'])
+
+    restored = pickle.loads(pickle.dumps(cache))
+    restored.put(('b', 'c', 'car'), ['b', 'c'])
+
+    assert restored.get(('a', 'b', 'car')) is None
+    assert restored.get(('a', 'c', 'car')) == ['a', 'c']
@@ -0,0 +1,63 @@
+"""
+Bus de tráfico: los amigos del emisor reciben el reporte y los buzones
+descartan reportes vencidos por TTL, sobrescritos en el bus o
+desplazados del buzón
+"""
+import pickle
+
+from utils.social_graph import SocialGraph
+from utils.traffic_bus import TrafficBus
+
+
+def _line_graph(n):
+    """0 - 1 - 2 - ... - n-1"""
+    return SocialGraph.from_edges(n, list(range(n - 1)), list(range(1, n)))
+
+
+def test_report_reaches_only_friends():
+    bus = TrafficBus(_line_graph(4), capacity=8, inbox_size=4, ttl=60)
+    bus.publish(1, (3, 4), 0.75, step=10)
+
+    assert bus.inbox(0, now=10) == bus.inbox(2, now=10) == [
+        {'location': (3, 4), 'severity': 0.75, 'step': 10, 'reporter': 1}
+    ]
+    assert bus.inbox(1, now=10) == []
+    assert bus.inbox(3, now=10) == []
+
+
+def test_reports_older_than_ttl_are_dropped():
+    bus = TrafficBus(_line_graph(2), capacity=8, inbox_size=4, ttl=60)
+    bus.publish(1, (0, 0), 0.5, step=10)
+    bus.publish(1, (1, 1), 0.5, step=50)
+
+    assert [r['step'] for r in bus.inbox(0, now=70)] == [50, 10]
+    assert [r['step'] for r in bus.inbox(0, now=71)] == [50]
+
+
+def test_overwritten_reports_are_dropped():
+    bus = TrafficBus(_line_graph(3), capacity=2, inbox_size=4, ttl=60)
+    bus.publish(1, (0, 0), 0.5, step=1)
+    bus.publish(0, (1, 1), 0.5, step=2)
+    bus.publish(2, (2, 2), 0.5, step=3)
+
+    # El reporte de 1 ocupaba el slot que reusó el de 2
+    assert bus.inbox(0, now=3) == []
+    assert [r['reporter'] for r in bus.inbox(1, now=3)] == [2, 0]
+
+
+def test_inbox_keeps_the_newest_reports():
+    bus = TrafficBus(_line_graph(2), capacity=16, inbox_size=3, ttl=60)
+    for step in range(5):
+        bus.publish(1, (step, 0), 0.5, step=step)
+
+    assert [r['step'] for r in bus.inbox(0, now=5)] == [4, 3, 2]
+
+
+def test_bus_survives_pickling():
+    bus = TrafficBus(_line_graph(2), capacity=16, inbox_size=3, ttl=60)
+    bus.publish(1, (2, 3), 0.5, step=7)
+
+    restored = pickle.loads(pickle.dumps(bus))
+    restored.publish(1, (4, 5), 0.25, step=8)
+
+    assert [r['location'] for r in restored.inbox(0, now=8)] == [(4, 5), (2, 3)]
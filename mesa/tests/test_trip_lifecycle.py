@@ -0,0 +1,135 @@
+"""
+Ciclo de vida de un viaje: una caminata, y un viaje cuyo vehículo no se
+pudo insertar en SUMO, terminan con trip_end en walking_arrival_step
+(no por el detector de agentes atascados)
+"""
+import os
+
+import pytest
+
+pytest.importorskip("libsumo")
+
+from models.mobility_model import MobilityModel
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SUMO_CONFIG = os.path.join(REPO_ROOT, "sumo", "config", "simulation.sumocfg")
+
+
+@pytest.fixture
+def model():
+    model = MobilityModel(
+        n_agents=20, width=20, height=20, seed=3,
+        sumo_backend="libsumo", sumo_config=SUMO_CONFIG
+    )
+    yield model
+    model.close()
+
+
+def _start(model, mode):
+    """Inicia un viaje corto del primer agente que no está viajando"""
+    agent = next(a for a in sorted(model.schedule.agents, key=lambda a: a.unique_id)
+                 if not a.in_transit)
+    x, y = agent.pos
+    objective = {
+        'hour': 0,
+        'minute': 0,
+        'activity': 'work',
+        'destination': (x + 1 if x + 1 < model.grid.width else x - 1, y),
+        'completed': False
+    }
+
+    agent.commit(((objective, mode, False), None, None))
+    model.schedule.track(agent, False)
+    return agent, objective
+
+
+def _run_until_done(model, agent, objective, limit=300):
+    while not objective['completed'] and model.schedule.steps < limit:
+        model.step()
+        assert agent.liveness > 0
+
+
+def _last_trip(model, agent):
+    trips = model.trip_table.to_dataframe()
+    return trips[trips['agent_id'] == agent.unique_id].iloc[-1]
+
+
+def test_walking_trip_ends_at_arrival_step(model):
+    agent, objective = _start(model, 'walking')
+    arrival = agent.walking_arrival_step
+
+    _run_until_done(model, agent, objective)
+
+    assert objective['completed']
+    assert not agent.in_transit
+    assert agent.pos == objective['destination']
+
+    trip = _last_trip(model, agent)
+    assert trip['mode'] == 'walking'
+    assert trip['actual_time'] == arrival - objective['start_time']
+
+
+def test_failed_spawn_continues_on_foot(model, monkeypatch):
+    agent, objective = _start(model, 'car')
+    assert agent.sumo_vehicle_id is not None
+
+    # Sin edge para ninguna celda: la inserción del tick falla
+    with monkeypatch.context() as patch:
+        patch.setattr(model.sumo_connector, '_edge_near', lambda position: None)
+        model.step()
+
+    assert agent.sumo_vehicle_id is None
+    assert agent.current_mode == 'walking'
+    arrival = agent.walking_arrival_step
+
+    _run_until_done(model, agent, objective)
+
+    assert objective['completed']
+    trip = _last_trip(model, agent)
+    assert trip['mode'] == 'walking'
+    assert trip['actual_time'] == arrival - objective['start_time']
+
+
+def _later_objective(agent, hour=5, minute=30):
+    x, y = agent.pos
+    return {
+        'hour': hour,
+        'minute': minute,
+        'activity': 'home',
+        'destination': (x, y + 1 if y + 1 < agent.model.grid.height else y - 1),
+        'completed': False
+    }
+
+
+def test_adjust_departure_time_advances_from_planned_minute(model):
+    from actions.adapt_departure import adjust_departure_time
+    from utils.departure_calendar import DepartureCalendar
+
+    model.departure_calendar = DepartureCalendar()
+    agent = sorted(model.schedule.agents, key=lambda a: a.unique_id)[0]
+    objective = _later_objective(agent)
+    key = agent.learned_delays.key(agent.pos, objective['destination'], 5 * 60 + 30)
+    agent.learned_delays.update(key, 12.0)
+
+    assert adjust_departure_time(agent, objective) == 12
+    assert objective['minute'] == 18
+    assert model.departure_calendar.next_due_step() == 5 * 60 + 18
+    assert model.departure_calendar.pop_due(5 * 60 + 18) == [agent]
+
+    # Recalcular parte del minuto planificado: no acumula
+    assert adjust_departure_time(agent, objective) == 12
+    assert objective['minute'] == 18
+
+
+def test_completed_trip_adapts_next_departure(model):
+    agent, objective = _start(model, 'walking')
+    following = _later_objective(agent)
+    agent.trip_objectives = [objective, following]
+
+    key = agent.learned_delays.key(objective['destination'], following['destination'], 5 * 60 + 30)
+    agent.learned_delays.update(key, 12.0)
+
+    _run_until_done(model, agent, objective)
+
+    assert following['planned_minute'] == 30
+    assert following['minute'] == 18
@@ -0,0 +1,66 @@
+"""
+Tabla de viajes: bloques en memoria, volcado a Parquet por bloques y
+partes de una corrida retomada unidas por read_trips
+"""
+import pickle
+
+import pytest
+
+from utils.trip_table import NO_POSITION, TripTable, part_path, read_trips
+
+
+def _append(table, first, count):
+    for k in range(first, first + count):
+        table.append(k, (k, 0), None if k % 3 == 0 else (0, k), 'car' if k % 2 else 'walking',
+                     start_step=10 * k, actual_time=k + 1, weather=0.5)
+
+
+def test_full_chunks_stay_in_memory_without_path():
+    table = TripTable(chunk_size=4, modes=['walking', 'car'])
+    _append(table, 0, 10)
+
+    trips = table.to_dataframe()
+
+    assert len(table) == len(trips) == 10
+    assert trips['agent_id'].tolist() == list(range(10))
+    assert trips['mode'].tolist() == ['walking', 'car'] * 5
+    assert trips['destination_x'].tolist()[:4] == [NO_POSITION, 0, 0, NO_POSITION]
+
+
+def test_full_chunks_spill_to_parquet(tmp_path):
+    pytest.importorskip("pyarrow")
+    path = str(tmp_path / "trips.parquet")
+    table = TripTable(chunk_size=4, path=path)
+    _append(table, 0, 10)
+
+    # Dos bloques volcados; en memoria solo el bloque abierto
+    assert table.spilled == 8
+    assert len(table) == 10
+    assert table.to_dataframe()['agent_id'].tolist() == [8, 9]
+
+    table.close()
+    trips = read_trips(path)
+
+    assert trips['agent_id'].tolist() == list(range(10))
+    assert trips['start_step'].tolist() == [10 * k for k in range(10)]
+    assert trips['mode'].tolist() == ['walking', 'car'] * 5
+
+
+def test_restored_table_writes_a_part_without_repeating_trips(tmp_path):
+    pytest.importorskip("pyarrow")
+    path = str(tmp_path / "trips.parquet")
+    table = TripTable(chunk_size=4, path=path)
+    _append(table, 0, 6)
+
+    # Checkpoint con 4 viajes volcados y 2 en el bloque abierto
+    saved = pickle.dumps(table)
+    _append(table, 6, 4)
+    table.close()
+
+    restored = pickle.loads(saved)
+    restored.redirect(path, step=400)
+    _append(restored, 6, 6)
+    restored.close()
+
+    assert (tmp_path / part_path("trips.parquet", 400)).exists()
+    assert read_trips(path)['agent_id'].tolist() == list(range(12))
@@ -0,0 +1,80 @@
+"""
+Vectorized coordinate projection for SUMO network coordinates.
+
+Reads the network offset and geo-projection from the <location> element
+of a .net.xml (via sumolib) and converts whole arrays of points at once:
+
+    Mesa grid  <->  network XY  <->  lon/lat
+
+Grid coordinates are network XY divided by `scale`. Networks without a
+geo-projection (projParameter="!") map XY to the original coordinates
+(XY minus netOffset), matching simulation.convertGeo.
+"""
+import numpy as np
+
+
+class Projection:
+    """Grid / XY / geo transforms over (N, 2) point arrays."""
+
+    def __init__(self, scale=10.0, offset=(0.0, 0.0), geo_proj=None):
+        self.scale = float(scale)
+        self.offset = np.asarray(offset, dtype=float)
+        self.geo_proj = geo_proj
+
+    @classmethod
+    def from_net_file(cls, net_file, scale=10.0):
+        """Reads netOffset and projParameter from the first <location> element."""
+        import sumolib
+
+        location = next(sumolib.xml.parse(net_file, "location"), None)
+        if location is None:
+            return cls(scale=scale)
+
+        offset = [float(v) for v in location.netOffset.split(",")]
+
+        geo_proj = None
+        if location.projParameter != "!":
+            import pyproj
+            geo_proj = pyproj.Proj(projparams=location.projParameter)
+
+        return cls(scale=scale, offset=offset, geo_proj=geo_proj)
+
+    @property
+    def has_geo(self):
+        return self.geo_proj is not None
+
+    @staticmethod
+    def _points(points):
+        return np.asarray(points, dtype=float).reshape(-1, 2)
+
+    def grid_to_xy(self, points):
+        return self._points(points) * self.scale
+
+    def xy_to_grid(self, points):
+        return self._points(points) / self.scale
+
+    def xy_to_geo(self, points):
+        """Network XY -> (lon, lat)."""
+        raw = self._points(points) - self.offset
+
+        if self.geo_proj is None:
+            return raw
+
+        lon, lat = self.geo_proj(raw[:, 0], raw[:, 1], inverse=True)
+        return np.column_stack([lon, lat])
+
+    def geo_to_xy(self, points):
+        """(lon, lat) -> network XY."""
+        geo = self._points(points)
+
+        if self.geo_proj is not None:
+            x, y = self.geo_proj(geo[:, 0], geo[:, 1])
+            geo = np.column_stack([x, y])
+
+        return geo + self.offset
+
+    def grid_to_geo(self, points):
+        return self.xy_to_geo(self.grid_to_xy(points))
+
+    def geo_to_grid(self, points):
+        return self.xy_to_grid(self.geo_to_xy(points))
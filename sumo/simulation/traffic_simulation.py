@@ -1,10 +1,19 @@
 import os
 import sys
 import subprocess
-import pandas as pd
+import numpy as np
 import libsumo
+from libsumo import constants as tc
 
-OUTPUT_PATH = "data/outputs/vehicles_positions.csv"
+from projection import Projection
+from trajectory_writer import TrajectoryWriter
+
+# CSV by default (same file as before); OUTPUT_FORMAT=parquet opts in to Parquet
+OUTPUT_FORMAT = os.getenv("OUTPUT_FORMAT", "csv")
+OUTPUT_PATH = os.getenv("OUTPUT_PATH", f"data/outputs/vehicles_positions.{OUTPUT_FORMAT}")
+FLUSH_EVERY = int(os.getenv("FLUSH_EVERY", "100"))
+
+VEHICLE_VARS = [tc.VAR_POSITION, tc.VAR_SPEED, tc.VAR_ROAD_ID]
 
 def generate_network():
     """Generate network using netconvert from nodes and edges files"""
@@ -49,36 +58,52 @@ def main():
         print(f"Error starting SUMO: {e}")
         sys.exit(1)
 
-    records = []
+    projection = Projection.from_net_file(os.path.join("config", "network.net.xml"))
+
+    def to_geo(xs, ys):
+        lonlat = projection.xy_to_geo(np.column_stack([xs, ys]))
+        return lonlat[:, 0], lonlat[:, 1]
+
+    writer = TrajectoryWriter(
+        OUTPUT_PATH,
+        fmt=OUTPUT_FORMAT,
+        flush_every=FLUSH_EVERY,
+        to_geo=to_geo
+    )
+    libsumo.simulation.subscribe([tc.VAR_DEPARTED_VEHICLES_IDS])
     step = 0
     
     try:
         while libsumo.simulation.getMinExpectedNumber() > 0:
             libsumo.simulationStep()
-            for veh_id in libsumo.vehicle.getIDList():
-                pos = libsumo.vehicle.getPosition(veh_id)
-                speed = libsumo.vehicle.getSpeed(veh_id)
-                edge_id = libsumo.vehicle.getRoadID(veh_id)
-                lon, lat = libsumo.simulation.convertGeo(pos[0], pos[1])
-                records.append({
-                    "timestep": step,
-                    "veh_id": veh_id,
-                    "lon": lon,
-                    "lat": lat,
-                    "speed": speed,
-                    "edge_id": edge_id
-                })
+
+            # New vehicles are subscribed once; their values are available right away
+            departed = libsumo.simulation.getSubscriptionResults()[tc.VAR_DEPARTED_VEHICLES_IDS]
+            for veh_id in departed:
+                libsumo.vehicle.subscribe(veh_id, VEHICLE_VARS)
+
+            results = libsumo.vehicle.getAllSubscriptionResults()
+            veh_ids = list(results)
+            values = list(results.values())
+            writer.append_step(
+                step,
+                veh_ids,
+                [v[tc.VAR_POSITION][0] for v in values],
+                [v[tc.VAR_POSITION][1] for v in values],
+                [v[tc.VAR_SPEED] for v in values],
+                [v[tc.VAR_ROAD_ID] for v in values]
+            )
             step += 1
     finally:
-        libsumo.close()
+        try:
+            writer.close()
+        finally:
+            libsumo.close()
 
-    if records:
-        df = pd.DataFrame(records)
-        os.makedirs(os.path.dirname(OUTPUT_PATH), exist_ok=True)
-        df.to_csv(OUTPUT_PATH, index=False)
+    if writer.rows_written:
         print(f"Simulation finished. Results saved to {OUTPUT_PATH}")
         print(f"Total steps: {step}")
-        print(f"Total records: {len(records)}")
+        print(f"Total records: {writer.rows_written} ({writer.row_groups} chunks)")
     else:
         print("No simulation data collected")
 
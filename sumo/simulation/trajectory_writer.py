@@ -0,0 +1,141 @@
+"""
+Streaming writer for per-step vehicle trajectories.
+
+Rows are gathered into preallocated NumPy buffers and flushed every
+`flush_every` steps, either appended to a CSV file (the default) or as a
+Parquet row group, so peak memory depends on the flush interval and not on the length
+of the run.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ["timestep", "veh_id", "lon", "lat", "speed", "edge_id"]
+
+
+class TrajectoryWriter:
+    """Buffers trajectory rows and writes them in chunks."""
+
+    def __init__(self, path, fmt="csv", flush_every=100, capacity=4096, to_geo=None):
+        if fmt not in ("parquet", "csv"):
+            raise ValueError(f"Unknown output format: {fmt}")
+
+        self.path = path
+        self.fmt = fmt
+        self.flush_every = max(1, int(flush_every))
+        self.to_geo = to_geo
+
+        self.rows_written = 0
+        self.row_groups = 0
+
+        self._rows = 0
+        self._steps_buffered = 0
+        self._allocate(max(1, int(capacity)))
+
+        self._parquet_writer = None
+        self._csv_header = True
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def _allocate(self, capacity):
+        self._timestep = np.zeros(capacity, dtype=np.int64)
+        self._veh_id = np.empty(capacity, dtype=object)
+        self._x = np.zeros(capacity, dtype=np.float64)
+        self._y = np.zeros(capacity, dtype=np.float64)
+        self._speed = np.zeros(capacity, dtype=np.float64)
+        self._edge_id = np.empty(capacity, dtype=object)
+
+    def _grow(self, needed):
+        """Doubles the buffers; only happens until the busiest chunk fits."""
+        capacity = len(self._timestep)
+        while capacity < needed:
+            capacity *= 2
+
+        rows = self._rows
+        old = (self._timestep, self._veh_id, self._x, self._y, self._speed, self._edge_id)
+        self._allocate(capacity)
+
+        for new, previous in zip(
+            (self._timestep, self._veh_id, self._x, self._y, self._speed, self._edge_id), old
+        ):
+            new[:rows] = previous[:rows]
+
+    def append_step(self, timestep, veh_ids, xs, ys, speeds, edge_ids):
+        """Adds every vehicle of one step and flushes when the interval is reached."""
+        n = len(veh_ids)
+
+        if n:
+            end = self._rows + n
+            if end > len(self._timestep):
+                self._grow(end)
+
+            start = self._rows
+            self._timestep[start:end] = timestep
+            self._veh_id[start:end] = veh_ids
+            self._x[start:end] = xs
+            self._y[start:end] = ys
+            self._speed[start:end] = speeds
+            self._edge_id[start:end] = edge_ids
+            self._rows = end
+
+        self._steps_buffered += 1
+        if self._steps_buffered >= self.flush_every:
+            self.flush()
+
+    def _frame(self):
+        rows = self._rows
+        xs = self._x[:rows]
+        ys = self._y[:rows]
+
+        if self.to_geo is not None:
+            lon, lat = self.to_geo(xs, ys)
+        else:
+            lon, lat = xs, ys
+
+        return pd.DataFrame({
+            "timestep": self._timestep[:rows].copy(),
+            "veh_id": self._veh_id[:rows].copy(),
+            "lon": np.asarray(lon, dtype=np.float64),
+            "lat": np.asarray(lat, dtype=np.float64),
+            "speed": self._speed[:rows].copy(),
+            "edge_id": self._edge_id[:rows].copy()
+        }, columns=COLUMNS)
+
+    def flush(self):
+        """Writes the buffered rows and resets the buffers."""
+        self._steps_buffered = 0
+
+        if not self._rows:
+            return
+
+        df = self._frame()
+
+        if self.fmt == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self.path, table.schema)
+            self._parquet_writer.write_table(table.cast(self._parquet_writer.schema))
+        else:
+            df.to_csv(self.path, mode="w" if self._csv_header else "a",
+                      header=self._csv_header, index=False)
+            self._csv_header = False
+
+        self.rows_written += self._rows
+        self.row_groups += 1
+        self._rows = 0
+
+        # Drop references to vehicle and edge ids of the written chunk
+        self._veh_id[:] = None
+        self._edge_id[:] = None
+
+    def close(self):
+        """Flushes pending rows and closes the output file."""
+        self.flush()
+
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None